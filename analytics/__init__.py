@@ -0,0 +1,32 @@
+# analytics/__init__.py
+
+from config import ANALYTICS_BACKEND
+from registry import load_backend as _load
+
+
+def load_backend(name=ANALYTICS_BACKEND):
+    """
+    Import the graph analytics backend: 'gpu' (cuDF/cuGraph), 'cpu' (pandas/SciPy),
+    or 'auto' for the GPU one when RAPIDS is installed and a CUDA device is usable, the CPU one otherwise.
+    """
+    if name == 'auto':
+        try:
+            gpu = _load('analytics', 'gpu')
+            if gpu.device_count() > 0:
+                return gpu
+        except Exception:  # RAPIDS missing, or a CUDA driver/runtime error (no device, driver mismatch)
+            pass
+        return _load('analytics', 'cpu')
+    elif name in ('gpu', 'cpu'):
+        return _load('analytics', name)
+    else:
+        raise ValueError("backend must be 'gpu', 'cpu' or 'auto'")
+
+
+def __getattr__(name):
+    """`analytics.backend` is loaded on first use, importing analytics.layout does not load cuDF or pandas."""
+    global backend
+    if name == 'backend':
+        backend = load_backend()
+        return backend
+    raise AttributeError(f"module 'analytics' has no attribute {name!r}")
@@ -0,0 +1,103 @@
+# analytics/arrow_io.py
+
+import os
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Low cardinality string attributes, stored as dictionaries
+DICTIONARY_COLUMNS = ('category', 'type', 'label')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Arrow/Parquet export requires pyarrow: pip install pyarrow")
+
+def parquet_paths(outdir, graph_type='chunk'):
+    """Paths of the node and edge Parquet files of a graph."""
+    directory = f"{outdir}/knowledge_graph"
+    return (os.path.join(directory, f"{graph_type}_nodes.parquet"),
+            os.path.join(directory, f"{graph_type}_edges.parquet"))
+
+def to_arrow(nodes_df, edges_df):
+    """
+    Convert the node and edge frames (pandas) to Arrow tables.
+
+    Edge endpoints are dictionary-encoded against the node ids: 'src' and 'dst' hold int32
+    indices into one shared dictionary, the 'node' column of the node table, so each id string is
+    stored once. Categorical columns become Arrow dictionaries.
+    """
+    _require_pyarrow()
+    nodes_df = nodes_df.reset_index(drop=True)
+    node_ids = pa.array(nodes_df['node'].astype(str).to_numpy(), type=pa.string())
+    index = pd.Index(nodes_df['node'])
+
+    edge_columns = {}
+    for col in ('src', 'dst'):
+        codes = index.get_indexer(edges_df[col])
+        if (codes < 0).any():
+            raise ValueError(f"edges_df['{col}'] references nodes missing from nodes_df.")
+        edge_columns[col] = pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int32()), node_ids)
+    for col in edges_df.columns:
+        if col not in ('src', 'dst'):
+            edge_columns[col] = _column(edges_df[col])
+    edges = pa.table(edge_columns)
+
+    node_columns = {'node': node_ids}
+    for col in nodes_df.columns:
+        if col != 'node':
+            node_columns[col] = _column(nodes_df[col])
+    nodes = pa.table(node_columns)
+    return nodes, edges
+
+def _column(series):
+    if series.name in DICTIONARY_COLUMNS or isinstance(series.dtype, pd.CategoricalDtype):
+        return pa.array(series.astype('category'))
+    return pa.array(series, from_pandas=True)
+
+def to_pandas(table):
+    """
+    Arrow table to pandas. Dictionary columns become categoricals, and numeric columns
+    without nulls are handed over without copying.
+    """
+    return table.to_pandas(split_blocks=True)
+
+def write_parquet(nodes_df, edges_df, outdir, graph_type='chunk'):
+    """
+    Write the node and edge frames as Parquet files, returns their paths.
+
+    The edge file stores 'src' and 'dst' as int32 row numbers into the node file, the node ids
+    are only stored once; other string columns use Parquet dictionary encoding.
+    """
+    nodes, edges = to_arrow(nodes_df, edges_df)
+    edges = edges.set_column(edges.schema.get_field_index('src'), 'src', edges['src'].combine_chunks().indices)
+    edges = edges.set_column(edges.schema.get_field_index('dst'), 'dst', edges['dst'].combine_chunks().indices)
+
+    nodes_path, edges_path = parquet_paths(outdir, graph_type)
+    os.makedirs(os.path.dirname(nodes_path), exist_ok=True)
+    pq.write_table(nodes, nodes_path, use_dictionary=True, compression='zstd')
+    pq.write_table(edges, edges_path, use_dictionary=True, compression='zstd')
+    return nodes_path, edges_path
+
+def read_parquet(outdir, graph_type='chunk'):
+    """
+    Read the node and edge Arrow tables written by `write_parquet`, with 'src' and 'dst'
+    dictionary-encoded against the node ids again.
+    """
+    _require_pyarrow()
+    nodes_path, edges_path = parquet_paths(outdir, graph_type)
+    nodes = pq.read_table(nodes_path, read_dictionary=[c for c in DICTIONARY_COLUMNS
+                                                       if c in pq.read_schema(nodes_path).names])
+    edges = pq.read_table(edges_path, read_dictionary=[c for c in DICTIONARY_COLUMNS
+                                                       if c in pq.read_schema(edges_path).names])
+
+    node_ids = nodes['node'].combine_chunks()
+    for col in ('src', 'dst'):
+        encoded = pa.DictionaryArray.from_arrays(edges[col].combine_chunks(), node_ids)
+        edges = edges.set_column(edges.schema.get_field_index(col), col, encoded)
+    return nodes, edges
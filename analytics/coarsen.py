@@ -0,0 +1,90 @@
+# analytics/coarsen.py
+
+import analytics
+
+
+def _aggregate_edges(edges, weight):
+    """Sum the weights (or count the edges) of the edges sharing the same (src, dst) pair."""
+    if weight in edges.columns:
+        edges = edges.assign(edge_count=1)
+        super_edges = edges.groupby(['src', 'dst']).agg({weight: 'sum', 'edge_count': 'sum'}).reset_index()
+    else:
+        super_edges = edges.assign(edge_count=1).groupby(['src', 'dst']).agg({'edge_count': 'sum'}).reset_index()
+        super_edges[weight] = super_edges['edge_count'].astype('float64')
+    return super_edges
+
+def _representatives(nodes_df, by, score):
+    """Highest scoring member of every group (first member when there is no score)."""
+    members = nodes_df.sort_values(score, ascending=False) if score in nodes_df.columns else nodes_df
+    return members.drop_duplicates(subset=[by])[[by, 'node']].rename(columns={'node': 'representative'})
+
+def coarsen(nodes_df, edges_df, by='partition', weight='weight', score='pagerank'):
+    """
+    Aggregate nodes into super-nodes sharing the same `by` value (e.g. Louvain 'partition' or page 'title').
+
+    Returns:
+        super_nodes: One row per group: node (the group value), member_count, the summed `score`,
+            the number of internal edges and its highest scoring member (representative).
+        super_edges: One row per pair of groups: src, dst, summed `weight` (edge count when the
+            graph is unweighted) and edge_count. Edges inside a group are folded into the super-node.
+    """
+    groups = nodes_df[['node', by]]
+    edges = edges_df[['src', 'dst'] + ([weight] if weight in edges_df.columns else [])]
+    edges = edges.merge(groups.rename(columns={'node': 'src', by: 'src_group'}), on='src', how='inner')
+    edges = edges.merge(groups.rename(columns={'node': 'dst', by: 'dst_group'}), on='dst', how='inner')
+    edges = edges.drop(columns=['src', 'dst']).rename(columns={'src_group': 'src', 'dst_group': 'dst'})
+
+    internal = edges[edges['src'] == edges['dst']]
+    internal = internal.assign(internal_edges=1).groupby('src').agg({'internal_edges': 'sum'}).reset_index()
+    super_edges = _aggregate_edges(edges[edges['src'] != edges['dst']], weight)
+
+    aggregations = {'node': 'count'}
+    if score in nodes_df.columns:
+        aggregations[score] = 'sum'
+    super_nodes = nodes_df.groupby(by).agg(aggregations).reset_index().rename(columns={'node': 'member_count'})
+    super_nodes = super_nodes.merge(_representatives(nodes_df, by, score), on=by, how='left')
+    super_nodes = super_nodes.merge(internal.rename(columns={'src': by}), on=by, how='left')
+    super_nodes['internal_edges'] = super_nodes['internal_edges'].fillna(0).astype('int64')
+    super_nodes = super_nodes.rename(columns={by: 'node'})
+
+    return super_nodes.reset_index(drop=True), super_edges.reset_index(drop=True)
+
+def drill_down(nodes_df, edges_df, value, by='partition', weight='weight', score='pagerank'):
+    """
+    Expand one group into its member nodes, the other groups staying super-nodes.
+
+    Members keep their own rows and edges. Neighbouring groups appear as super-nodes named
+    '<by>:<value>' and the edges between members and a neighbouring group are aggregated.
+
+    Returns:
+        nodes: Member rows (member_count 1, highest `score` first when it is a column) followed by the
+            neighbouring super-nodes.
+        edges: src, dst, `weight`, edge_count, for every edge touching at least one member.
+    """
+    mapping = nodes_df[['node', by]]
+    inside = mapping[by] == value
+    mapping = mapping.assign(display=mapping['node'].where(inside, by + ':' + mapping[by].astype(str)),
+                             inside=inside)
+
+    edges = edges_df[['src', 'dst'] + ([weight] if weight in edges_df.columns else [])]
+    edges = edges.merge(mapping[['node', 'display', 'inside']].rename(
+        columns={'node': 'src', 'display': 'src_display', 'inside': 'src_inside'}), on='src', how='inner')
+    edges = edges.merge(mapping[['node', 'display', 'inside']].rename(
+        columns={'node': 'dst', 'display': 'dst_display', 'inside': 'dst_inside'}), on='dst', how='inner')
+    edges = edges[edges['src_inside'] | edges['dst_inside']]
+    edges = edges[['src_display', 'dst_display'] + ([weight] if weight in edges.columns else [])]
+    edges = edges.rename(columns={'src_display': 'src', 'dst_display': 'dst'})
+    edges = edges[edges['src'] != edges['dst']]
+    super_edges = _aggregate_edges(edges, weight)
+
+    members = nodes_df[nodes_df[by] == value].assign(member_count=1)
+    if score in members.columns:
+        members = members.sort_values(score, ascending=False)
+    neighbours = analytics.backend.concat([super_edges['src'], super_edges['dst']]).drop_duplicates()
+    neighbours = neighbours[~neighbours.isin(members['node'])]
+    counts = mapping[~mapping['inside']].groupby('display').agg({'node': 'count'}).reset_index()
+    counts = counts.rename(columns={'display': 'node', 'node': 'member_count'})
+    neighbours = counts[counts['node'].isin(neighbours)]
+
+    nodes = analytics.backend.concat([members, neighbours], ignore_index=True)
+    return nodes.reset_index(drop=True), super_edges.reset_index(drop=True)
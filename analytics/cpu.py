@@ -0,0 +1,272 @@
+# analytics/cpu.py
+
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+
+from knowledge_graph.pagerank import personalized_pagerank
+from config import ANALYTICS_WORKERS
+
+name = 'cpu'
+DataFrame = pd.DataFrame
+Series = pd.Series
+
+
+class CSRGraph:
+    """
+    Undirected graph held as SciPy CSR matrices, the CPU counterpart of `cugraph.Graph()`.
+
+    Vertices are renumbered to 0..N-1, `vertices` maps them back to their labels.
+    """
+
+    def __init__(self, src, dst, weights=None):
+        codes, vertices = pd.factorize(pd.concat([pd.Series(src), pd.Series(dst)], ignore_index=True), sort=False)
+        self.vertices = np.asarray(vertices)
+        self.src = codes[:len(src)].astype(np.int64)
+        self.dst = codes[len(src):].astype(np.int64)
+        n = len(self.vertices)
+
+        w = np.ones(len(self.src)) if weights is None else np.nan_to_num(np.asarray(weights, dtype=np.float64), nan=1.0)
+        A = sp.csr_matrix((w, (self.src, self.dst)), shape=(n, n))
+        # Symmetrize, keeping the largest weight of reciprocal edges
+        self.A = A.maximum(A.T).tocsr()
+        self.A.sort_indices()
+        self.structure = (self.A != 0).astype(np.float64).tocsr()
+
+    @property
+    def number_of_vertices(self):
+        return len(self.vertices)
+
+def concat(objs, **kwargs):
+    return pd.concat(objs, **kwargs)
+
+def from_pandas(df):
+    return df
+
+def to_pandas(obj):
+    return obj
+
+def edge_codes(edges_df):
+    """Integer codes of the 'src' and 'dst' columns as host arrays, with the number of distinct nodes."""
+    codes, uniques = pd.factorize(pd.concat([edges_df['src'], edges_df['dst']], ignore_index=True))
+    return codes[:len(edges_df)], codes[len(edges_df):], len(uniques)
+
+def filter_rows(df, mask):
+    """Keep the rows of `df` selected by a host boolean array."""
+    return df[mask]
+
+def build_graph(edges_df, weight=None):
+    """Build the graph from an edge frame with 'src', 'dst' (and optionally `weight`) columns."""
+    weights = edges_df[weight].to_numpy() if weight else None
+    return CSRGraph(edges_df['src'].to_numpy(), edges_df['dst'].to_numpy(), weights)
+
+
+# PageRank
+
+def pagerank(G, alpha=0.85, tol=1e-5, max_iter=100, nstart=None):
+    """Global PageRank, `nstart` is an optional warm start DataFrame with 'vertex' and 'pagerank'."""
+    n = G.number_of_vertices
+    out_weight = np.asarray(G.A.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inv = np.zeros(n)
+    inv[~dangling] = 1.0 / out_weight[~dangling]
+    P = (sp.diags(inv) @ G.A).tocsr()
+
+    x0 = None
+    if nstart is not None:
+        x0 = pd.Series(nstart['pagerank'].to_numpy(), index=nstart['vertex']).reindex(G.vertices).fillna(1.0 / n).to_numpy()
+    X, _ = personalized_pagerank(P, np.ones(n), dangling=dangling, alpha=alpha, tol=tol, max_iter=max_iter, x0=x0)
+    return pd.DataFrame({'vertex': G.vertices, 'pagerank': X[:, 0]})
+
+
+# Betweenness centrality (sampled Brandes, one batch of sources per sparse BFS)
+
+_worker_structure = None
+
+def _init_worker(structure):
+    global _worker_structure
+    _worker_structure = structure
+
+def _brandes_batch(sources, with_edges=False, structure=None):
+    """
+    Dependencies of a batch of BFS sources, all sources advanced together level by level.
+
+    Returns the node dependencies (N,) and, if `with_edges`, the dependencies of every stored arc.
+    """
+    A = _worker_structure if structure is None else structure
+    n, b = A.shape[0], len(sources)
+    cols = np.arange(b)
+
+    dist = np.full((n, b), -1, dtype=np.int32)
+    sigma = np.zeros((n, b))
+    dist[sources, cols] = 0
+    sigma[sources, cols] = 1.0
+
+    # Forward: shortest path counts, level by level
+    frontier = sigma.copy()
+    depth = 0
+    while True:
+        paths = A.T @ frontier
+        paths[dist >= 0] = 0
+        reached = paths > 0
+        if not reached.any():
+            break
+        depth += 1
+        dist[reached] = depth
+        sigma[reached] = paths[reached]
+        frontier = np.where(reached, paths, 0.0)
+
+    # Backward: dependency accumulation
+    delta = np.zeros((n, b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for level in range(depth, 0, -1):
+            T = np.where(dist == level, (1.0 + delta) / sigma, 0.0)
+            parents = dist == level - 1
+            delta[parents] += (sigma * (A @ T))[parents]
+
+    # A source does not count towards its own betweenness
+    node_dependency = delta.sum(axis=1) - np.bincount(sources, weights=delta[sources, cols], minlength=n)
+
+    if not with_edges:
+        return node_dependency, None
+
+    coo = A.tocoo()
+    row, col = coo.row, coo.col
+    with np.errstate(divide='ignore', invalid='ignore'):
+        on_path = (dist[row] >= 0) & (dist[col] == dist[row] + 1)
+        arc = np.where(on_path, sigma[row] * (1.0 + delta[col]) / sigma[col], 0.0)
+    return node_dependency, arc.sum(axis=1)
+
+def _accumulate(G, k, batch_size, with_edges, n_jobs, seed):
+    n = G.number_of_vertices
+    rng = np.random.default_rng(seed)
+    sources = np.arange(n) if k is None or k >= n else rng.choice(n, size=k, replace=False)
+    batches = [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+
+    node_total = np.zeros(n)
+    arc_total = np.zeros(G.structure.nnz) if with_edges else None
+    n_jobs = n_jobs or os.cpu_count()
+
+    if n_jobs == 1 or len(batches) == 1:
+        results = (_brandes_batch(batch, with_edges, G.structure) for batch in batches)
+        for node_dep, arc_dep in results:
+            node_total += node_dep
+            if with_edges:
+                arc_total += arc_dep
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(G.structure,)) as executor:
+            for node_dep, arc_dep in executor.map(_brandes_batch, batches, [with_edges] * len(batches)):
+                node_total += node_dep
+                if with_edges:
+                    arc_total += arc_dep
+    return node_total, arc_total, len(sources)
+
+def betweenness_centrality(G, k=None, normalized=True, batch_size=64, n_jobs=ANALYTICS_WORKERS, seed=0):
+    """Node betweenness from `k` sampled sources (all of them if None), NetworkX scaling conventions."""
+    n = G.number_of_vertices
+    node_total, _, n_sources = _accumulate(G, k, batch_size, False, n_jobs, seed)
+
+    # Undirected graph: unnormalized values are halved since every pair is counted from both ends
+    if normalized:
+        scale = 1.0 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+    else:
+        scale = 0.5
+    node_total *= scale * n / max(n_sources, 1)
+    return pd.DataFrame({'vertex': G.vertices, 'betweenness_centrality': node_total})
+
+def edge_betweenness_centrality(G, k=None, normalized=True, batch_size=16, n_jobs=ANALYTICS_WORKERS, seed=0):
+    """Edge betweenness from `k` sampled sources, one row per input edge."""
+    n = G.number_of_vertices
+    _, arc_total, n_sources = _accumulate(G, k, batch_size, True, n_jobs, seed)
+
+    coo = G.structure.tocoo()
+    arcs = sp.csr_matrix((arc_total, (coo.row, coo.col)), shape=G.structure.shape)
+    # An undirected edge is crossed in both directions
+    edge_values = np.asarray(arcs[G.src, G.dst]).ravel() + np.asarray(arcs[G.dst, G.src]).ravel()
+
+    if normalized:
+        scale = 1.0 / (n * (n - 1)) if n > 1 else 1.0
+    else:
+        scale = 0.5
+    edge_values *= scale * n / max(n_sources, 1)
+    return pd.DataFrame({
+        'src': G.vertices[G.src],
+        'dst': G.vertices[G.dst],
+        'betweenness_centrality': edge_values
+    })
+
+
+# Community detection (Louvain)
+
+def _louvain_level(A, resolution, rng, max_passes):
+    """Local moving phase: returns the community of every node and whether any node moved."""
+    n = A.shape[0]
+    indptr, indices, data = A.indptr, A.indices, A.data
+    k = np.asarray(A.sum(axis=1)).ravel()
+    m2 = k.sum()
+    comm = np.arange(n)
+    tot = k.copy()
+
+    improved = False
+    for _ in range(max_passes):
+        moved = 0
+        for i in rng.permutation(n):
+            start, stop = indptr[i], indptr[i + 1]
+            neighbours, weights = indices[start:stop], data[start:stop]
+            not_self = neighbours != i
+            neighbours, weights = neighbours[not_self], weights[not_self]
+
+            current = comm[i]
+            tot[current] -= k[i]
+            if neighbours.size == 0:
+                tot[current] += k[i]
+                continue
+
+            candidates, inverse = np.unique(comm[neighbours], return_inverse=True)
+            links = np.bincount(inverse, weights=weights)
+            gains = links - resolution * tot[candidates] * k[i] / m2
+
+            own = candidates == current
+            stay = (links[own].sum() if own.any() else 0.0) - resolution * tot[current] * k[i] / m2
+            best = np.argmax(gains)
+            target = candidates[best] if gains[best] > stay + 1e-12 else current
+
+            tot[target] += k[i]
+            if target != current:
+                comm[i] = target
+                moved += 1
+        if moved == 0:
+            break
+        improved = True
+
+    _, comm = np.unique(comm, return_inverse=True)
+    return comm, improved
+
+def modularity(A, membership, resolution=1.0):
+    k = np.asarray(A.sum(axis=1)).ravel()
+    m2 = k.sum()
+    if m2 == 0:
+        return 0.0
+    coo = A.tocoo()
+    inside = coo.data[membership[coo.row] == membership[coo.col]].sum()
+    tot = np.bincount(membership, weights=k)
+    return float(inside / m2 - resolution * (tot ** 2).sum() / m2 ** 2)
+
+def louvain(G, resolution=1.0, max_level=10, max_passes=10, seed=0):
+    """Louvain community detection, returns (DataFrame with 'vertex' and 'partition', modularity)."""
+    rng = np.random.default_rng(seed)
+    A = G.A
+    membership = np.arange(G.number_of_vertices)
+
+    for _ in range(max_level):
+        comm, improved = _louvain_level(A, resolution, rng, max_passes)
+        if not improved:
+            break
+        membership = comm[membership]
+        S = sp.csr_matrix((np.ones(A.shape[0]), (np.arange(A.shape[0]), comm)), shape=(A.shape[0], comm.max() + 1))
+        A = (S.T @ A @ S).tocsr()
+
+    parts = pd.DataFrame({'vertex': G.vertices, 'partition': membership.astype(np.int32)})
+    return parts, modularity(G.A, membership, resolution)
@@ -0,0 +1,57 @@
+# analytics/gpu.py
+
+import cudf
+import cugraph
+import cupy
+
+name = 'gpu'
+DataFrame = cudf.DataFrame
+Series = cudf.Series
+
+
+def device_count():
+    """Number of visible CUDA devices."""
+    return cupy.cuda.runtime.getDeviceCount()
+
+def concat(objs, **kwargs):
+    return cudf.concat(objs, **kwargs)
+
+def from_pandas(df):
+    return cudf.DataFrame.from_pandas(df)
+
+def to_pandas(obj):
+    return obj.to_pandas()
+
+def edge_codes(edges_df):
+    """Integer codes of the 'src' and 'dst' columns as host arrays, with the number of distinct nodes."""
+    codes, uniques = cudf.concat([edges_df['src'], edges_df['dst']], ignore_index=True).factorize()
+    codes = cupy.asnumpy(codes)
+    return codes[:len(edges_df)], codes[len(edges_df):], len(uniques)
+
+def filter_rows(df, mask):
+    """Keep the rows of `df` selected by a host boolean array."""
+    return df[cupy.asarray(mask)]
+
+def build_graph(edges_df, weight=None):
+    """Build the graph from an edge frame with 'src', 'dst' (and optionally `weight`) columns."""
+    G_cu = cugraph.Graph()
+    if weight:
+        G_cu.from_cudf_edgelist(edges_df, source='src', destination='dst', edge_attr=weight, renumber=True)
+    else:
+        G_cu.from_cudf_edgelist(edges_df, source='src', destination='dst', renumber=True)
+    return G_cu
+
+def pagerank(G, alpha=0.85, tol=1e-5, max_iter=100, nstart=None):
+    """Global PageRank, `nstart` is an optional warm start DataFrame with 'vertex' and 'pagerank'."""
+    if nstart is not None:
+        nstart = nstart[nstart['vertex'].isin(G.nodes())].rename(columns={'pagerank': 'values'})
+    return cugraph.pagerank(G, alpha=alpha, tol=tol, max_iter=max_iter, nstart=nstart)
+
+def betweenness_centrality(G, k=None, normalized=True, **kwargs):
+    return cugraph.betweenness_centrality(G, k=k, normalized=normalized)
+
+def edge_betweenness_centrality(G, k=None, normalized=True, **kwargs):
+    return cugraph.edge_betweenness_centrality(G, k=k, normalized=normalized)
+
+def louvain(G, **kwargs):
+    return cugraph.louvain(G)
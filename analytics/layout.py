@@ -0,0 +1,207 @@
+# analytics/layout.py
+
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+
+
+def adjacency(src, dst, n_nodes, weights=None):
+    """Symmetric CSR adjacency of an edge list given as integer node codes."""
+    w = np.ones(len(src)) if weights is None else np.nan_to_num(np.asarray(weights, dtype=np.float64), nan=1.0)
+    A = sp.csr_matrix((w, (src, dst)), shape=(n_nodes, n_nodes))
+    A = A.maximum(A.T).tocsr()
+    A.setdiag(0)
+    A.eliminate_zeros()
+    return A
+
+
+# Repulsion (Barnes-Hut approximation on a quadtree stored as one regular grid per level)
+
+def _cell_moments(cells, masses, pos, size):
+    """Mass and center of mass of every cell of a size x size grid."""
+    n_cells = size * size
+    mass = np.bincount(cells, weights=masses, minlength=n_cells)
+    cx = np.bincount(cells, weights=masses * pos[:, 0], minlength=n_cells)
+    cy = np.bincount(cells, weights=masses * pos[:, 1], minlength=n_cells)
+    occupied = mass > 0
+    cx = np.divide(cx, mass, out=np.zeros(n_cells), where=occupied)
+    cy = np.divide(cy, mass, out=np.zeros(n_cells), where=occupied)
+    return mass, cx, cy
+
+def _add_cell_force(force, pos, masses, mass, cx, cy, cells, valid, scaling):
+    """Repulsion of the cells `cells` (where `valid`) on every node, as if their mass sat at their center."""
+    m = np.where(valid, mass[np.where(valid, cells, 0)], 0.0)
+    dx = pos[:, 0] - np.where(valid, cx[np.where(valid, cells, 0)], 0.0)
+    dy = pos[:, 1] - np.where(valid, cy[np.where(valid, cells, 0)], 0.0)
+    d2 = dx * dx + dy * dy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.where((m > 0) & (d2 > 0), scaling * masses * m / d2, 0.0)
+    force[:, 0] += factor * dx
+    force[:, 1] += factor * dy
+
+def _repulsion(pos, masses, depth, scaling, rows=slice(None)):
+    """
+    Approximate repulsion on the nodes `rows`, from every node.
+
+    At level l (a 2^l x 2^l grid over the bounding box) a node interacts with the children of its
+    parent's neighbours that are not its own neighbours: these cells are well separated from the
+    node, so they are replaced by their center of mass. At the finest level (`depth`), the 3 x 3
+    neighbouring cells are also approximated by their center of mass, the node's own mass excluded.
+    """
+    lo = pos.min(axis=0)
+    span = max(float((pos.max(axis=0) - lo).max()), 1e-9) * (1 + 1e-9)
+    unit = (pos - lo) / span
+    pos_r, masses_r = pos[rows], masses[rows]
+    force = np.zeros_like(pos_r)
+
+    for level in range(2, depth + 1):
+        size = 2 ** level
+        ix = np.minimum((unit[:, 0] * size).astype(np.int64), size - 1)
+        iy = np.minimum((unit[:, 1] * size).astype(np.int64), size - 1)
+        mass, cx, cy = _cell_moments(ix * size + iy, masses, pos, size)
+        ix, iy = ix[rows], iy[rows]
+
+        px, py = ix % 2, iy % 2
+        for a in range(6):
+            for b in range(6):
+                ox, oy = a - 2 - px, b - 2 - py
+                near = (np.abs(ox) <= 1) & (np.abs(oy) <= 1)
+                x, y = ix + ox, iy + oy
+                valid = ~near & (x >= 0) & (x < size) & (y >= 0) & (y < size)
+                _add_cell_force(force, pos_r, masses_r, mass, cx, cy, x * size + y, valid, scaling)
+
+        if level == depth:
+            own = ix * size + iy
+            for ox in (-1, 0, 1):
+                for oy in (-1, 0, 1):
+                    x, y = ix + ox, iy + oy
+                    valid = (x >= 0) & (x < size) & (y >= 0) & (y < size)
+                    if ox == 0 and oy == 0:
+                        # Own cell without the node itself
+                        rest = mass[own] - masses_r
+                        others = rest > 1e-9
+                        rx = np.divide(cx[own] * mass[own] - pos_r[:, 0] * masses_r, rest, out=pos_r[:, 0].copy(), where=others)
+                        ry = np.divide(cy[own] * mass[own] - pos_r[:, 1] * masses_r, rest, out=pos_r[:, 1].copy(), where=others)
+                        dx, dy = pos_r[:, 0] - rx, pos_r[:, 1] - ry
+                        d2 = dx * dx + dy * dy
+                        with np.errstate(divide='ignore', invalid='ignore'):
+                            factor = np.where(others & (d2 > 0), scaling * masses_r * rest / d2, 0.0)
+                        force[:, 0] += factor * dx
+                        force[:, 1] += factor * dy
+                    else:
+                        _add_cell_force(force, pos_r, masses_r, mass, cx, cy, x * size + y, valid, scaling)
+    return force
+
+_worker_masses = None
+
+def _init_worker(masses):
+    global _worker_masses
+    _worker_masses = masses
+
+def _repulsion_task(args):
+    pos, depth, scaling, rows = args
+    return _repulsion(pos, _worker_masses, depth, scaling, rows)
+
+
+def forceatlas2(A, iterations=100, pos=None, scaling_ratio=2.0, gravity=1.0, strong_gravity=False,
+                lin_log=False, edge_weight_influence=1.0, jitter_tolerance=1.0, depth=None,
+                n_jobs=1, seed=0, verbose=0):
+    """
+    ForceAtlas2 layout of a symmetric CSR adjacency, vectorized with NumPy.
+
+    Repulsion between all pairs is approximated Barnes-Hut style on a quadtree (see
+    `_repulsion`); attraction runs over the CSR edges; speeds follow the ForceAtlas2
+    swinging/traction adaptation.
+
+    Args:
+        A: (N, N) symmetric CSR adjacency, values are edge weights.
+        iterations: Number of iterations.
+        pos: Optional (N, 2) initial positions (e.g. a previous layout).
+        scaling_ratio, gravity, strong_gravity, lin_log, edge_weight_influence, jitter_tolerance:
+            ForceAtlas2 parameters.
+        depth: Quadtree depth, log4(N) + 1 by default (a few nodes per finest cell).
+        n_jobs: Processes sharing the repulsion computation, each one for a slice of the nodes.
+
+    Returns:
+        (N, 2) array of positions.
+    """
+    n = A.shape[0]
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-1, 1, (n, 2)) * np.sqrt(n) if pos is None else np.array(pos, dtype=np.float64)
+    if n < 2:
+        return pos
+
+    degrees = np.diff(A.indptr)
+    masses = degrees + 1.0
+    coo = A.tocoo()
+    row, col = coo.row, coo.col
+    weights = coo.data ** edge_weight_influence if edge_weight_influence != 1 else coo.data
+    depth = depth or max(2, int(np.ceil(np.log(n) / np.log(4))) + 1)
+
+    executor = None
+    if n_jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(masses,))
+        bounds = np.linspace(0, n, n_jobs + 1).astype(int)
+        slices = [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    speed, speed_efficiency = 1.0, 1.0
+    old_force = np.zeros_like(pos)
+    try:
+        for iteration in range(iterations):
+            # Repulsion
+            if executor is None:
+                force = _repulsion(pos, masses, depth, scaling_ratio)
+            else:
+                tasks = [(pos, depth, scaling_ratio, rows) for rows in slices]
+                force = np.concatenate(list(executor.map(_repulsion_task, tasks)))
+
+            # Gravity
+            norm = np.sqrt((pos ** 2).sum(axis=1))
+            if strong_gravity:
+                force -= (gravity * scaling_ratio * masses)[:, None] * pos
+            else:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    factor = np.where(norm > 0, gravity * masses / norm, 0.0)
+                force -= factor[:, None] * pos
+
+            # Attraction, every undirected edge is stored in both directions
+            delta = pos[row] - pos[col]
+            if lin_log:
+                distance = np.sqrt((delta ** 2).sum(axis=1))
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    factor = np.where(distance > 0, weights * np.log1p(distance) / distance, 0.0)
+            else:
+                factor = weights
+            force[:, 0] -= np.bincount(row, weights=factor * delta[:, 0], minlength=n)
+            force[:, 1] -= np.bincount(row, weights=factor * delta[:, 1], minlength=n)
+
+            # Adaptive speed
+            swinging = masses * np.sqrt(((force - old_force) ** 2).sum(axis=1))
+            traction = masses * np.sqrt(((force + old_force) ** 2).sum(axis=1)) / 2
+            total_swinging, total_traction = swinging.sum(), traction.sum()
+
+            optimal_jt = 0.05 * np.sqrt(n)
+            jt = jitter_tolerance * max(np.sqrt(optimal_jt), min(10.0, optimal_jt * total_traction / n ** 2))
+            if total_traction > 0 and total_swinging / total_traction > 2.0:
+                if speed_efficiency > 0.05:
+                    speed_efficiency *= 0.5
+                jt = max(jt, jitter_tolerance)
+            target_speed = jt * speed_efficiency * total_traction / max(total_swinging, 1e-12)
+            if total_swinging > jt * total_traction:
+                if speed_efficiency > 0.05:
+                    speed_efficiency *= 0.7
+            elif speed < 1000:
+                speed_efficiency *= 1.3
+            speed = speed + min(target_speed - speed, 0.5 * speed)
+
+            factor = speed / (1.0 + np.sqrt(speed * swinging))
+            pos += force * factor[:, None]
+            old_force = force
+
+            if verbose >= 2 and (iteration + 1) % 10 == 0:
+                print(f"Iteration {iteration + 1}/{iterations}, speed {speed:.4f}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return pos
@@ -0,0 +1,74 @@
+# analytics/peeling.py
+
+import numpy as np
+
+
+def _incident_edges(ptr, order, nodes):
+    """Edge ids stored in the CSR ranges ptr[node]:ptr[node + 1] of every node of `nodes`."""
+    starts = ptr[nodes]
+    lengths = ptr[nodes + 1] - starts
+    total = lengths.sum()
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return order[np.arange(total) + offsets]
+
+def peel_dead_ends_and_orphans(src, dst, n_nodes, recurse=True):
+    """
+    Iteratively remove orphan nodes (out-going edges only) and dead-end nodes (in-coming edges only).
+
+    Every round removes the edges of all the nodes flagged at the start of the round, as the
+    former set based loop of `cuGraph.remove_dead_ends_and_orphans`. Degrees are decremented
+    as edges are removed and only the endpoints of removed edges are re-examined, so every node
+    and edge is visited a bounded number of times: O(V + E) in total.
+
+    Args:
+        src, dst: Integer node codes of the edges, in [0, n_nodes). Negative codes (missing ids) are
+            never removed as nodes.
+        n_nodes: Number of nodes.
+        recurse: Keep peeling until no orphan or dead-end is left (a single round otherwise).
+
+    Returns:
+        keep: Boolean mask of the remaining edges.
+        rounds: One {'round', 'nodes_removed', 'edges_removed'} dict per round.
+    """
+    src = np.where(np.asarray(src) < 0, n_nodes, src).astype(np.int64)
+    dst = np.where(np.asarray(dst) < 0, n_nodes, dst).astype(np.int64)
+    n = n_nodes + 1  # the last slot stands for missing ids
+
+    out_deg = np.bincount(src, minlength=n)
+    in_deg = np.bincount(dst, minlength=n)
+    out_order = np.argsort(src, kind='stable')
+    in_order = np.argsort(dst, kind='stable')
+    out_ptr = np.concatenate([[0], np.cumsum(out_deg)])
+    in_ptr = np.concatenate([[0], np.cumsum(in_deg)])
+
+    keep = np.ones(len(src), dtype=bool)
+    removed = np.zeros(n, dtype=bool)
+    removed[n_nodes] = True
+
+    candidates = np.arange(n_nodes)
+    rounds = []
+    while True:
+        flagged = ((out_deg[candidates] > 0) & (in_deg[candidates] == 0)) | \
+                  ((in_deg[candidates] > 0) & (out_deg[candidates] == 0))
+        frontier = candidates[flagged & ~removed[candidates]]
+        if frontier.size == 0:
+            break
+        removed[frontier] = True
+
+        edges = np.concatenate([_incident_edges(out_ptr, out_order, frontier),
+                                _incident_edges(in_ptr, in_order, frontier)])
+        edges = np.unique(edges[keep[edges]])
+        keep[edges] = False
+        np.subtract.at(out_deg, src[edges], 1)
+        np.subtract.at(in_deg, dst[edges], 1)
+
+        rounds.append({'round': len(rounds) + 1, 'nodes_removed': int(frontier.size), 'edges_removed': int(edges.size)})
+        if not recurse:
+            break
+        # Only the endpoints of removed edges can have become orphans or dead-ends
+        candidates = np.unique(np.concatenate([src[edges], dst[edges]]))
+        candidates = candidates[~removed[candidates]]
+
+    return keep, rounds
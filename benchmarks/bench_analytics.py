@@ -0,0 +1,70 @@
+# benchmarks/bench_analytics.py
+
+import os
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import networkx as nx
+from networkx.readwrite import json_graph
+
+from config import DATA_DIR
+from analytics import backend
+from visualization import cuGraph
+
+
+def write_synthetic_graph(outdir, n_nodes=30000, n_edges=500000, graph_type='chunk', seed=0):
+    """Write a random graph in the KnowledgeGraph.save format (node-link JSON)."""
+    rng = np.random.default_rng(seed)
+    src = rng.integers(0, n_nodes, n_edges)
+    # Skew the targets so that some nodes are hubs, as on the wiki
+    dst = np.minimum(rng.zipf(1.5, n_edges) - 1, n_nodes - 1)
+    dst = rng.permutation(n_nodes)[dst]
+
+    G = nx.DiGraph()
+    G.add_nodes_from((f"Page_{i}_1", {'title': f"Page_{i}", 'category': 'Character', 'section': 'Overview', 'type': 'chunk'})
+                     for i in range(n_nodes))
+    for u, v, w in zip(src, dst, rng.random(n_edges)):
+        if u != v:
+            G.add_edge(f"Page_{u}_1", f"Page_{v}_1", weight=float(w), label=f"Page_{v}")
+
+    os.makedirs(f"{outdir}/knowledge_graph", exist_ok=True)
+    with open(f"{outdir}/knowledge_graph/{graph_type}_knowledge_graph.json", 'w') as f:
+        json.dump(json_graph.node_link_data(G, edges="links"), f)
+    return G.number_of_nodes(), G.number_of_edges()
+
+def timed(name, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    print(f"{name:<32} {time.perf_counter() - start:8.2f}s")
+    return result
+
+def main(outdir=DATA_DIR, graph_type='chunk', k=1024, edge_k=256):
+    print(f"Backend: {backend.name}")
+    print("-----"*10)
+    KN = timed("load + build graph", cuGraph, outdir=outdir, graph_type=graph_type, verbose=0)
+    print(f"{len(KN.nodes_df)} nodes, {len(KN.edges_df)} edges")
+    timed("pagerank", KN.pagerank)
+    timed(f"betweenness_centrality (k={k})", KN.betweenness_centrality, k=k)
+    timed(f"edge_betweenness (k={edge_k})", KN.edge_betweenness_centrality, k=edge_k)
+    timed("detect_communities", KN.detect_communities)
+    timed("remove_dead_ends_and_orphans", KN.remove_dead_ends_and_orphans, recurse=True)
+    print("-----"*10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the graph analytics backend.")
+    parser.add_argument("--graph-type", default='chunk', choices=['chunk', 'page'])
+    parser.add_argument("--synthetic", type=int, nargs=2, metavar=('NODES', 'EDGES'),
+                        help="Benchmark a random graph instead of the saved knowledge graph.")
+    parser.add_argument("--k", type=int, default=1024)
+    parser.add_argument("--edge-k", type=int, default=256)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as outdir:
+            write_synthetic_graph(outdir, *args.synthetic, graph_type=args.graph_type)
+            main(outdir, args.graph_type, args.k, args.edge_k)
+    else:
+        main(DATA_DIR, args.graph_type, args.k, args.edge_k)
@@ -0,0 +1,102 @@
+# benchmarks/bench_distributed_crawl.py
+
+import os
+import time
+import argparse
+import tempfile
+
+from benchmarks.synthetic_wiki import generate_wiki
+from benchmarks.stub_servers import WikiServer
+from crawler.distributed import OUTPUT_DIRS
+
+
+def read_output(data_dir):
+    """{relative path: content} of the crawl output of `data_dir`, and the set of parsed URLs."""
+    files = {}
+    for sub in OUTPUT_DIRS:
+        directory = os.path.join(data_dir, sub)
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                    files[f"{sub}/{name}"] = f.read()
+    with open(os.path.join(data_dir, "parsed_urls.json"), 'r', encoding='utf-8') as f:
+        urls = {line.strip() for line in f if line.strip()}
+    return files, urls
+
+def check_same_output(reference_dir, data_dir):
+    """Raise an AssertionError unless `data_dir` holds exactly the files and parsed URLs of `reference_dir`."""
+    ref_files, ref_urls = read_output(reference_dir)
+    files, urls = read_output(data_dir)
+    missing, extra = ref_files.keys() - files.keys(), files.keys() - ref_files.keys()
+    assert not missing and not extra, f"{len(missing)} files missing, {len(extra)} unexpected"
+    changed = [path for path in ref_files if ref_files[path] != files[path]]
+    assert not changed, f"{len(changed)} files differ, e.g. {changed[0]}"
+    assert ref_urls == urls, "parsed URLs differ"
+    return len(files)
+
+def run_with_crash(n_workers, data_dir, wiki, lease_seconds, kill_after, verbose=1):
+    """Start n_workers, kill one after `kill_after` seconds without cleanup, let the others reclaim its leases."""
+    from crawler.distributed import seed_frontier, start_workers, merge_shards, Frontier, frontier_path
+
+    seed_frontier(data_dir, base_url=wiki.base_url, wiki_url=wiki.wiki_url, lease_seconds=lease_seconds, verbose=0).close()
+    processes = start_workers(n_workers, data_dir=data_dir, wiki_url=wiki.wiki_url, verbose=0)
+    time.sleep(kill_after)
+    processes[0].kill()
+    for process in processes:
+        process.join()
+    frontier = Frontier(frontier_path(data_dir))
+    status = frontier.status()
+    frontier.close()
+    merge_shards(data_dir, verbose=0)
+    if verbose:
+        for worker, (state, pages, _) in status['workers'].items():
+            print(f"  {worker:<32} {state:<10} {pages:>7} URLs")
+    return status
+
+def main(n_pages=300, workers=(1, 2, 4), latency=0.02, lease_seconds=3.0, kill_after=1.0, crash=True):
+    from crawler.crawler import crawl
+    from crawler.distributed import distributed_crawl
+
+    pages = generate_wiki(n_pages)
+    print("-----"*10)
+    with tempfile.TemporaryDirectory() as workdir, WikiServer(pages, latency=latency) as wiki:
+        reference_dir = os.path.join(workdir, "sequential") + "/"
+        start = time.perf_counter()
+        crawl(update_only=False, verbose=0, base_url=wiki.base_url, wiki_url=wiki.wiki_url, data_dir=reference_dir)
+        sequential = time.perf_counter() - start
+        print(f"sequential crawl        {sequential:8.2f}s  {wiki.requests} requests")
+
+        for n_workers in workers:
+            data_dir = os.path.join(workdir, f"workers_{n_workers}") + "/"
+            wiki.requests = 0
+            start = time.perf_counter()
+            status = distributed_crawl(n_workers, verbose=0, base_url=wiki.base_url, wiki_url=wiki.wiki_url, data_dir=data_dir)
+            seconds = time.perf_counter() - start
+            files = check_same_output(reference_dir, data_dir)
+            per_worker = sorted(pages for _, pages, _ in status['workers'].values())
+            print(f"{n_workers:>2} workers              {seconds:8.2f}s  x{sequential / seconds:.2f}  "
+                  f"{wiki.requests} requests  URLs per worker {per_worker}  same {files} files")
+
+        if crash:
+            n_workers = max(max(workers), 2)
+            data_dir = os.path.join(workdir, "crash") + "/"
+            print(f"{n_workers} workers, one killed after {kill_after}s (lease {lease_seconds}s):")
+            start = time.perf_counter()
+            run_with_crash(n_workers, data_dir, wiki, lease_seconds, kill_after)
+            files = check_same_output(reference_dir, data_dir)
+            print(f"  recovered in {time.perf_counter() - start:.2f}s, same {files} files")
+    print("-----"*10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed crawl with local workers against a synthetic wiki served locally.")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=0.02, help="Response delay of the stub wiki server, in seconds.")
+    parser.add_argument("--lease", type=float, default=3.0, help="Lease duration of the crash run, in seconds.")
+    parser.add_argument("--kill-after", type=float, default=1.0)
+    parser.add_argument("--no-crash", action="store_true", help="Skip the run where a worker is killed.")
+    args = parser.parse_args()
+
+    main(n_pages=args.pages, workers=args.workers, latency=args.latency, lease_seconds=args.lease,
+         kill_after=args.kill_after, crash=not args.no_crash)
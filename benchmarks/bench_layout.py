@@ -0,0 +1,41 @@
+# benchmarks/bench_layout.py
+
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+from analytics.layout import adjacency, forceatlas2
+
+
+def synthetic_adjacency(n_nodes=30000, n_edges=500000, seed=0):
+    """Random graph with hub nodes (Zipf distributed targets), as a symmetric CSR adjacency."""
+    rng = np.random.default_rng(seed)
+    src = rng.integers(0, n_nodes, n_edges)
+    dst = rng.permutation(n_nodes)[np.minimum(rng.zipf(1.3, n_edges) - 1, n_nodes - 1)]
+    return adjacency(src, dst, n_nodes, rng.random(n_edges))
+
+def main(n_nodes=30000, n_edges=500000, iterations=50, n_jobs=(1, 4)):
+    A = synthetic_adjacency(n_nodes, n_edges)
+    print(f"{A.shape[0]} nodes, {A.nnz // 2} undirected edges, {iterations} iterations")
+    print("-----"*10)
+    for jobs in n_jobs:
+        tracemalloc.start()
+        start = time.perf_counter()
+        pos = forceatlas2(A, iterations=iterations, n_jobs=jobs)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"n_jobs={jobs:<3} {elapsed:8.2f}s  {elapsed / iterations * 1000:8.1f}ms/iteration  "
+              f"peak {peak / 2**20:8.1f}MB  spread {pos.std(axis=0).mean():.1f}")
+    print("-----"*10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the CPU ForceAtlas2 layout.")
+    parser.add_argument("--nodes", type=int, default=30000)
+    parser.add_argument("--edges", type=int, default=500000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--jobs", type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+    main(args.nodes, args.edges, args.iterations, tuple(args.jobs))
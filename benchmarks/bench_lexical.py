@@ -0,0 +1,148 @@
+# benchmarks/bench_lexical.py
+
+import math
+import time
+import random
+import argparse
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+from config import BM25_K1, BM25_B, BM25_FIELD_WEIGHTS, EMBEDDING_DIM
+from embedding.lexical import BM25Index, tokenize
+from benchmarks.synthetic_wiki import WORDS
+from benchmarks.bench_quantization import synthetic_embeddings
+
+
+def synthetic_chunks(n, n_titles=None, seed=0):
+    """Chunks of random wiki words, titled after multi-word entity names (Straw_Hat_Pirates-like)."""
+    rng = random.Random(seed)
+    n_titles = n_titles or max(n // 5, 1)
+    titles = ["_".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4))) + f"_{i}" for i in range(n_titles)]
+    chunks = []
+    for i in range(n):
+        title = rng.choice(titles)
+        words = [rng.choice(WORDS) for _ in range(rng.randint(40, 250))]
+        if rng.random() < 0.3:  # the entity is often named in its own text
+            words.insert(rng.randrange(len(words)), title.replace("_", " "))
+        chunks.append({'chunk_id': f"{title}_{i}", 'title': title, 'section': f"Section_{rng.randint(1, 6)}",
+                       'category': 'Character', 'url': "", 'text': " ".join(words)})
+    return chunks, titles
+
+def bm25_reference(chunks, query, k1=BM25_K1, b=BM25_B, field_weights=BM25_FIELD_WEIGHTS):
+    """Plain Python BM25 scores {chunk_id: score} with the field weighting of BM25Index."""
+    counts = []
+    for chunk in chunks:
+        c = Counter()
+        for field, weight in field_weights.items():
+            for token in tokenize(chunk[field]):
+                c[token] += weight
+        counts.append(c)
+    n = len(chunks)
+    avgdl = sum(sum(c.values()) for c in counts) / n
+    scores = {}
+    for term, qtf in Counter(tokenize(query)).items():
+        df = sum(term in c for c in counts)
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for chunk, c in zip(chunks, counts):
+            tf = c.get(term, 0)
+            if tf:
+                dl = sum(c.values())
+                scores[chunk['chunk_id']] = scores.get(chunk['chunk_id'], 0.0) + \
+                    qtf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+    return scores
+
+def latency(fn, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+def check_against_reference(chunks, queries, top_k=10):
+    """Top-k ids and scores of BM25Index against the plain Python reference, on a small corpus."""
+    index = BM25Index()
+    for start in range(0, len(chunks), 37):
+        index.add(chunks[start:start + 37])
+    for query in queries:
+        reference = sorted(bm25_reference(chunks, query).items(), key=lambda item: -item[1])[:top_k]
+        found = index.search(query, top_k)
+        assert np.allclose([s for _, s in found], [s for _, s in reference], rtol=1e-4), query
+        assert {c for c, _ in found} == {c for c, _ in reference} or len(set(s for _, s in reference)) < top_k, query
+    print(f"BM25Index matches the reference scores on {len(queries)} queries.")
+
+def main(n_chunks=50000, batch_size=64, n_queries=500, top_k=10, seed=0):
+    chunks, titles = synthetic_chunks(n_chunks, seed=seed)
+    rng = random.Random(seed)
+    queries = [rng.choice(titles).rsplit("_", 1)[0].replace("_", " ") for _ in range(n_queries)]
+
+    print("-----"*10)
+    check_against_reference(chunks[:600], queries[:20], top_k=top_k)
+
+    index = BM25Index()
+    start = time.perf_counter()
+    for i in range(0, n_chunks, batch_size):
+        index.add(chunks[i:i + batch_size])
+    seconds = time.perf_counter() - start
+    print(f"incremental build: {n_chunks} chunks in batches of {batch_size}: {seconds:.2f}s "
+          f"({n_chunks / seconds:,.0f} chunks/s), {len(index.vocab)} terms, {index.nbytes / 2**20:.1f}MB, "
+          f"{len(index.segments)} segments")
+
+    p50, p99 = latency(lambda q: index.search(q, top_k), queries)
+    print(f"{'bm25':<10} p50={p50:7.2f}ms  p99={p99:7.2f}ms")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        from local_database import LocalEmbeddingDatabase
+        db = LocalEmbeddingDatabase(directory=workdir)
+        vectors = synthetic_embeddings(n_chunks, dim=EMBEDDING_DIM, seed=seed)
+        for i in range(0, n_chunks, 4096):
+            db.insert_embeddings([dict(chunk, embedding=vector) for chunk, vector in
+                                  zip(chunks[i:i + 4096], vectors[i:i + 4096])])
+        query_vectors = {q: vectors[rng.randrange(n_chunks)] for q in queries}
+        db.lexical_search(queries[0], top_k)  # builds the index
+        for name, fn in (("lexical", lambda q: db.lexical_search(q, top_k)),
+                         ("dense", lambda q: db.search(query_vectors[q], top_k)),
+                         ("hybrid", lambda q: db.hybrid_search(q, query_vectors[q], top_k))):
+            p50, p99 = latency(fn, queries)
+            print(f"{name:<10} p50={p50:7.2f}ms  p99={p99:7.2f}ms  (LocalEmbeddingDatabase)")
+        db.close_connection()
+    print("-----"*10)
+
+def bench_database(queries, top_k=10):
+    """Lexical, dense and hybrid search latency of the configured database on real questions."""
+    from database import open_database
+    from embedding.model import load_embedding_model
+    from benchmarks.bench_retrieval import QUERIES
+
+    db = open_database()
+    model = load_embedding_model()
+    queries = queries or QUERIES
+    embeddings = dict(zip(queries, model.encode(queries)))
+    db.lexical_search(queries[0], top_k)
+    print("-----"*10)
+    for name, fn in (("lexical", lambda q: db.lexical_search(q, top_k)),
+                     ("dense", lambda q: db.search(embeddings[q], top_k)),
+                     ("hybrid", lambda q: db.hybrid_search(q, embeddings[q], top_k))):
+        p50, p99 = latency(fn, queries * 10)
+        print(f"{name:<10} p50={p50:7.2f}ms  p99={p99:7.2f}ms")
+    for query in queries[:3]:
+        print(query, "->", [chunk_id for chunk_id, _ in db.hybrid_search(query, embeddings[query], 5)])
+    print("-----"*10)
+    db.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 index build and query latency, and hybrid (RRF) search latency.")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per incremental insert.")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--db", action="store_true", help="Benchmark the configured database instead (DB_BACKEND).")
+    args = parser.parse_args()
+
+    if args.db:
+        bench_database(None, top_k=args.top_k)
+    else:
+        main(n_chunks=args.chunks, batch_size=args.batch_size, n_queries=args.queries, top_k=args.top_k)
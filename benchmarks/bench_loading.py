@@ -0,0 +1,94 @@
+# benchmarks/bench_loading.py
+
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from crawler.schemas import ChunkData, DocumentData
+from crawler.utils.json_writer import save_data, save_doc, save_graph
+from knowledge_graph.knowledge_graph import KnowledgeGraph
+from knowledge_graph.utils import load_data_json_files, load_graph_json_files, load_page_json_files
+
+
+def write_corpus(outdir, n_pages=2000, chunks_per_page=8, links_per_chunk=10, seed=0):
+    """Write a random crawl output (metadata, pages and graph files) to `outdir`."""
+    rng = random.Random(seed)
+    titles = [f"Page_{i}" for i in range(n_pages)]
+    for title in titles:
+        chunks = []
+        graph = {}
+        for i in range(1, chunks_per_page + 1):
+            links = [(t, t.replace('_', ' ')) for t in rng.sample(titles, links_per_chunk)]
+            chunk = ChunkData(
+                url=f"https://example.fandom.com/wiki/{title}",
+                chunk_id=f"{title}_{i}",
+                title=title,
+                category='Character',
+                text=" ".join(rng.choices(titles, k=200)),
+                section=f"Section_{i}",
+                links=links,
+                token_count=200
+            )
+            chunks.append(chunk)
+            graph.setdefault(title, []).append((chunk.chunk_id, 'chunk'))
+            graph.setdefault(chunk.chunk_id, []).extend(links)
+        doc = DocumentData(url=chunks[0].url, title=title, category='Character', text="", links=[])
+        save_doc(doc, title, outdir=outdir)
+        save_data(chunks, title, outdir=outdir)
+        save_graph(graph, title, outdir=outdir)
+
+def sequential_baseline(outdir):
+    """Stdlib, single threaded loading (the loaders before the thread pool)."""
+    loaded = {}
+    for sub, suffix in (('metadata', 'data.json'), ('graph', 'graph.json'), ('pages', 'page.json')):
+        directory = os.path.join(outdir, sub)
+        for fname in os.listdir(directory):
+            if fname.endswith(suffix):
+                with open(os.path.join(directory, fname), 'r', encoding='utf-8') as f:
+                    loaded[fname] = json.load(f)
+    return loaded
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def main(n_pages=2000):
+    with tempfile.TemporaryDirectory() as outdir:
+        print(f"Writing a synthetic corpus of {n_pages} pages...")
+        write_corpus(outdir, n_pages=n_pages)
+
+        kg = KnowledgeGraph(
+            data_dir=outdir,
+            metadata_dir=f"{outdir}/metadata",
+            page_dir=f"{outdir}/pages",
+            graph_dir=f"{outdir}/graph",
+            EmbeddingDatabase=lambda: None,
+            verbose=0
+        )
+        # First pass over the files: cold start
+        setup_time = timed(kg.setup)
+
+        baseline_time = timed(sequential_baseline, outdir)
+        loaders_time = timed(lambda: (
+            load_data_json_files(f"{outdir}/metadata"),
+            load_graph_json_files(f"{outdir}/graph"),
+            load_page_json_files(f"{outdir}/pages"),
+        ))
+
+        print("-----"*10)
+        print(f"KnowledgeGraph.setup (cold): {setup_time:.2f}s "
+              f"({len(kg.graph.nodes)} nodes, {len(kg.graph.edges)} edges)")
+        print(f"Sequential json loading   : {baseline_time:.2f}s")
+        print(f"Threaded loaders          : {loaders_time:.2f}s")
+        print("-----"*10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the crawl output loaders and KnowledgeGraph.setup.")
+    parser.add_argument("--pages", type=int, default=2000)
+    args = parser.parse_args()
+    main(n_pages=args.pages)
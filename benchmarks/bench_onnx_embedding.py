@@ -0,0 +1,97 @@
+# benchmarks/bench_onnx_embedding.py
+
+import os
+import time
+import random
+import argparse
+import tempfile
+import numpy as np
+
+from benchmarks.synthetic_wiki import WORDS
+from embedding.projection import topk_overlap
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]"]
+
+
+def random_model(output_dir, hidden=128, layers=2, heads=4, seed=0):
+    """
+    Export a small randomly initialized BERT encoder, with a word-level tokenizer over the
+    synthetic wiki vocabulary, to `output_dir` (no download: exercises the backend offline).
+    """
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import BertConfig, BertModel, PreTrainedTokenizerFast
+    from embedding.onnx_model import export_onnx
+
+    vocab = {token: i for i, token in enumerate(SPECIAL_TOKENS + sorted(set(WORDS)))}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])])
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer, unk_token="[UNK]", pad_token="[PAD]",
+                                        cls_token="[CLS]", sep_token="[SEP]")
+
+    torch.manual_seed(seed)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=hidden, num_hidden_layers=layers, num_attention_heads=heads,
+                        intermediate_size=4 * hidden, max_position_embeddings=512)
+    return export_onnx(BertModel(config), output_dir, tokenizer=tokenizer)
+
+def model_size(model_dir, name):
+    """Size in MB of an ONNX model, with its external weights (name.data, written by the torch dynamo exporter)."""
+    paths = [os.path.join(model_dir, name), os.path.join(model_dir, name + ".data")]
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path)) / 2**20
+
+def synthetic_texts(n, min_words=20, max_words=300, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))) for _ in range(n)]
+
+def throughput(model, texts, repeat=3):
+    """Best texts per second over `repeat` runs, after a warm-up batch."""
+    model.encode(texts[:model.batch_size])
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        embeddings = model.encode(texts)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best, embeddings
+
+def main(model_dir=None, n_texts=512, threads=(1, None), batch_size=32, k=10):
+    from embedding.onnx_model import OnnxEmbedding, MODEL_FILE, QUANTIZED_FILE
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if model_dir is None:
+            model_dir = os.path.join(workdir, "random_bert")
+            random_model(model_dir)
+            print("Random BERT encoder exported to", model_dir)
+        texts = synthetic_texts(n_texts)
+
+        print("-----"*10)
+        embeddings = {}
+        for quantized in (False, True):
+            label = "int8" if quantized else "float32"
+            for n_threads in threads:
+                model = OnnxEmbedding(model_dir, quantized=quantized, threads=n_threads, batch_size=batch_size)
+                rate, embeddings[label] = throughput(model, texts)
+                print(f"{label:<8} threads={n_threads or os.cpu_count():<3} {rate:10.1f} texts/s")
+        size = {label: model_size(model_dir, name) for label, name in (("float32", MODEL_FILE), ("int8", QUANTIZED_FILE))}
+        print(f"model size: {size['float32']:.1f}MB float32, {size['int8']:.1f}MB int8")
+
+        full, quantized = embeddings['float32'], embeddings['int8']
+        cosine = np.sum(full * quantized, axis=1)  # both L2 normalized
+        print(f"cosine(float32, int8): mean {cosine.mean():.4f}  p5 {np.percentile(cosine, 5):.4f}  min {cosine.min():.4f}")
+        print(f"top-{k} neighbour overlap: {topk_overlap(full, quantized, k=k):.3f}")
+        print("-----"*10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and agreement of the float32 and int8 ONNX embedding backends.")
+    parser.add_argument("--model-dir", default=None,
+                        help="Directory written by embedding.onnx_model.export_onnx, a random tiny BERT by default.")
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--threads", type=int, nargs='+', default=[1, 0], help="Intra-op threads, 0 for all cores.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    main(model_dir=args.model_dir, n_texts=args.texts, threads=[t or None for t in args.threads],
+         batch_size=args.batch_size, k=args.k)
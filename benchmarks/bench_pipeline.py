@@ -0,0 +1,175 @@
+# benchmarks/bench_pipeline.py
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.synthetic_wiki import generate_wiki
+from benchmarks.stub_servers import WikiServer, StubOllamaServer
+
+STAGES = ('crawl', 'embedding', 'setup', 'build', 'save', 'load', 'analytics')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def profile(fn, memory=True):
+    """Run fn(), returns (result, seconds, peak traced MB or None). tracemalloc slows Python code down."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        seconds = time.perf_counter() - start
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+    return result, seconds, peak
+
+def commit_id():
+    """Short hash of HEAD, suffixed with '-dirty' when tracked files have uncommitted changes."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"]).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+def run_scale(n_pages, workdir, stages=STAGES, memory=True, batch_size=64, top_k=3, k=256, verbose=1):
+    """Generate a wiki of n_pages pages, serve it with a stub embedding server and run the pipeline stages on it."""
+    from config import EMBEDDING_DIM
+    from database import open_database
+    from knowledge_graph.knowledge_graph import KnowledgeGraph
+
+    data_dir = os.path.join(workdir, f"wiki_{n_pages}") + "/"
+    db_dir = os.path.join(data_dir, "vector_store")
+    open_db = lambda: open_database('local', directory=db_dir)
+    new_kg = lambda: KnowledgeGraph(data_dir=data_dir, metadata_dir=f"{data_dir}metadata/", page_dir=f"{data_dir}pages/",
+                                    graph_dir=f"{data_dir}graph/", EmbeddingDatabase=open_db, verbose=0)
+    results = {}
+    state = {}
+
+    def record(stage, fn):
+        if stage not in stages:
+            return
+        _, seconds, peak = profile(fn, memory=memory)
+        results[stage] = {'seconds': round(seconds, 4), 'peak_mb': None if peak is None else round(peak, 2)}
+        if verbose:
+            print(f"{n_pages:>7} pages  {stage:<10} {seconds:9.2f}s" + ("" if peak is None else f"  peak {peak:9.1f}MB"))
+
+    pages = generate_wiki(n_pages)
+    with WikiServer(pages) as wiki, StubOllamaServer(dim=EMBEDDING_DIM) as ollama_stub:
+
+        def crawl_stage():
+            from crawler.crawler import crawl
+            crawl(update_only=False, verbose=0, base_url=wiki.base_url, wiki_url=wiki.wiki_url, data_dir=data_dir)
+
+        def embedding_stage():
+            from embedding.embedding_main import embedding_main
+            from embedding.model import OllamaEmbedding
+            embedding_main(batch_size=batch_size, reset_table=True, verbose=0, model=OllamaEmbedding(host=ollama_stub.url),
+                           db=open_db(), metadata_dir=f"{data_dir}metadata/", data_dir=data_dir)
+
+        def setup_stage():
+            state['kg'] = new_kg()
+            state['kg'].setup()
+
+        def save_stage():
+            state['kg'].save(data_dir, graph_type='chunk')
+            state['kg'].save(data_dir, graph_type='page')
+
+        def load_stage():
+            kg = new_kg()
+            kg.load(data_dir, graph_type='chunk')
+            kg.load(data_dir, graph_type='page')
+
+        def analytics_stage():
+            from visualization import cuGraph
+            KN = cuGraph(outdir=data_dir, graph_type='chunk', verbose=0)
+            KN.pagerank()
+            KN.betweenness_centrality(k=min(k, len(KN.nodes_df)))
+            KN.detect_communities()
+            KN.remove_dead_ends_and_orphans(recurse=True)
+
+        record('crawl', crawl_stage)
+        record('embedding', embedding_stage)
+        record('setup', setup_stage)
+        record('build', lambda: state['kg'].build(top_k=top_k))
+        record('save', save_stage)
+        record('load', load_stage)
+        record('analytics', analytics_stage)
+
+        results['requests'] = {'wiki': wiki.requests, 'embed': ollama_stub.requests, 'texts_embedded': ollama_stub.texts}
+    return results
+
+def save_results(results, directory=RESULTS_DIR):
+    """Store the results under <directory>/<commit>.json, returns the path."""
+    os.makedirs(directory, exist_ok=True)
+    commit = results['commit']
+    path = os.path.join(directory, f"{commit}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+def compare(old_path, new_path):
+    """Print the time and peak memory ratios (new / old) of every scale and stage run in both files."""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old['commit']} -> {new['commit']}")
+    print("-----"*10)
+    for scale, stages in new['scales'].items():
+        for stage, record in stages.items():
+            before = old['scales'].get(scale, {}).get(stage)
+            if stage == 'requests' or not before:
+                continue
+            line = f"{scale:>7} pages  {stage:<10} {before['seconds']:9.2f}s -> {record['seconds']:9.2f}s " \
+                   f"(x{record['seconds'] / max(before['seconds'], 1e-9):.2f})"
+            if before.get('peak_mb') and record.get('peak_mb'):
+                line += f"  peak x{record['peak_mb'] / before['peak_mb']:.2f}"
+            print(line)
+    print("-----"*10)
+
+def main(scales=(100, 500, 2000), stages=STAGES, memory=True, k=256, save=True, verbose=1):
+    results = {
+        'commit': commit_id(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'memory_profiled': memory,
+        'scales': {},
+    }
+    print("-----"*10)
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_pages in scales:
+            results['scales'][str(n_pages)] = run_scale(n_pages, workdir, stages=stages, memory=memory, k=k, verbose=verbose)
+            print("-----"*10)
+    if save:
+        print("Results saved to", save_results(results))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark on a synthetic wiki served locally.")
+    parser.add_argument("--scales", type=int, nargs='+', default=[100, 500, 2000], help="Numbers of wiki pages.")
+    parser.add_argument("--stages", nargs='+', default=list(STAGES), choices=STAGES)
+    parser.add_argument("--no-memory", action="store_true", help="Time only (tracemalloc slows Python code down).")
+    parser.add_argument("--k", type=int, default=256, help="Sampled sources of the betweenness centrality.")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", nargs=2, metavar=('OLD', 'NEW'),
+                        help="Compare two saved result files (e.g. benchmarks/results/<commit>.json) instead of running.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        main(scales=args.scales, stages=args.stages, memory=not args.no_memory, k=args.k, save=not args.no_save)
@@ -0,0 +1,92 @@
+# benchmarks/bench_quantization.py
+
+import time
+import argparse
+import numpy as np
+
+from config import EMBEDDING_DIM, RERANK_FACTOR
+from embedding.quantization import quantize_int8, int8_inner_product, binary_quantize, hamming_distance, rerank
+
+
+def synthetic_embeddings(n, dim=EMBEDDING_DIM, n_clusters=200, noise=0.6, seed=0):
+    """Unit vectors drawn around random cluster centers, a rough stand-in for a topical corpus."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    X = centers[rng.integers(0, n_clusters, n)] + noise * rng.standard_normal((n, dim)).astype(np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+def run(name, nbytes, search, queries, truth, top_k):
+    """`nbytes`: everything the search reads, e.g. the float32 vectors of a rerank on top of its index."""
+    latencies, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        found.append(search(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"{name:<22} size={nbytes / 2**20:9.2f}MB  p50={np.percentile(latencies, 50):7.2f}ms  "
+          f"p99={np.percentile(latencies, 99):7.2f}ms  recall@{top_k}={recall(found, truth):.3f}")
+
+def bench_matrix(X, n_queries=200, top_k=10, rerank_factor=RERANK_FACTOR, seed=0):
+    """Brute force search over every representation of the same matrix, recall against float32."""
+    rng = np.random.default_rng(seed)
+    queries = X[rng.choice(len(X), n_queries, replace=False)]
+    truth = [np.argsort(-(X @ q))[:top_k] for q in queries]
+
+    X16 = X.astype(np.float16)
+    codes, scales = quantize_int8(X)
+    bits = binary_quantize(X)
+    topk = lambda scores, k=top_k: np.argpartition(-scores, k)[:k]
+
+    print("-----"*10)
+    run("float32", X.nbytes, lambda q: topk(X @ q), queries, truth, top_k)
+    run("float16", X16.nbytes, lambda q: topk((X16 @ q.astype(np.float16)).astype(np.float32)), queries, truth, top_k)
+    run("int8", codes.nbytes + scales.nbytes, lambda q: topk(int8_inner_product(codes, scales, q)), queries, truth, top_k)
+    run("binary", bits.nbytes, lambda q: topk(-hamming_distance(bits, binary_quantize(q))), queries, truth, top_k)
+    run(f"binary + rerank x{rerank_factor}", bits.nbytes + X.nbytes,
+        lambda q: rerank(topk(-hamming_distance(bits, binary_quantize(q)), top_k * rerank_factor), X, q, top_k)[0],
+        queries, truth, top_k)
+    print("-----"*10)
+
+def bench_database(n_queries=200, top_k=10, seed=0):
+    """Size, latency and recall of the configured database `search` (DB_BACKEND, VECTOR_STORAGE)."""
+    from database import open_database
+    db = open_database()
+    chunk_ids, X = db.get_embedding_matrix()
+    rng = np.random.default_rng(seed)
+    queries = X[rng.choice(len(X), min(n_queries, len(X)), replace=False)]
+    truth = [[chunk_ids[i] for i in np.argsort(-(X @ q))[:top_k]] for q in queries]
+
+    sizes = db.table_sizes()
+    print("-----"*10)
+    # binary keeps the float32 vectors in the table for the rerank, only its index shrinks
+    print(f"storage={db.storage}  table={sizes['table'] / 2**20:.2f}MB  hnsw index={sizes['hnsw'] / 2**20:.2f}MB  "
+          f"other indexes={(sizes['indexes'] - sizes['hnsw']) / 2**20:.2f}MB  "
+          f"total={(sizes['table'] + sizes['indexes']) / 2**20:.2f}MB")
+    run(f"db.search ({db.storage})", sizes['table'] + sizes['indexes'],
+        lambda q: [chunk_id for chunk_id, _ in db.search(q, top_k)], queries, truth, top_k)
+    print("-----"*10)
+    db.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Size, latency and recall of quantized embeddings.")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="N",
+                        help="Benchmark N synthetic embeddings instead of the stored corpus.")
+    parser.add_argument("--db", action="store_true", help="Also benchmark the database search for VECTOR_STORAGE.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=RERANK_FACTOR)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        X = synthetic_embeddings(args.synthetic)
+    else:
+        from database import open_database
+        db = open_database()
+        _, X = db.get_embedding_matrix()
+        db.close_connection()
+    bench_matrix(X, n_queries=args.queries, top_k=args.top_k, rerank_factor=args.rerank_factor)
+    if args.db:
+        bench_database(n_queries=args.queries, top_k=args.top_k)
@@ -0,0 +1,56 @@
+# benchmarks/bench_replay.py
+
+import os
+import time
+import argparse
+import tempfile
+
+from benchmarks.synthetic_wiki import generate_wiki
+from benchmarks.stub_servers import WikiServer
+from benchmarks.bench_distributed_crawl import check_same_output
+
+
+def main(n_pages=500, latency=0.02, workers=(1, None)):
+    from crawler.crawler import crawl
+    from crawler.replay import replay
+    from crawler.archive import HtmlArchive, archive_dir
+
+    pages = generate_wiki(n_pages)
+    print("-----"*10)
+    with tempfile.TemporaryDirectory() as workdir:
+        reference_dir = os.path.join(workdir, "crawl") + "/"
+        with WikiServer(pages, latency=latency) as wiki:
+            start = time.perf_counter()
+            crawl(update_only=False, verbose=0, base_url=wiki.base_url, wiki_url=wiki.wiki_url, data_dir=reference_dir)
+            seconds = time.perf_counter() - start
+            wiki_url = wiki.wiki_url
+            print(f"crawl (latency {latency * 1000:.0f}ms)   {seconds:8.2f}s  {wiki.requests} requests")
+
+        archive = HtmlArchive(archive_dir(reference_dir))
+        index = archive.index()
+        raw = sum(len(archive.read(entry).encode('utf-8')) for entry in index.values())
+        print(f"archive: {len(index)} pages, {raw / 2**20:.1f}MB of HTML in {archive.nbytes() / 2**20:.1f}MB "
+              f"({archive.segments()[0].split('.', 1)[1]}, x{raw / max(archive.nbytes(), 1):.1f})")
+        archive.close()
+
+        # the server is down: the replay cannot reach the network
+        for n_workers in workers:
+            data_dir = os.path.join(workdir, f"replay_{n_workers}") + "/"
+            start = time.perf_counter()
+            replayed, _ = replay(data_dir, wiki_url=wiki_url, workers=n_workers, directory=archive_dir(reference_dir),
+                                 verbose=0)
+            seconds = time.perf_counter() - start
+            files = check_same_output(reference_dir, data_dir)
+            print(f"replay workers={n_workers or os.cpu_count():<3}  {seconds:8.2f}s  {replayed / seconds:8.0f} pages/s  "
+                  f"same {files} files")
+    print("-----"*10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl a synthetic wiki once, then reparse its HTML archive offline.")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02, help="Response delay of the stub wiki server, in seconds.")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 0], help="Replay processes, 0 for all cores.")
+    args = parser.parse_args()
+
+    main(n_pages=args.pages, latency=args.latency, workers=[w or None for w in args.workers])
@@ -0,0 +1,75 @@
+# benchmarks/bench_retrieval.py
+
+import time
+import random
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from config import METADATA_DIR, GRAPH_DIR, DOC_DIR, DATA_DIR
+from database import open_database
+from embedding.model import load_embedding_model
+from knowledge_graph.knowledge_graph import KnowledgeGraph
+from knowledge_graph.retrieval import HybridRetriever
+
+
+QUERIES = [
+    "Who is the captain of the Straw Hat Pirates?",
+    "What does the Gomu Gomu no Mi do?",
+    "What happened at Marineford?",
+    "Who are the members of the Roger Pirates?",
+    "Which island is Nami from?",
+    "What is Haki?",
+    "Who are the Four Emperors?",
+    "What is the One Piece?",
+]
+
+def load_test(fn, queries, n_requests=500, concurrency=8, seed=0):
+    """Call `fn(query)` n_requests times from `concurrency` threads and return the latencies in ms."""
+    rng = random.Random(seed)
+    workload = [rng.choice(queries) for _ in range(n_requests)]
+
+    def timed(query):
+        start = time.perf_counter()
+        fn(query)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, workload))
+    wall = time.perf_counter() - start
+    return np.array(latencies), wall
+
+def report(name, latencies, wall):
+    print(f"{name:<12} p50={np.percentile(latencies, 50):8.2f}ms  p99={np.percentile(latencies, 99):8.2f}ms  "
+          f"qps={len(latencies) / wall:8.1f}")
+
+def main(n_requests=500, concurrency=8, top_k=10, max_hops=2):
+    kg = KnowledgeGraph(data_dir=DATA_DIR, metadata_dir=METADATA_DIR, page_dir=DOC_DIR, graph_dir=GRAPH_DIR,
+                        EmbeddingDatabase=open_database, verbose=0)
+    kg.load(DATA_DIR, graph_type='chunk')
+
+    retriever = HybridRetriever(kg.db, load_embedding_model(), kg.chunk_graph, max_hops=max_hops)
+    fn = lambda query: retriever.retrieve(query, top_k=top_k)
+
+    print("-----"*10)
+    # Cold: every distinct query misses the caches once
+    latencies, wall = load_test(fn, QUERIES, n_requests=len(QUERIES), concurrency=1)
+    report("cold", latencies, wall)
+    latencies, wall = load_test(fn, QUERIES, n_requests=n_requests, concurrency=concurrency)
+    report("warm", latencies, wall)
+    print("-----"*10)
+    for name, info in retriever.cache_info().items():
+        print(f"{name:<14} hits={info.hits} misses={info.misses}")
+
+    kg.db.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the hybrid retrieval path (p50/p99 latency).")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--max-hops", type=int, default=2)
+    args = parser.parse_args()
+    main(n_requests=args.requests, concurrency=args.concurrency, top_k=args.top_k, max_hops=args.max_hops)
@@ -0,0 +1,61 @@
+# benchmarks/bench_scheduler.py
+
+import os
+import shutil
+import argparse
+import tempfile
+
+from benchmarks.synthetic_wiki import generate_wiki
+from benchmarks.stub_servers import WikiServer
+
+
+def budgeted_run(reference_dir, data_dir, wiki, max_requests, schedule):
+    """A budgeted crawl of `data_dir`, starting from the link graph of the full crawl (no page fetched yet)."""
+    from crawler.crawler import crawl
+
+    shutil.copytree(os.path.join(reference_dir, "graph"), os.path.join(data_dir, "graph"))
+    return crawl(verbose=0, base_url=wiki.base_url, wiki_url=wiki.wiki_url, data_dir=data_dir,
+                 schedule=schedule, max_requests=max_requests)
+
+def main(n_pages=300, budgets=(0.1, 0.25, 0.5), latency=0.0):
+    from crawler.crawler import crawl
+
+    pages = generate_wiki(n_pages)
+    print("-----"*10)
+    with tempfile.TemporaryDirectory() as workdir, WikiServer(pages, latency=latency) as wiki:
+        reference_dir = os.path.join(workdir, "full") + "/"
+        full = crawl(verbose=0, base_url=wiki.base_url, wiki_url=wiki.wiki_url, data_dir=reference_dir)
+        print(f"full crawl: {full['crawled']} pages, {full['requests']} page requests")
+
+        print(f"{'budget':<16} {'order':<10} {'pages':>7} {'links covered':>14}")
+        for share in budgets:
+            max_requests = int(full['requests'] * share)
+            for schedule in (False, True):
+                data_dir = os.path.join(workdir, f"{share}_{schedule}") + "/"
+                report = budgeted_run(reference_dir, data_dir, wiki, max_requests, schedule)
+                print(f"{max_requests:>5} ({share:>4.0%})     {'priority' if schedule else 'arbitrary':<10} "
+                      f"{report['crawled_share']:>7.1%} {report['crawled_weighted_share']:>14.1%}")
+
+        # repeated runs of the same budget: the pages refreshed last are no longer stale, the next run moves on
+        max_requests = int(full['requests'] * budgets[0])
+        data_dir = os.path.join(workdir, "rolling") + "/"
+        report = budgeted_run(reference_dir, data_dir, wiki, max_requests, True)
+        runs = 1
+        while report['fresh_share'] < 1.0 and runs < 50:
+            report = crawl(verbose=0, base_url=wiki.base_url, wiki_url=wiki.wiki_url, data_dir=data_dir,
+                           max_requests=max_requests)
+            runs += 1
+        print(f"runs of {max_requests} requests to refresh every page: {runs} "
+              f"(fresh {report['fresh_share']:.1%})")
+    print("-----"*10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Link coverage of budgeted crawls, in priority or arbitrary order.")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--budgets", type=float, nargs='+', default=[0.1, 0.25, 0.5],
+                        help="Request budgets, as shares of the requests of a full crawl.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Response delay of the stub wiki server, in seconds.")
+    args = parser.parse_args()
+
+    main(n_pages=args.pages, budgets=args.budgets, latency=args.latency)
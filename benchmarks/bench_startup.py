@@ -0,0 +1,64 @@
+# benchmarks/bench_startup.py
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+from registry import STAGES
+
+HEAVY_MODULES = ("requests", "bs4", "tqdm", "numpy", "scipy", "pandas", "pyarrow", "networkx", "matplotlib",
+                 "seaborn", "ollama", "psycopg2", "pgvector", "onnxruntime", "cudf", "cugraph")
+
+# Imports the module in a fresh interpreter and prints its import time and the heavy modules it loaded
+_PROBE = """
+import sys, time, json, importlib
+start = time.perf_counter()
+importlib.import_module({module!r})
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def entry_points():
+    """{name: module}: main.py, visualization.py and the module of every stage."""
+    points = {'main': 'main', 'visualization': 'visualization'}
+    for name, (target, _) in STAGES.items():
+        points[f"stage {name}"] = target.partition(':')[0]
+    return points
+
+def cold_start(module, repeat=5):
+    """Median (import seconds, process seconds) of `module` in fresh interpreters, and the heavy modules it loads."""
+    imports, totals, loaded = [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                             capture_output=True, text=True)
+        totals.append(time.perf_counter() - start)
+        if out.returncode != 0:
+            return None, None, out.stderr.strip().splitlines()[-1]
+        seconds, loaded = json.loads(out.stdout.strip().splitlines()[-1])
+        imports.append(seconds)
+    return statistics.median(imports), statistics.median(totals), loaded
+
+def main(repeat=5):
+    print("-----"*10)
+    baseline = cold_start("config", repeat)[1]
+    print(f"interpreter + config: {baseline * 1000:.0f}ms")
+    print(f"{'entry point':<24} {'import':>8} {'process':>9}  heavy modules loaded")
+    for name, module in entry_points().items():
+        seconds, total, loaded = cold_start(module, repeat)
+        if seconds is None:
+            print(f"{name:<24} {'failed':>8} {'':>9}  {loaded}")
+            continue
+        print(f"{name:<24} {seconds * 1000:6.0f}ms {total * 1000:7.0f}ms  {', '.join(loaded) or '-'}")
+    print("-----"*10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start (import) time of each entry point, in fresh interpreters.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(repeat=args.repeat)
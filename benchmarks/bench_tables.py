@@ -0,0 +1,88 @@
+# benchmarks/bench_tables.py
+
+import gc
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import networkx as nx
+
+from benchmarks.bench_loading import write_corpus
+from knowledge_graph.knowledge_graph import KnowledgeGraph
+from knowledge_graph.tables import CorpusTables
+from knowledge_graph.utils import (iter_data_json_files, iter_page_json_files, iter_graph_json_files,
+                                   load_data_json_files, load_page_json_files, load_graph_json_files)
+
+
+def dict_setup(kg):
+    """`KnowledgeGraph.setup` before the tables: nodes and edges added straight from the decoded JSON dicts."""
+    valid_docs = set()
+    for chunk in iter_data_json_files(kg.metadata_dir):
+        kg.graph.add_node(chunk['chunk_id'], title=chunk['title'], category=chunk['category'],
+                          section=chunk['section'], type='chunk')
+    for page in iter_page_json_files(kg.page_dir):
+        kg.graph.add_node(page['title'], category=page['category'], type='document')
+        valid_docs.add(page['title'])
+    for source, targets in iter_graph_json_files(kg.graph_dir):
+        for target, label in targets:
+            if target in valid_docs or label == "chunk":
+                kg.graph.add_edge(source, target, label=label)
+
+def retained(fn):
+    """Run fn(), returns (result, MB still allocated afterwards, peak MB, seconds)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 2**20, peak / 2**20, seconds
+
+def report(name, current, peak, seconds):
+    print(f"{name:<24} retained {current:9.1f}MB  peak {peak:9.1f}MB  {seconds:8.2f}s")
+
+def main(n_pages=5000, chunks_per_page=8, links_per_chunk=10):
+    with tempfile.TemporaryDirectory() as outdir:
+        print(f"Writing a synthetic corpus of {n_pages} pages, {n_pages * chunks_per_page} chunks, "
+              f"{n_pages * chunks_per_page * links_per_chunk} links...")
+        write_corpus(outdir, n_pages=n_pages, chunks_per_page=chunks_per_page, links_per_chunk=links_per_chunk)
+        dirs = (f"{outdir}/metadata", f"{outdir}/pages", f"{outdir}/graph")
+        new_kg = lambda: KnowledgeGraph(data_dir=outdir, metadata_dir=dirs[0], page_dir=dirs[1], graph_dir=dirs[2],
+                                        EmbeddingDatabase=lambda: None, verbose=0)
+
+        print("-----"*10)
+        loaded, current, peak, seconds = retained(lambda: (load_data_json_files(dirs[0]), load_page_json_files(dirs[1]),
+                                                           load_graph_json_files(dirs[2])))
+        report("loaders (dicts)", current, peak, seconds)
+        del loaded
+        tables, current, peak, seconds = retained(lambda: CorpusTables.load(*dirs))
+        report("CorpusTables", current, peak, seconds)
+        print(f"{'':<24} {len(tables.strings)} distinct strings, id columns {tables.nbytes / 2**20:.1f}MB")
+        del tables
+
+        def run_setup(setup):
+            kg = new_kg()
+            setup(kg)
+            return kg.graph
+        before, dict_current, dict_peak, seconds = retained(lambda: run_setup(dict_setup))
+        report("setup from dicts", dict_current, dict_peak, seconds)
+        after, current, peak, seconds = retained(lambda: run_setup(lambda kg: kg.setup()))
+        report("setup from tables", current, peak, seconds)
+        print(f"{'':<24} retained {current / dict_current - 1:+.0%}, peak {peak / dict_peak - 1:+.0%} against the dicts")
+
+        same = nx.utils.nodes_equal(before.nodes(data=True), after.nodes(data=True)) and \
+            nx.utils.edges_equal(before.edges(data=True), after.edges(data=True))
+        print(f"same graph: {same} ({after.number_of_nodes()} nodes, {after.number_of_edges()} edges)")
+        print("-----"*10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of the crawl output as dicts or as compact tables, and of the graph setup.")
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--chunks-per-page", type=int, default=8)
+    parser.add_argument("--links-per-chunk", type=int, default=10)
+    args = parser.parse_args()
+    main(n_pages=args.pages, chunks_per_page=args.chunks_per_page, links_per_chunk=args.links_per_chunk)
@@ -0,0 +1,125 @@
+# benchmarks/stub_servers.py
+
+import re
+import json
+import time
+import zlib
+import threading
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from config import EMBEDDING_DIM
+
+
+class LocalServer:
+    """HTTP server on a free localhost port, served from a background thread (use as a context manager)."""
+
+    def __init__(self, handler):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.stub = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _WikiHandler(_QuietHandler):
+    def do_GET(self):
+        stub = self.server.stub
+        stub.requests += 1
+        if stub.latency:
+            time.sleep(stub.latency)
+        html = stub.pages.get(self.path)
+        if html is None:
+            self._send(404, "<html><body>Not found</body></html>", "text/html; charset=utf-8")
+        else:
+            self._send(200, html, "text/html; charset=utf-8")
+
+class WikiServer(LocalServer):
+    """Serves the {path: html} pages of `benchmarks.synthetic_wiki.generate_wiki`, each after `latency` seconds."""
+
+    def __init__(self, pages, latency=0.0):
+        super().__init__(_WikiHandler)
+        self.pages = pages
+        self.latency = latency
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        return self.url
+
+    @property
+    def wiki_url(self):
+        return self.url + "/wiki/"
+
+
+_TOKEN = re.compile(r'\w+')
+
+class _EmbedHandler(_QuietHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path != "/api/embed":
+            self._send(404, json.dumps({"error": "not found"}), "application/json")
+            return
+        texts = payload.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        stub.requests += 1
+        stub.texts += len(texts)
+        embeddings = [stub.embed(text).tolist() for text in texts]
+        self._send(200, json.dumps({"model": payload.get("model"), "embeddings": embeddings}), "application/json")
+
+class StubOllamaServer(LocalServer):
+    """
+    Deterministic stand-in for the Ollama `/api/embed` endpoint.
+
+    A text embeds to the normalized sum of fixed random vectors of its words, so texts sharing
+    words are similar and the same text always gets the same vector.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        super().__init__(_EmbedHandler)
+        self.dim = dim
+        self.requests = 0
+        self.texts = 0
+        self._word_vectors = {}
+        self._lock = threading.Lock()
+
+    def _word_vector(self, word):
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(word.encode('utf-8')))
+            vector = rng.standard_normal(self.dim).astype(np.float32)
+            with self._lock:
+                self._word_vectors[word] = vector
+        return vector
+
+    def embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _TOKEN.findall(text.lower()):
+            vector += self._word_vector(word)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
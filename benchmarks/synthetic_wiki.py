@@ -0,0 +1,100 @@
+# benchmarks/synthetic_wiki.py
+
+import random
+from html import escape
+
+# Category pages crawled by crawler.crawl, and the recursion depth it uses for each
+CRAWLED_CATEGORIES = {
+    'Substances': 3,
+    'Geography': 2,
+    'Society_and_Culture': 2,
+    'History': 3,
+    'Organizations': 3,
+}
+
+WORDS = ("pirate crew captain island sea marine devil fruit haki sword ship treasure grand line world "
+         "government revolutionary army emperor admiral bounty navigator cook doctor sniper shipwright "
+         "musician archaeologist fishman giant mink kingdom village war battle arc ancient weapon poneglyph "
+         "log pose den snail straw hat red hair blackbeard whitebeard roger dream freedom nakama ally enemy "
+         "prison tower city port storm current calm belt").split()
+
+# Shared boilerplate, copied into some pages as in fandom templates (exercises the dedup stage)
+BOILERPLATE = ("This article is a stub. You can help the wiki by expanding it with information from the "
+               "manga and the anime, following the manual of style and citing chapters and episodes.")
+
+
+def _paragraph(rng, titles, n_words, link_density, weights):
+    """Random text with `link_density` internal links, targets skewed toward a few popular pages."""
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    for target in rng.choices(titles, weights=weights, k=link_density):
+        position = rng.randrange(len(words) + 1)
+        words.insert(position, f'<a href="/wiki/{target}" title="{target}">{escape(target.replace("_", " "))}</a>')
+    return " ".join(words)
+
+def _page(rng, title, titles, weights, sections, link_density, subpages, boilerplate_ratio):
+    body = [f'<h1 class="page-header__title">{escape(title.replace("_", " "))}</h1>',
+            '<div class="mw-parser-output">',
+            f"<p>{_paragraph(rng, titles, 60, link_density, weights)}</p>",
+            f"<p>{_paragraph(rng, titles, 40, link_density // 2, weights)}</p>"]
+    for subpage in subpages:
+        body.append(f'<p><a href="/wiki/{title}/{subpage}">{subpage}</a></p>')
+
+    for s in range(1, sections + 1):
+        body.append(f'<h2><span class="mw-headline" id="Section_{s}">Section {s}</span></h2>')
+        if rng.random() < boilerplate_ratio:
+            body.append(f"<p>{BOILERPLATE}</p>")
+            continue
+        body.append(f"<p>{_paragraph(rng, titles, rng.randint(80, 200), link_density, weights)}</p>")
+        if rng.random() < 0.5:
+            items = "".join(f"<li>{_paragraph(rng, titles, 15, 1, weights)}</li>" for _ in range(rng.randint(2, 5)))
+            body.append(f"<ul>{items}</ul>")
+    body.append("</div>")
+    return f"<html><head><title>{escape(title)}</title></head><body>{''.join(body)}</body></html>"
+
+def _category_page(members):
+    links = "".join(f'<li><a class="category-page__member-link" href="/wiki/{m}">{escape(m.replace("_", " "))}</a></li>'
+                    for m in members)
+    return f'<html><body><div class="category-page__members"><ul>{links}</ul></div></body></html>'
+
+def generate_wiki(n_pages=200, sections=4, link_density=5, subpage_ratio=0.2, boilerplate_ratio=0.05, seed=0):
+    """
+    Generate a fandom-like wiki as {path: html}, laid out the way `crawler.crawl` walks the real one.
+
+    - /wiki/List_of_Canon_Characters: a table whose second column links to the character pages.
+    - /wiki/Category:<name> for every crawled category: member links (category-page__member-link)
+      to pages and to one nested sub-category.
+    - /wiki/Page_<i>: overview paragraphs, then `sections` mw-headline sections with paragraphs
+      and lists holding `link_density` links each (targets follow a Zipf-like popularity), and a
+      link to its /History subpage for a `subpage_ratio` share of the pages.
+
+    Args:
+        boilerplate_ratio: Share of the sections replaced by a shared boilerplate paragraph.
+    """
+    rng = random.Random(seed)
+    titles = [f"Page_{i}" for i in range(n_pages)]
+    weights = [1.0 / (rank + 1) for rank in range(n_pages)]
+    rng.shuffle(weights)
+    pages = {}
+
+    groups = ['Character'] + list(CRAWLED_CATEGORIES)
+    assignment = {title: groups[i % len(groups)] for i, title in enumerate(titles)}
+
+    for title in titles:
+        subpages = ['History'] if rng.random() < subpage_ratio else []
+        pages[f"/wiki/{title}"] = _page(rng, title, titles, weights, sections, link_density, subpages, boilerplate_ratio)
+        for subpage in subpages:
+            pages[f"/wiki/{title}/{subpage}"] = _page(rng, f"{title}/{subpage}", titles, weights, sections,
+                                                      link_density, [], boilerplate_ratio)
+
+    rows = "".join(f'<tr><td>{i}</td><td><a href="/wiki/{title}">{title}</a></td><td>-</td><td>-</td><td>-</td></tr>'
+                   for i, title in enumerate(t for t in titles if assignment[t] == 'Character'))
+    pages["/wiki/List_of_Canon_Characters"] = f"<html><body><table>{rows}</table></body></html>"
+
+    for category in CRAWLED_CATEGORIES:
+        members = [t for t in titles if assignment[t] == category]
+        half = len(members) // 2
+        sub = f"Category:{category}_Subcategory"
+        pages[f"/wiki/Category:{category}"] = _category_page(members[:half] + [sub])
+        pages[f"/wiki/{sub}"] = _category_page(members[half:])
+
+    return pages
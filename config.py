@@ -21,3 +21,60 @@ DB_CONFIG = {
 EMBEDDING_DIM = 768
 MAX_TOKENS = 8192
 MODEL_NAME = "nomic-ai/nomic-embed-text-v1"
+OLLAMA_HOST = None # e.g. "http://localhost:11434", None for the ollama default
+EMBEDDING_BACKEND = "ollama" # "ollama" (Ollama server) or "onnx" (ONNX Runtime encoder on CPU, see embedding/onnx_model.py)
+ONNX_MODEL_DIR = "models/onnx/" # model.onnx and tokenizer.json written by embedding.onnx_model.export_onnx
+ONNX_QUANTIZE = True # run the dynamic int8 quantized model (model.int8.onnx)
+ONNX_THREADS = None # intra-op threads, None for all cores
+ONNX_MAX_LENGTH = 512 # tokens kept per text
+
+LOADER_WORKERS = 16 # threads used to read the crawled JSON files
+
+KNN_LABEL = "similar" # edge label of the corpus-wide chunk similarity graph
+KNN_MEMORY_BUDGET_MB = 512
+
+RETRIEVAL_CACHE_SIZE = 4096 # entries of each HybridRetriever LRU cache
+PPR_CACHE_SIZE = 128 # PageRank vectors kept per graph to warm start repeated queries (N floats each)
+
+ANALYTICS_BACKEND = "auto" # "gpu" (cuDF/cuGraph), "cpu" (pandas/SciPy) or "auto"
+ANALYTICS_WORKERS = None # processes used by the CPU betweenness, None for all cores
+
+DEDUP_THRESHOLD = 0.8 # estimated Jaccard similarity above which two chunks are near-duplicates
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16 # 128 / 16 = 8 rows per band
+
+VECTOR_STORAGE = "vector" # "vector" (float32), "halfvec" (float16 table and index, no rerank) or "binary" (float32 table, bit index + float32 rerank)
+RERANK_FACTOR = 4 # candidates fetched from the binary index per requested result
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_FIELD_WEIGHTS = {"title": 3.0, "section": 1.0, "text": 1.0} # term frequency weight of each field of the lexical index
+RRF_K = 60 # reciprocal rank fusion constant of hybrid_search
+
+PROJECTION_DIM = 128 # dimension of the reduced (PCA) embedding space
+PROJECTION_SAMPLE = 20000 # embeddings sampled to fit the projection
+
+DB_BACKEND = "postgres" # "postgres" (EmbeddingDatabase) or "local" (memory-mapped LocalEmbeddingDatabase)
+LOCAL_DB_DIR = f"{DATA_DIR}/vector_store/"
+
+TRACING = False # record spans and counters (see tracing.py), exported to TRACE_DIR by main.py
+TRACE_MEMORY = False # also track the tracemalloc peak (slows Python code down)
+TRACE_EVENTS_PER_SPAN = 1000 # raw events kept per span name for the Chrome trace, the totals count every call
+TRACE_DIR = f"{DATA_DIR}/traces/"
+
+CRAWL_PARTITIONS = 64 # hash partitions of the distributed crawl frontier (see crawler/distributed.py)
+CRAWL_LEASE_SECONDS = 60 # a partition or URL lease not renewed by a heartbeat within this delay is reclaimed
+CRAWL_WORKER_DELAY = 0.0 # politeness delay of each worker between two pages, in seconds
+CRAWL_SCHEDULE = True # crawl the pages by decreasing score (see crawler/scheduler.py) instead of in collection order
+CRAWL_SCORE_WEIGHTS = {"in_degree": 1.0, "staleness": 1.0, "category": 0.5} # weight of each term of the page score
+CRAWL_CATEGORY_WEIGHTS = {"Character": 1.0, "Organizations": 0.8, "Geography": 0.6, "History": 0.6,
+                          "Societ_Culture": 0.4, "Subtances": 0.4} # as named by crawler.collect_urls
+CRAWL_STALE_DAYS = 30 # a page fetched this long ago is fully stale
+CRAWL_MAX_REQUESTS = None # page requests per crawl run, None for no limit
+CRAWL_MAX_SECONDS = None # wall time of a crawl run, None for no limit
+
+ARCHIVE_HTML = True # append the fetched pages to DATA_DIR/archive (see crawler/archive.py), to reparse them offline
+ARCHIVE_COMPRESSION = "auto" # "zstd", "gzip" or "auto" (zstd if the zstandard package is installed)
+ARCHIVE_ZSTD_LEVEL = 10
+ARCHIVE_SEGMENT_MB = 1024 # size after which a writer starts a new segment file
+REPLAY_WORKERS = None # processes reparsing the archive (crawler/replay.py), None for all cores
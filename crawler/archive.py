@@ -0,0 +1,181 @@
+# crawler/archive.py
+
+import os
+import re
+import gzip
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from config import DATA_DIR, ARCHIVE_COMPRESSION, ARCHIVE_ZSTD_LEVEL, ARCHIVE_SEGMENT_MB
+
+EXTENSIONS = {"zstd": ".warc.zst", "gzip": ".warc.gz"}
+_SEGMENT = re.compile(r"^(?P<writer>.+)-(?P<seq>\d{5})\.warc\.(zst|gz)$")
+
+
+def archive_dir(data_dir=DATA_DIR):
+    return os.path.join(data_dir, "archive")
+
+def _compressor(compression):
+    if compression == "auto":
+        compression = "zstd" if zstandard is not None else "gzip"
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package (pip install zstandard).")
+        return compression, zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).compress
+    if compression == "gzip":
+        return compression, lambda data: gzip.compress(data, compresslevel=6)
+    raise ValueError(f"Unknown archive compression: {compression}")
+
+def _decompress(segment, data):
+    if segment.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(f"Reading {segment} requires the zstandard package (pip install zstandard).")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+def _record(url, html, headers):
+    """A WARC 'resource' record holding the page HTML."""
+    payload = html.encode('utf-8')
+    lines = ["WARC/1.1", "WARC-Type: resource", f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+             f"WARC-Date: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}", f"WARC-Target-URI: {url}",
+             *(f"WARC-X-{name.capitalize()}: {value}" for name, value in headers.items() if value is not None),
+             "Content-Type: text/html; charset=utf-8", f"Content-Length: {len(payload)}"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('utf-8') + payload + b"\r\n\r\n", payload
+
+def _payload(record):
+    return record[record.index(b"\r\n\r\n") + 4:-4].decode('utf-8')
+
+
+class HtmlArchive:
+    """
+    Append-only archive of the fetched pages: WARC-like records, each compressed on its own
+    (zstd frames, or gzip members as in .warc.gz) so that any record can be read with one seek.
+
+    Every writer (a crawl process or a distributed crawl worker) appends to its own segment files,
+    `<writer>-<seq>.warc.zst`, and to its own index `<writer>.index.jsonl`, one JSON line per record:
+    url, category, parent (URL given to PageProcessor.process), segment, offset, length, sha1 and date.
+    The index line is written after the record, a crashed writer leaves no entry to a partial record.
+    A page fetched again with the same content only gets a new index line pointing to the stored record.
+    """
+
+    def __init__(self, directory=None, writer=None, compression=ARCHIVE_COMPRESSION, segment_mb=ARCHIVE_SEGMENT_MB):
+        self.directory = directory or archive_dir()
+        self.writer = writer or f"{socket.gethostname()}-{os.getpid()}"
+        self.compression = compression
+        self.segment_bytes = segment_mb * 2**20
+        self._compress = None
+        self._segment = None
+        self._file = None
+        self._index_file = None
+        self._latest = None
+        self._readers = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for f in (self._file, self._index_file, *self._readers.values()):
+            if f is not None:
+                f.close()
+        self._file = self._index_file = None
+        self._readers = {}
+
+    def segments(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if _SEGMENT.match(name))
+
+    def index_files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.endswith(".index.jsonl"))
+
+    def entries(self):
+        """Index entries of every writer, in writing order per writer (a truncated last line is skipped)."""
+        for path in self.index_files():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+    def index(self):
+        """{url: entry} of the latest record of every URL."""
+        latest = {}
+        for entry in self.entries():
+            if entry['url'] not in latest or entry['date'] >= latest[entry['url']]['date']:
+                latest[entry['url']] = entry
+        return latest
+
+    def __len__(self):
+        return len(self.index())
+
+    def _open_writer(self):
+        self.compression, self._compress = _compressor(self.compression)
+        os.makedirs(self.directory, exist_ok=True)
+        self._latest = self.index()
+        seqs = [int(m['seq']) for m in map(_SEGMENT.match, self.segments()) if m['writer'] == self.writer]
+        self._open_segment(max(seqs, default=0))
+        self._index_file = open(os.path.join(self.directory, f"{self.writer}.index.jsonl"), 'a', encoding='utf-8')
+
+    def _open_segment(self, seq):
+        if self._file is not None:
+            self._file.close()
+        self._segment = f"{self.writer}-{seq:05d}{EXTENSIONS[self.compression]}"
+        self._file = open(os.path.join(self.directory, self._segment), 'ab')
+
+    def write(self, url, html, category=None, parent=None):
+        """Append the HTML of `url`, returns its index entry."""
+        with self._lock:
+            if self._file is None:
+                self._open_writer()
+            record, payload = _record(url, html, {'category': category, 'parent': parent})
+            sha1 = hashlib.sha1(payload).hexdigest()
+            entry = {'url': url, 'category': category, 'parent': parent, 'sha1': sha1, 'date': time.time()}
+            previous = self._latest.get(url)
+            if previous is not None and previous['sha1'] == sha1:
+                entry.update(segment=previous['segment'], offset=previous['offset'], length=previous['length'])
+            else:
+                if self._file.tell() >= self.segment_bytes:
+                    seq = int(_SEGMENT.match(self._segment)['seq'])
+                    self._open_segment(seq + 1)
+                data = self._compress(record)
+                entry.update(segment=self._segment, offset=self._file.tell(), length=len(data))
+                self._file.write(data)
+                self._file.flush()
+            self._index_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._index_file.flush()
+            self._latest[url] = entry
+            return entry
+
+    def read(self, entry):
+        """HTML of an index entry."""
+        f = self._readers.get(entry['segment'])
+        if f is None:
+            f = self._readers[entry['segment']] = open(os.path.join(self.directory, entry['segment']), 'rb')
+        f.seek(entry['offset'])
+        return _payload(_decompress(entry['segment'], f.read(entry['length'])))
+
+    def get(self, url):
+        """Latest archived HTML of `url`, None if it was never archived."""
+        entry = self.index().get(url)
+        return self.read(entry) if entry else None
+
+    def nbytes(self):
+        """Size of the segment files on disk."""
+        return sum(os.path.getsize(os.path.join(self.directory, name)) for name in self.segments())
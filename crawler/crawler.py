@@ -3,35 +3,22 @@
 from crawler.parsers.page_processor import PageProcessor
 from crawler.url_collectors import process_characters_urls, process_urls_recursively
 from crawler.utils.json_writer import  load_saved_urls, delete_saved_urls
-from config import WIKI_URL, BASE_URL, DATA_DIR
+from crawler.utils.helpers import is_page_url
+from crawler.archive import HtmlArchive, archive_dir
+from crawler.scheduler import CrawlScheduler, CrawlBudget, coverage_report, print_report, save_report
+from config import WIKI_URL, BASE_URL, DATA_DIR, ARCHIVE_HTML, CRAWL_SCHEDULE, CRAWL_MAX_REQUESTS, CRAWL_MAX_SECONDS
 
 from tqdm import tqdm 
 
-def crawl(update_only=False, verbose=1):
-
-    if update_only:
-        try:
-            saved_urls = load_saved_urls(DATA_DIR)
-        except FileNotFoundError:
-            print(f"[WARN] Failed to load saved urls from {DATA_DIR}.")
-            if verbose:
-                print("Create a new list...")
-            saved_urls = set()
-    else:
-        saved_urls = set()
-        delete_saved_urls(DATA_DIR)
-
-    if verbose >= 2:
-        print("-----"*10)
-
-    processor = PageProcessor(wiki_base_url=WIKI_URL, data_dir=DATA_DIR, update_only=update_only, saved_pages=saved_urls)
+def collect_urls(base_url=BASE_URL, wiki_url=WIKI_URL, verbose=1):
+    """Collect the (url, category) pairs to parse: the canon characters and the crawled categories."""
 
     all_urls = []
 
     # Characters URLs
     if verbose:
         print("Fetching Characters pages...")
-    characters_urls = process_characters_urls(url= 'https://onepiece.fandom.com/wiki/List_of_Canon_Characters')
+    characters_urls = process_characters_urls(url= wiki_url + 'List_of_Canon_Characters', base_url=base_url)
     all_urls.extend([(chr_url, 'Character') for chr_url in characters_urls])
 
     if verbose >= 2:
@@ -41,10 +28,10 @@ def crawl(update_only=False, verbose=1):
     # Subtances URLs
     if verbose:
         print("Fetching Substances pages...")
-    start_url = 'https://onepiece.fandom.com/wiki/Category:Substances'
+    start_url = wiki_url + 'Category:Substances'
     depth = 3  # Set the desired recursion depth
-    subtances_urls = process_urls_recursively(start_url, BASE_URL, depth)
-    subtances_urls = [(u, 'Subtances') for u in subtances_urls if u.count(':') == 1 and u.count('/') == 4] # Only keep the pages urls
+    subtances_urls = process_urls_recursively(start_url, base_url, depth)
+    subtances_urls = [(u, 'Subtances') for u in subtances_urls if is_page_url(u)] # Only keep the pages urls
     all_urls.extend(subtances_urls)
     
     if verbose >= 2:
@@ -54,10 +41,10 @@ def crawl(update_only=False, verbose=1):
     # Geography URLs
     if verbose:
         print("Fetching Geography pages...")
-    start_url = 'https://onepiece.fandom.com/wiki/Category:Geography'
+    start_url = wiki_url + 'Category:Geography'
     depth = 2  # Set the desired recursion depth
-    geography_urls = process_urls_recursively(start_url, BASE_URL, depth)
-    geography_urls = [(u, 'Geography') for u in geography_urls if u.count(':') == 1 and u.count('/') == 4] # Only keep the pages urls] 
+    geography_urls = process_urls_recursively(start_url, base_url, depth)
+    geography_urls = [(u, 'Geography') for u in geography_urls if is_page_url(u)] # Only keep the pages urls] 
     all_urls.extend(geography_urls)
 
     if verbose >= 2:
@@ -67,10 +54,10 @@ def crawl(update_only=False, verbose=1):
     # Societ_Culture URLs
     if verbose:
         print("Fetching Society and Culture pages...")
-    start_url = 'https://onepiece.fandom.com/wiki/Category:Society_and_Culture'
+    start_url = wiki_url + 'Category:Society_and_Culture'
     depth = 2  # Set the desired recursion depth
-    society_culture_urls = process_urls_recursively(start_url, BASE_URL, depth)
-    society_culture_urls = [(u, 'Societ_Culture') for u in society_culture_urls if u.count(':') == 1 and u.count('/') == 4] # Only keep the pages urls
+    society_culture_urls = process_urls_recursively(start_url, base_url, depth)
+    society_culture_urls = [(u, 'Societ_Culture') for u in society_culture_urls if is_page_url(u)] # Only keep the pages urls
     all_urls.extend(society_culture_urls)
 
     if verbose >= 2:
@@ -80,10 +67,10 @@ def crawl(update_only=False, verbose=1):
     # History URLs
     if verbose:
         print("Fetching History pages...")
-    start_url = 'https://onepiece.fandom.com/wiki/Category:History'
+    start_url = wiki_url + 'Category:History'
     depth = 3  # Set the desired recursion depth
-    history_urls = process_urls_recursively(start_url, BASE_URL, depth)
-    history_urls = [(u, 'History') for u in history_urls if u.count(':') == 1 and u.count('/') == 4] # Only keep the pages urls
+    history_urls = process_urls_recursively(start_url, base_url, depth)
+    history_urls = [(u, 'History') for u in history_urls if is_page_url(u)] # Only keep the pages urls
     all_urls.extend(history_urls)
     
     if verbose >= 2:
@@ -93,10 +80,10 @@ def crawl(update_only=False, verbose=1):
     # Organizations URLs
     if verbose:
         print("Fetching Organizations pages...")
-    start_url = 'https://onepiece.fandom.com/wiki/Category:Organizations'
+    start_url = wiki_url + 'Category:Organizations'
     depth = 3  # Set the desired recursion depth
-    organizations_urls = process_urls_recursively(start_url, BASE_URL, depth)
-    organizations_urls = [(u, 'Organizations') for u in organizations_urls if u.count(':') == 1 and u.count('/') == 4] # Only keep the pages urls
+    organizations_urls = process_urls_recursively(start_url, base_url, depth)
+    organizations_urls = [(u, 'Organizations') for u in organizations_urls if is_page_url(u)] # Only keep the pages urls
     all_urls.extend(organizations_urls)
 
     if verbose >= 2:
@@ -110,8 +97,50 @@ def crawl(update_only=False, verbose=1):
         print("Total of ",len(URLs)," pages.")
         print("-----"*10)
 
+    return URLs
+
+def crawl(update_only=False, verbose=1, base_url=BASE_URL, wiki_url=WIKI_URL, data_dir=DATA_DIR, on_page=None,
+          archive=ARCHIVE_HTML, schedule=CRAWL_SCHEDULE, max_requests=CRAWL_MAX_REQUESTS, max_seconds=CRAWL_MAX_SECONDS):
+    """
+    Crawl the wiki and save the parsed pages to `data_dir`.
+
+    base_url/wiki_url default to the fandom wiki, a local mirror (see benchmarks/synthetic_wiki.py)
+    can be crawled instead. on_page(doc, chunks, graph) is called for every parsed page (see pipeline.py).
+    With `archive`, the fetched pages are also appended to `data_dir`/archive, to be reparsed offline
+    with crawler/replay.py.
+
+    With `schedule`, the pages are crawled by decreasing CrawlScheduler score (links, staleness, category),
+    so that a run stopped by `max_requests` page requests or `max_seconds` refreshes the most valuable ones.
+    Returns the coverage report of the run (see crawler/scheduler.py), also saved to `data_dir`/crawl_coverage.json.
+    """
+
+    budget = CrawlBudget(max_requests=max_requests, max_seconds=max_seconds)
+    if update_only:
+        try:
+            saved_urls = set(load_saved_urls(data_dir))
+        except FileNotFoundError:
+            print(f"[WARN] Failed to load saved urls from {data_dir}.")
+            if verbose:
+                print("Create a new list...")
+            saved_urls = set()
+    else:
+        saved_urls = set()
+        if not budget.limited: # a partial run keeps the pages it does not reach
+            delete_saved_urls(data_dir)
+
+    if verbose >= 2:
+        print("-----"*10)
+
+    html_archive = HtmlArchive(archive_dir(data_dir)) if archive else None
+    processor = PageProcessor(wiki_base_url=wiki_url, data_dir=data_dir, update_only=update_only, saved_pages=saved_urls,
+                              on_page=on_page, archive=html_archive)
+
+    URLs = collect_urls(base_url=base_url, wiki_url=wiki_url, verbose=verbose)
+    scheduler = CrawlScheduler(data_dir, wiki_url=wiki_url)
+    scheduled = scheduler.order(URLs) if schedule else list({url: (url, category, None) for url, category in URLs}.values())
+
     if verbose:
-        print(DATA_DIR, "already has", len(saved_urls), "saved pages!")
+        print(data_dir, "already has", len(saved_urls), "saved pages!")
     if verbose >= 2:
         if update_only:
             print("update_only enabled!")
@@ -119,16 +148,28 @@ def crawl(update_only=False, verbose=1):
 
 
     
-    for url, category in tqdm(URLs, desc="Parsing "+BASE_URL, disable=(verbose<2)):
+    stopped = None
+    for url, category, _ in tqdm(scheduled, desc="Parsing "+base_url, disable=(verbose<2)):
         """try: 
             processor.process(url)
         except KeyError: 
             continue""" 
+        stopped = budget.exhausted(processor.requests)
+        if stopped:
+            break
         processor.process(url, category)
+    if html_archive is not None:
+        html_archive.close()
+
+    crawled = {url for url, _, _ in scheduled if url in processor.processed_pages}
+    report = coverage_report(scheduler, scheduled, crawled, processor.requests, budget.elapsed, stopped)
+    save_report(report, data_dir)
 
     if verbose :
         print("Parsing finished.")
+        print_report(report)
     if verbose >= 2:
         print("-----"*10)
+    return report
 
     
\ No newline at end of file
@@ -0,0 +1,430 @@
+# crawler/distributed.py
+
+import os
+import math
+import time
+import zlib
+import shutil
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from contextlib import contextmanager
+
+from crawler.crawler import collect_urls
+from crawler.parsers.page_processor import PageProcessor
+from crawler.archive import HtmlArchive, archive_dir
+from crawler.utils.json_writer import load_saved_urls, delete_saved_urls
+from config import WIKI_URL, BASE_URL, DATA_DIR, CRAWL_PARTITIONS, CRAWL_LEASE_SECONDS, CRAWL_WORKER_DELAY, ARCHIVE_HTML
+
+OUTPUT_DIRS = ("metadata", "pages", "graph")
+
+
+def partition_of(url, partitions=CRAWL_PARTITIONS):
+    """Hash partition of a URL (crc32: stable across processes and hosts, unlike hash())."""
+    return zlib.crc32(url.encode('utf-8')) % partitions
+
+def frontier_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, "frontier.sqlite")
+
+def shard_dir(data_dir, worker_id):
+    """Output directory of a worker, laid out like `data_dir` (metadata/, pages/, graph/, parsed_urls.json)."""
+    return os.path.join(data_dir, "shards", worker_id) + "/"
+
+
+class Frontier:
+    """
+    Shared crawl frontier in a SQLite file, claimed concurrently by the crawl workers.
+
+    URLs are spread over hash partitions. A worker leases a fair share of the partitions that
+    still have work, then leases URLs from them in batches. Its heartbeat renews both leases: once
+    a worker stops heartbeating for `lease_seconds`, its partitions and unfinished URLs are claimed
+    by the others. A connection is not shared between threads or processes, each opens its own Frontier.
+    """
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No crawl frontier at {path}, create it with Frontier.create().")
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        meta = dict(self.conn.execute("SELECT key, value FROM meta").fetchall())
+        self.partitions = int(meta['partitions'])
+        self.lease_seconds = float(meta['lease_seconds'])
+
+    @classmethod
+    def create(cls, path, partitions=CRAWL_PARTITIONS, lease_seconds=CRAWL_LEASE_SECONDS):
+        """Create an empty frontier at `path`, replacing any previous one."""
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.executescript("""
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE frontier (
+                    url TEXT PRIMARY KEY,
+                    category TEXT,
+                    partition INTEGER,
+                    state TEXT DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL DEFAULT 0,
+                    attempts INTEGER DEFAULT 0
+                );
+                CREATE INDEX frontier_partition_state ON frontier (partition, state);
+                CREATE TABLE partitions (partition INTEGER PRIMARY KEY, worker TEXT, lease_expires REAL DEFAULT 0);
+                CREATE TABLE workers (
+                    worker TEXT PRIMARY KEY,
+                    shard TEXT,
+                    heartbeat REAL,
+                    state TEXT DEFAULT 'running',
+                    pages INTEGER DEFAULT 0
+                );
+            """)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                             [('partitions', str(partitions)), ('lease_seconds', str(lease_seconds))])
+            conn.executemany("INSERT INTO partitions (partition) VALUES (?)", [(p,) for p in range(partitions)])
+        conn.close()
+        return cls(path)
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same rows
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def seed(self, urls):
+        """Add (url, category) pairs to the frontier, already known URLs are ignored. Returns the number added."""
+        with self._transaction() as db:
+            before = db.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+            db.executemany("INSERT OR IGNORE INTO frontier (url, category, partition) VALUES (?, ?, ?)",
+                           [(url, category, partition_of(url, self.partitions)) for url, category in urls])
+            return db.execute("SELECT COUNT(*) FROM frontier").fetchone()[0] - before
+
+    def register(self, worker, shard):
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO workers (worker, shard, heartbeat, state, pages) "
+                       "VALUES (?, ?, ?, 'running', COALESCE((SELECT pages FROM workers WHERE worker = ?), 0))",
+                       (worker, shard, time.time(), worker))
+
+    def heartbeat(self, worker):
+        """Renew the worker's liveness and its partition and URL leases."""
+        now = time.time()
+        expires = now + self.lease_seconds
+        with self._transaction() as db:
+            db.execute("UPDATE workers SET heartbeat = ? WHERE worker = ?", (now, worker))
+            db.execute("UPDATE partitions SET lease_expires = ? WHERE worker = ? AND lease_expires > ?", (expires, worker, now))
+            db.execute("UPDATE frontier SET lease_expires = ? WHERE worker = ? AND state = 'leased'", (expires, worker))
+
+    def unregister(self, worker):
+        """Release the worker's partitions and mark it finished (its shard is then complete)."""
+        with self._transaction() as db:
+            db.execute("UPDATE partitions SET worker = NULL, lease_expires = 0 WHERE worker = ?", (worker,))
+            db.execute("UPDATE workers SET state = 'finished' WHERE worker = ?", (worker,))
+
+    def claim(self, worker, batch_size=8):
+        """
+        Lease up to `batch_size` URLs to `worker`, returns them as (url, category) pairs.
+
+        The worker first rebalances its partitions: it drops the ones without claimable URLs and any
+        surplus over its fair share (partitions with work / live workers), then takes free or expired
+        partitions up to that share. URLs are only claimed from its own partitions; an URL whose lease
+        expired (crashed worker) is claimable again.
+        """
+        now = time.time()
+        expires = now + self.lease_seconds
+        with self._transaction() as db:
+            db.execute("UPDATE workers SET heartbeat = ? WHERE worker = ?", (now, worker))
+            live = db.execute("SELECT COUNT(*) FROM workers WHERE state = 'running' AND heartbeat > ?",
+                              (now - self.lease_seconds,)).fetchone()[0]
+            busy = {p for p, in db.execute("SELECT DISTINCT partition FROM frontier "
+                                           "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)", (now,))}
+            leases = db.execute("SELECT partition, worker, lease_expires FROM partitions").fetchall()
+            share = math.ceil(len(busy) / max(live, 1))
+
+            owned = sorted(p for p, w, e in leases if w == worker and e > now)
+            keep = [p for p in owned if p in busy][:share]
+            released = set(owned) - set(keep)
+            free = [p for p, w, e in leases if p in busy and p not in released and (w is None or e <= now)]
+            taken = free[:max(share - len(keep), 0)]
+            if released:
+                db.execute(f"UPDATE partitions SET worker = NULL, lease_expires = 0 "
+                           f"WHERE partition IN ({','.join('?' * len(released))})", list(released))
+            if taken:
+                db.execute(f"UPDATE partitions SET worker = ?, lease_expires = ? "
+                           f"WHERE partition IN ({','.join('?' * len(taken))})", [worker, expires, *taken])
+
+            partitions = keep + taken
+            if not partitions:
+                return []
+            rows = db.execute(f"SELECT url, category FROM frontier WHERE partition IN ({','.join('?' * len(partitions))}) "
+                              f"AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?)) LIMIT ?",
+                              [*partitions, now, batch_size]).fetchall()
+            if rows:
+                db.execute(f"UPDATE frontier SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                           f"WHERE url IN ({','.join('?' * len(rows))})", [worker, expires, *(url for url, _ in rows)])
+            return rows
+
+    def complete(self, worker, url):
+        """Mark a leased URL as done. Ignored if the lease was lost to another worker meanwhile."""
+        with self._transaction() as db:
+            done = db.execute("UPDATE frontier SET state = 'done', lease_expires = 0 "
+                              "WHERE url = ? AND worker = ? AND state = 'leased'", (url, worker)).rowcount
+            db.execute("UPDATE workers SET pages = pages + ? WHERE worker = ?", (done, worker))
+        return bool(done)
+
+    def fail(self, worker, url, max_attempts=3):
+        """Give a leased URL back after an error, or mark it failed after `max_attempts` attempts."""
+        with self._transaction() as db:
+            db.execute("UPDATE frontier SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                       "lease_expires = 0 WHERE url = ? AND worker = ? AND state = 'leased'", (max_attempts, url, worker))
+
+    def remaining(self):
+        """Number of URLs pending or leased."""
+        return self.conn.execute("SELECT COUNT(*) FROM frontier WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def status(self):
+        """{'urls': {state: count}, 'workers': {worker: (state, pages, seconds since heartbeat)}}."""
+        now = time.time()
+        urls = dict(self.conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+        workers = {w: (state, pages, round(now - heartbeat, 1)) for w, state, pages, heartbeat
+                   in self.conn.execute("SELECT worker, state, pages, heartbeat FROM workers ORDER BY worker")}
+        return {'urls': urls, 'workers': workers}
+
+    def workers(self):
+        """[(worker, shard, state)] of the registered workers."""
+        return self.conn.execute("SELECT worker, shard, state FROM workers ORDER BY worker").fetchall()
+
+
+class CrawlWorker:
+    """
+    Claims URLs from the frontier and parses them with `PageProcessor` into its own shard.
+
+    Workers on other hosts need the frontier file and `data_dir` on storage shared with the
+    coordinator (SQLite locking over NFS is unreliable, keep them on one host or a local disk).
+    """
+
+    def __init__(self, data_dir=DATA_DIR, worker_id=None, wiki_url=WIKI_URL, batch_size=8, delay=CRAWL_WORKER_DELAY,
+                 update_only=False, max_attempts=3, poll_interval=0.5, archive=ARCHIVE_HTML, verbose=1):
+        self.data_dir = data_dir
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.shard_dir = shard_dir(data_dir, self.worker_id)
+        self.wiki_url = wiki_url
+        self.batch_size = batch_size
+        self.delay = delay
+        self.update_only = update_only
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.archive = archive
+        self.verbose = verbose
+
+    def _heartbeat(self, stop):
+        frontier = Frontier(frontier_path(self.data_dir))
+        try:
+            while not stop.wait(frontier.lease_seconds / 3):
+                frontier.heartbeat(self.worker_id)
+        finally:
+            frontier.close()
+
+    def run(self):
+        """Crawl until the frontier is drained, returns the number of URLs completed."""
+        frontier = Frontier(frontier_path(self.data_dir))
+        frontier.register(self.worker_id, self.shard_dir)
+        saved_urls = set()
+        if self.update_only:
+            try:
+                saved_urls = set(load_saved_urls(self.data_dir))
+            except FileNotFoundError:
+                pass
+        # the workers share the archive of data_dir, each one appending to its own segments
+        html_archive = HtmlArchive(archive_dir(self.data_dir), writer=self.worker_id) if self.archive else None
+        processor = PageProcessor(wiki_base_url=self.wiki_url, data_dir=self.shard_dir,
+                                  update_only=self.update_only, saved_pages=saved_urls, archive=html_archive)
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(stop,), daemon=True)
+        heartbeat.start()
+        completed = 0
+        try:
+            while True:
+                batch = frontier.claim(self.worker_id, self.batch_size)
+                if not batch:
+                    if frontier.remaining() == 0:
+                        break
+                    time.sleep(self.poll_interval) # other workers hold the remaining URLs
+                    continue
+                for url, category in batch:
+                    try:
+                        processor.process(url, category)
+                    except Exception as e:
+                        print(f"[WARN] {self.worker_id} failed on {url}: {e!r}")
+                        frontier.fail(self.worker_id, url, self.max_attempts)
+                        continue
+                    completed += frontier.complete(self.worker_id, url)
+                    if self.delay:
+                        time.sleep(self.delay)
+        finally:
+            stop.set()
+            heartbeat.join()
+            frontier.unregister(self.worker_id)
+            frontier.close()
+            if html_archive is not None:
+                html_archive.close()
+        if self.verbose:
+            print(f"Worker {self.worker_id} finished: {completed} URLs.")
+        return completed
+
+
+def run_worker(**kwargs):
+    """Process entry point: CrawlWorker(**kwargs).run()."""
+    return CrawlWorker(**kwargs).run()
+
+def seed_frontier(data_dir=DATA_DIR, base_url=BASE_URL, wiki_url=WIKI_URL, update_only=False,
+                  partitions=CRAWL_PARTITIONS, lease_seconds=CRAWL_LEASE_SECONDS, verbose=1):
+    """Collect the URLs to crawl (as `crawl` does) into a new frontier, returns it."""
+    saved_urls = set()
+    if update_only:
+        try:
+            saved_urls = set(load_saved_urls(data_dir))
+        except FileNotFoundError:
+            print(f"[WARN] Failed to load saved urls from {data_dir}.")
+    else:
+        delete_saved_urls(data_dir)
+    shutil.rmtree(os.path.join(data_dir, "shards"), ignore_errors=True)
+
+    urls = [(url, category) for url, category in collect_urls(base_url=base_url, wiki_url=wiki_url, verbose=verbose)
+            if url not in saved_urls]
+    frontier = Frontier.create(frontier_path(data_dir), partitions=partitions, lease_seconds=lease_seconds)
+    added = frontier.seed(urls)
+    if verbose:
+        print(f"Frontier seeded with {added} URLs over {partitions} partitions ({len(saved_urls)} already saved).")
+    return frontier
+
+def start_workers(n_workers, data_dir=DATA_DIR, **kwargs):
+    """Start `n_workers` local worker processes (see CrawlWorker for the kwargs), returns them."""
+    processes = []
+    for i in range(n_workers):
+        worker_id = f"{socket.gethostname()}-{os.getpid()}-w{i}"
+        process = multiprocessing.Process(target=run_worker, kwargs=dict(kwargs, data_dir=data_dir, worker_id=worker_id),
+                                          name=worker_id)
+        process.start()
+        processes.append(process)
+    return processes
+
+def merge_shards(data_dir=DATA_DIR, verbose=1):
+    """
+    Move the worker shards into the standard crawl output of `data_dir`, returns the number of files merged.
+
+    Shards of workers that finished cleanly are merged first and win. A crashed worker may have left a
+    page half written before its lease expired and another worker redid it, so its files only fill in
+    the pages missing from the others.
+    """
+    frontier = Frontier(frontier_path(data_dir))
+    workers = frontier.workers()
+    frontier.close()
+    workers.sort(key=lambda w: w[2] != 'finished')
+
+    merged = 0
+    parsed_urls = []
+    for worker, shard, state in workers:
+        if not os.path.isdir(shard):
+            continue
+        for sub in OUTPUT_DIRS:
+            source = os.path.join(shard, sub)
+            if not os.path.isdir(source):
+                continue
+            target = os.path.join(data_dir, sub)
+            os.makedirs(target, exist_ok=True)
+            with os.scandir(source) as it:
+                for entry in it:
+                    destination = os.path.join(target, entry.name)
+                    if state != 'finished' and os.path.exists(destination):
+                        continue
+                    os.replace(entry.path, destination)
+                    merged += 1
+        try:
+            parsed_urls.extend(load_saved_urls(shard))
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(shard)
+        if verbose >= 2:
+            print(f"Merged shard of {worker} ({state}).")
+
+    if parsed_urls:
+        with open(os.path.join(data_dir, "parsed_urls.json"), "a", encoding="utf-8") as f:
+            f.write("".join(url + "\n" for url in parsed_urls))
+    return merged
+
+def distributed_crawl(n_workers=4, update_only=False, verbose=1, base_url=BASE_URL, wiki_url=WIKI_URL, data_dir=DATA_DIR,
+                      partitions=CRAWL_PARTITIONS, lease_seconds=CRAWL_LEASE_SECONDS, delay=CRAWL_WORKER_DELAY, batch_size=8):
+    """
+    `crawl` with `n_workers` local worker processes sharing a frontier, same output in `data_dir`.
+
+    Returns the frontier status (URLs per state, URLs completed by each worker).
+    """
+    seed_frontier(data_dir, base_url=base_url, wiki_url=wiki_url, update_only=update_only,
+                  partitions=partitions, lease_seconds=lease_seconds, verbose=verbose).close()
+    processes = start_workers(n_workers, data_dir=data_dir, wiki_url=wiki_url, batch_size=batch_size, delay=delay,
+                              update_only=update_only, verbose=int(verbose >= 2))
+    for process in processes:
+        process.join()
+
+    frontier = Frontier(frontier_path(data_dir))
+    status = frontier.status()
+    if frontier.remaining():
+        # every worker died: the URLs left can be finished with `python -m crawler.distributed work`
+        print(f"[WARN] {frontier.remaining()} URLs left in the frontier.")
+    frontier.close()
+    merged = merge_shards(data_dir, verbose=verbose)
+
+    if verbose:
+        print(f"Distributed crawl finished: {status['urls']}, {merged} files merged.")
+    if verbose >= 2:
+        for worker, (state, pages, _) in status['workers'].items():
+            print(f"{worker:<32} {state:<10} {pages:>7} URLs")
+        print("-----"*10)
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl with several workers sharing a SQLite frontier.")
+    parser.add_argument("command", choices=["run", "seed", "work", "merge", "status"],
+                        help="run: seed, start --workers local workers and merge. The steps can also be run separately, "
+                             "e.g. `seed` once, `work` on every host, then `merge`.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--wiki-url", default=WIKI_URL)
+    parser.add_argument("--update-only", action="store_true")
+    parser.add_argument("--partitions", type=int, default=CRAWL_PARTITIONS)
+    parser.add_argument("--lease", type=float, default=CRAWL_LEASE_SECONDS, help="Lease duration, in seconds.")
+    parser.add_argument("--delay", type=float, default=CRAWL_WORKER_DELAY, help="Politeness delay of each worker.")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        distributed_crawl(args.workers, update_only=args.update_only, verbose=2, base_url=args.base_url,
+                          wiki_url=args.wiki_url, data_dir=args.data_dir, partitions=args.partitions,
+                          lease_seconds=args.lease, delay=args.delay)
+    elif args.command == "seed":
+        seed_frontier(args.data_dir, base_url=args.base_url, wiki_url=args.wiki_url, update_only=args.update_only,
+                      partitions=args.partitions, lease_seconds=args.lease).close()
+    elif args.command == "work":
+        for process in start_workers(args.workers, data_dir=args.data_dir, wiki_url=args.wiki_url,
+                                     delay=args.delay, update_only=args.update_only):
+            process.join()
+    elif args.command == "merge":
+        print(merge_shards(args.data_dir, verbose=2), "files merged.")
+    else:
+        frontier = Frontier(frontier_path(args.data_dir))
+        print(frontier.status())
+        frontier.close()
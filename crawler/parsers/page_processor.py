@@ -13,19 +13,25 @@ from crawler.utils.helpers import (
 
 from crawler.schemas import ChunkData, DocumentData
 from crawler.utils.json_writer import save_data, save_graph, save_doc, save_url
+from tracing import traced, count
 
 
 class PageProcessor:
-    def __init__(self, wiki_base_url: str, data_dir: str, update_only=False, saved_pages=set()):
+    def __init__(self, wiki_base_url: str, data_dir: str, update_only=False, saved_pages=set(), on_page=None, archive=None):
         """
         :param wiki_base_url: Base URL for the wiki (used for title extraction).
         :param persist: Whether to persist extracted data to disk.
+        :param on_page: Optional callback on_page(doc, chunks, graph), called once a page is parsed and saved.
+        :param archive: Optional HtmlArchive (crawler/archive.py) the fetched pages are appended to.
         """
         self.wiki_base_url = wiki_base_url
         self.data_dir = data_dir
         self.processed_pages = set()
         self.update_only = update_only
         self.saved_pages = saved_pages
+        self.on_page = on_page
+        self.archive = archive
+        self.requests = 0
 
 
     def process(self, url: str, category: str, include_subpages: bool = True) -> None:
@@ -42,17 +48,30 @@ class PageProcessor:
                 if self.update_only:
                     if page_url in self.saved_pages:
                         continue
-                result = self._parse_page(page_url, category)
+                html = self._fetch(page_url, category, parent=url)
+                result = self._parse_page(page_url, category, html=html)
                 if result:
-                    doc, chunks, graph = result
                     self.processed_pages.add(page_url)
-
-                    if self.data_dir:
-                        title = get_trailing_parts(page_url, self.wiki_base_url)
-                        save_doc(doc, title, outdir=self.data_dir)
-                        save_data(chunks, title, outdir=self.data_dir)
-                        save_graph(graph, title, outdir=self.data_dir)
-                        save_url(url, outdir=self.data_dir)
+                    self._save(page_url, url, *result)
+
+    def _save(self, page_url: str, url: str, doc: DocumentData, chunks: List[ChunkData], graph: dict) -> None:
+        """Save a parsed page (url: the URL given to `process` that led to it) and call on_page."""
+        if self.data_dir:
+            title = get_trailing_parts(page_url, self.wiki_base_url)
+            save_doc(doc, title, outdir=self.data_dir)
+            save_data(chunks, title, outdir=self.data_dir)
+            save_graph(graph, title, outdir=self.data_dir)
+            save_url(url, outdir=self.data_dir)
+        if self.on_page:
+            self.on_page(doc, chunks, graph)
+
+    def _fetch(self, url: str, category: str, parent: str = None) -> str:
+        """HTML of a page, appended to the archive if any. An empty string if it failed to load."""
+        response = getdata(url)
+        self.requests += 1
+        if response and self.archive is not None:
+            self.archive.write(url, response, category=category, parent=parent)
+        return response or ""
 
     def _extract_subpages(self, url: str) -> List[str]:
         """
@@ -63,6 +82,7 @@ class PageProcessor:
                 return list()
         
         response = getdata(url)
+        self.requests += 1
         if response:
             soup = BeautifulSoup(response, "html.parser")
             subpages = []
@@ -75,11 +95,13 @@ class PageProcessor:
             print(f"[WARN] Failed to load {url}.")
             return list()
 
-    def _parse_page(self, url: str, category: str) -> Tuple[DocumentData, List[ChunkData], dict]:
+    @traced("parse_page")
+    def _parse_page(self, url: str, category: str, html: str = None) -> Tuple[DocumentData, List[ChunkData], dict]:
         """
         Parses a single wiki page, returning its metadata, extracted chunks, and link graph.
+        The page is fetched unless its `html` is given (see crawler/replay.py).
         """
-        response = getdata(url)
+        response = getdata(url) if html is None else html
         if response:
             soup = BeautifulSoup(response, 'html.parser')
             title = get_trailing_parts(url, self.wiki_base_url)
@@ -124,6 +146,8 @@ class PageProcessor:
                 text = doc_overview,
                 links=doc_links
             )
+            count("pages_parsed")
+            count("chunks_parsed", len(chunks))
 
             return document, chunks, graph
         else:
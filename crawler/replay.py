@@ -0,0 +1,85 @@
+# crawler/replay.py
+
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+from crawler.archive import HtmlArchive, archive_dir
+from crawler.parsers.page_processor import PageProcessor
+from crawler.utils.json_writer import delete_saved_urls
+from config import WIKI_URL, DATA_DIR, REPLAY_WORKERS
+
+_worker = {}
+
+
+def _init_worker(directory, data_dir, wiki_url):
+    _worker['archive'] = HtmlArchive(directory)
+    _worker['processor'] = PageProcessor(wiki_base_url=wiki_url, data_dir=data_dir)
+
+def _replay_batch(entries):
+    """Reparse archived pages and save them as the crawl does, returns (pages, chunks)."""
+    archive, processor = _worker['archive'], _worker['processor']
+    pages = chunks = 0
+    for entry in entries:
+        result = processor._parse_page(entry['url'], entry['category'], html=archive.read(entry))
+        if result:
+            # parsed_urls.json is appended to by every process, one short O_APPEND write per page
+            processor._save(entry['url'], entry['parent'] or entry['url'], *result)
+            pages += 1
+            chunks += len(result[1])
+    return pages, chunks
+
+def replay(data_dir=DATA_DIR, wiki_url=WIKI_URL, workers=REPLAY_WORKERS, batch_size=64, directory=None, verbose=1):
+    """
+    Reparse the archived HTML of `data_dir` (crawler/archive.py) with the current PageProcessor, without
+    any network access, and rewrite the crawl output of `data_dir`. Returns (pages, chunks).
+
+    The latest record of every URL is parsed, in `workers` processes reading the segments in order.
+    """
+    directory = directory or archive_dir(data_dir)
+    entries = [entry for entry in HtmlArchive(directory).index().values() if entry.get('category')]
+    if not entries:
+        print(f"[WARN] No archived pages in {directory}.")
+        return 0, 0
+    entries.sort(key=lambda entry: (entry['segment'], entry['offset']))
+    batches = [entries[i:i + batch_size] for i in range(0, len(entries), batch_size)]
+    workers = workers or os.cpu_count()
+
+    delete_saved_urls(data_dir)
+    if verbose:
+        print(f"Reparsing {len(entries)} archived pages with {workers} workers...")
+    start = time.perf_counter()
+    pages = chunks = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(directory, data_dir, wiki_url)) as executor:
+        for n_pages, n_chunks in tqdm(executor.map(_replay_batch, batches), total=len(batches),
+                                      desc="Replaying " + directory, disable=(verbose < 2)):
+            pages += n_pages
+            chunks += n_chunks
+    if verbose:
+        seconds = time.perf_counter() - start
+        print(f"Replay finished: {pages} pages, {chunks} chunks in {seconds:.1f}s ({pages / seconds:.0f} pages/s).")
+    if verbose >= 2:
+        print("-----"*10)
+    return pages, chunks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reparse the archived HTML of a crawl, without network access.")
+    parser.add_argument("command", choices=["run", "status"],
+                        help="run: reparse the archive into the crawl output, status: archive contents.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--wiki-url", default=WIKI_URL)
+    parser.add_argument("--workers", type=int, default=REPLAY_WORKERS)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        replay(args.data_dir, wiki_url=args.wiki_url, workers=args.workers, verbose=2)
+    else:
+        archive = HtmlArchive(archive_dir(args.data_dir))
+        entries = list(archive.entries())
+        print(f"{len(archive.index())} pages, {len(entries)} records, {len(archive.segments())} segments, "
+              f"{archive.nbytes() / 2**20:.1f}MB")
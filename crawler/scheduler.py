@@ -0,0 +1,157 @@
+# crawler/scheduler.py
+
+import os
+import math
+import json
+import time
+
+from crawler.archive import HtmlArchive, archive_dir
+from crawler.utils.helpers import get_trailing_parts, clean_filename
+from crawler.utils.json_reader import iter_json_files
+from config import (WIKI_URL, DATA_DIR, CRAWL_SCORE_WEIGHTS, CRAWL_CATEGORY_WEIGHTS, CRAWL_STALE_DAYS,
+                    CRAWL_MAX_REQUESTS, CRAWL_MAX_SECONDS)
+
+
+def link_in_degree(graph_dir):
+    """{title: number of crawled pages linking to it}, from the graph files of a previous crawl."""
+    in_degree = {}
+    if not os.path.isdir(graph_dir):
+        return in_degree
+    for graph in iter_json_files(graph_dir, 'graph.json'):
+        targets = {target for links in graph.values() for target, label in links if label != 'chunk'}
+        for target in targets:
+            in_degree[target] = in_degree.get(target, 0) + 1
+    return in_degree
+
+def last_fetched(urls, data_dir=DATA_DIR, wiki_url=WIKI_URL):
+    """{url: timestamp of its last fetch}: the archive date, or the mtime of the saved page file."""
+    dates = {url: entry['date'] for url, entry in HtmlArchive(archive_dir(data_dir)).index().items()}
+    fetched = {}
+    for url in urls:
+        if url in dates:
+            fetched[url] = dates[url]
+            continue
+        page_file = os.path.join(data_dir, "pages", f"{clean_filename(get_trailing_parts(url, wiki_url))}_page.json")
+        if os.path.exists(page_file):
+            fetched[url] = os.path.getmtime(page_file)
+    return fetched
+
+
+class CrawlScheduler:
+    """
+    Orders the URLs of a crawl by value, so that a partial (budgeted) crawl refreshes the pages that
+    matter most first. The score of a page is the weighted sum (`weights`) of three terms in [0, 1]:
+
+    - in_degree: log(1 + pages linking to it) / log(1 + max), from the link graph of the last crawl;
+    - staleness: time since its last fetch / `stale_days` (capped at 1, 1 if never fetched);
+    - category: `category_weights` of its category (0.5 for the categories not listed).
+    """
+
+    def __init__(self, data_dir=DATA_DIR, wiki_url=WIKI_URL, weights=CRAWL_SCORE_WEIGHTS,
+                 category_weights=CRAWL_CATEGORY_WEIGHTS, stale_days=CRAWL_STALE_DAYS, now=None):
+        self.data_dir = data_dir
+        self.wiki_url = wiki_url
+        self.weights = weights
+        self.category_weights = category_weights
+        self.stale_seconds = stale_days * 86400
+        self.now = now or time.time()
+        self.in_degree = link_in_degree(os.path.join(data_dir, "graph"))
+        self.fetched = {}
+
+    def title(self, url):
+        return get_trailing_parts(url, self.wiki_url)
+
+    def staleness(self, url):
+        fetched = self.fetched.get(url)
+        if fetched is None:
+            return 1.0
+        return min(max(self.now - fetched, 0.0) / self.stale_seconds, 1.0)
+
+    def score(self, url, category, max_log_degree):
+        degree = math.log1p(self.in_degree.get(self.title(url), 0)) / max_log_degree if max_log_degree else 0.0
+        return (self.weights.get('in_degree', 0.0) * degree
+                + self.weights.get('staleness', 0.0) * self.staleness(url)
+                + self.weights.get('category', 0.0) * self.category_weights.get(category, 0.5))
+
+    def order(self, urls):
+        """
+        (url, category, score) triples of the (url, category) pairs, best first (ties broken by URL).
+        A URL collected under several categories is kept once, with its best scoring one.
+        """
+        self.fetched = last_fetched({url for url, _ in urls}, self.data_dir, self.wiki_url)
+        max_log_degree = math.log1p(max(self.in_degree.values(), default=0))
+        scored = [(url, category, self.score(url, category, max_log_degree)) for url, category in urls]
+        scored.sort(key=lambda item: (-item[2], item[0], item[1]))
+        seen = set()
+        return [item for item in scored if not (item[0] in seen or seen.add(item[0]))]
+
+
+class CrawlBudget:
+    """Request and wall time budget of a crawl run, None for no limit."""
+
+    def __init__(self, max_requests=CRAWL_MAX_REQUESTS, max_seconds=CRAWL_MAX_SECONDS):
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.start = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def limited(self):
+        return self.max_requests is not None or self.max_seconds is not None
+
+    def exhausted(self, requests):
+        """'requests' or 'time' once a limit is reached, None before."""
+        if self.max_requests is not None and requests >= self.max_requests:
+            return 'requests'
+        if self.max_seconds is not None and self.elapsed >= self.max_seconds:
+            return 'time'
+        return None
+
+
+def coverage_report(scheduler, scheduled, crawled, requests, seconds, stopped=None):
+    """
+    Coverage of a crawl run over its `scheduled` (url, category, score) triples, `crawled` being the set of
+    URLs processed by this run. A page is fresh if it was fetched less than `stale_days` ago (this run included).
+    "weighted" shares count each page by 1 + its in-degree, so they measure the share of the links covered.
+    """
+    now = time.time()
+    fresh = {url for url, _, _ in scheduled
+             if url in crawled or (url in scheduler.fetched and now - scheduler.fetched[url] < scheduler.stale_seconds)}
+    weight = {url: 1 + scheduler.in_degree.get(scheduler.title(url), 0) for url, _, _ in scheduled}
+    total = sum(weight.values()) or 1
+    by_category = {}
+    for url, category, _ in scheduled:
+        counts = by_category.setdefault(category, [0, 0, 0])
+        counts[0] += 1
+        counts[1] += url in crawled
+        counts[2] += url in fresh
+    return {
+        'scheduled': len(scheduled),
+        'crawled': len(crawled),
+        'requests': requests,
+        'seconds': round(seconds, 2),
+        'stopped': stopped,
+        'crawled_share': len(crawled) / max(len(scheduled), 1),
+        'crawled_weighted_share': sum(weight[url] for url in crawled if url in weight) / total,
+        'fresh_share': len(fresh) / max(len(scheduled), 1),
+        'fresh_weighted_share': sum(weight[url] for url in fresh) / total,
+        'categories': {category: {'scheduled': n, 'crawled': c, 'fresh': f}
+                       for category, (n, c, f) in sorted(by_category.items())},
+        'next': [url for url, _, _ in scheduled if url not in crawled][:20],
+    }
+
+def print_report(report):
+    print(f"Crawled {report['crawled']}/{report['scheduled']} pages ({report['crawled_share']:.1%}, "
+          f"{report['crawled_weighted_share']:.1%} of the links) with {report['requests']} requests "
+          f"in {report['seconds']:.1f}s" + (f", stopped by the {report['stopped']} budget" if report['stopped'] else ""))
+    print(f"Fresh: {report['fresh_share']:.1%} of the pages, {report['fresh_weighted_share']:.1%} of the links")
+    for category, counts in report['categories'].items():
+        print(f"  {category:<16} {counts['crawled']:>6} crawled  {counts['fresh']:>6} fresh / {counts['scheduled']:>6}")
+
+def save_report(report, data_dir=DATA_DIR):
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, "crawl_coverage.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
@@ -2,7 +2,7 @@
 from dataclasses import dataclass
 from typing import List, Tuple
 
-@dataclass
+@dataclass(slots=True)
 class ChunkData:
     url: str
     chunk_id: str
@@ -13,7 +13,7 @@ class ChunkData:
     links: List[Tuple[str, str]]
     token_count: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class DocumentData:
     url: str
     title: str
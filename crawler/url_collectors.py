@@ -1,10 +1,10 @@
 # crawler/url_collectors.py
 
 from bs4 import BeautifulSoup
-from crawler.utils.helpers import getdata, extract_urls
+from crawler.utils.helpers import getdata, extract_urls, count_colons
 from config import BASE_URL
 
-def process_characters_urls(url= 'https://onepiece.fandom.com/wiki/List_of_Canon_Characters'):
+def process_characters_urls(url= 'https://onepiece.fandom.com/wiki/List_of_Canon_Characters', base_url=BASE_URL):
     response = getdata(url)
     if response:
         soup = BeautifulSoup(response, 'html.parser')
@@ -19,7 +19,7 @@ def process_characters_urls(url= 'https://onepiece.fandom.com/wiki/List_of_Canon
                     first_column = columns[1]
                     link = first_column.find('a', href=True)
                     if link:
-                        characters_urls.append(BASE_URL + link['href'])
+                        characters_urls.append(base_url + link['href'])
         return characters_urls
     else:
         print(f"[WARN] Failed to load {url}.")
@@ -33,7 +33,7 @@ def process_urls_recursively(url, base_url, depth, current_depth=0):
     if response:
         soup = BeautifulSoup(response, 'html.parser')
         urls = extract_urls(soup, base_url)
-        colons_urls = [u for u in urls if u.count(':') > current_depth]
+        colons_urls = [u for u in urls if count_colons(u) > current_depth]
 
         for colons_url in colons_urls:
             urls.extend(process_urls_recursively(colons_url, base_url, depth, current_depth + 1))
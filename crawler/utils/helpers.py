@@ -3,7 +3,9 @@
 import requests
 from urllib.parse import urlparse
 import re
+import sys
 import time
+from tracing import span, count
 
    
 
@@ -12,13 +14,20 @@ def getdata(url):
     startTime = time.time()
     timeToRun = 3
     endTime = startTime + timeToRun
-    try:
-        r = requests.get(url, timeout=timeToRun) 
-        if (time.time() >= endTime):
+    with span("getdata"):
+        try:
             r = requests.get(url, timeout=timeToRun) 
-    except:
-        return None 
-    return r.text if r.status_code == 200 else None
+            if (time.time() >= endTime):
+                r = requests.get(url, timeout=timeToRun) 
+        except:
+            count("fetch_errors")
+            return None 
+    if r.status_code != 200:
+        count("fetch_errors")
+        return None
+    count("pages_fetched")
+    count("bytes_fetched", len(r.content))
+    return r.text
 
 def extract_urls(soup, base_url):
     """Extract URLs from the soup object."""
@@ -33,6 +42,14 @@ def clean_filename(text: str) -> str:
     """Replaces '/', '-', and '.' with '_' in the given text."""
     return re.sub(r'[\/\-.]', '_', text)
 
+def count_colons(url):
+    """Colons of a URL outside of its host, so that a port (e.g. a local mirror) does not count."""
+    return url.count(':') - urlparse(url).netloc.count(':')
+
+def is_page_url(url):
+    """Whether a URL is an article page: no namespace (Category:, File:...) and no subpage."""
+    return count_colons(url) == 1 and urlparse(url).path.count('/') == 2
+
 def get_trailing_parts(url, base_url):
     base_path = urlparse(base_url).path.rstrip("/")  # Normalize base URL
     trailing_parts = urlparse(url).path.replace(base_path, "", 1).lstrip("/") 
@@ -48,7 +65,8 @@ def process_hrefs(hrefs):
         if link.startswith('/wiki/'):
             # Remove the '/wiki/' part and any section part after '#'
             processed_link = re.sub(r'^/wiki/|#.*$', '', link)
-            processed_links.append((processed_link, text))
+            # interned: the same few thousand titles are linked from every page
+            processed_links.append((sys.intern(processed_link), text))
 
     return processed_links
 
@@ -0,0 +1,134 @@
+# crawler/utils/json_reader.py
+
+import os
+import re
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import LOADER_WORKERS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def read_json(file_path):
+    """Read and decode a single JSON file (orjson when available, stdlib json otherwise)."""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def list_json_files(directory, suffix):
+    """List the files of `directory` ending with `suffix`, sorted for a deterministic order."""
+    with os.scandir(directory) as it:
+        return sorted(entry.path for entry in it if entry.is_file() and entry.name.endswith(suffix))
+
+def iter_json_files(directory, suffix, max_workers=LOADER_WORKERS):
+    """
+    Yield the decoded content of every `suffix` file in `directory`.
+
+    Files are read by a thread pool, but only a bounded window of them is in flight at
+    any time, so the caller can stream through the corpus without holding it all in memory.
+    Results are yielded in file order.
+    """
+    file_paths = list_json_files(directory, suffix)
+    if max_workers is None or max_workers <= 1:
+        for file_path in file_paths:
+            yield read_json(file_path)
+        return
+
+    window = max_workers * 4
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for file_path in file_paths:
+            pending.append(executor.submit(read_json, file_path))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class _JsonStream:
+    """Text of a JSON file read block by block, decoded one value at a time with json.JSONDecoder.raw_decode."""
+
+    _decoder = json.JSONDecoder()
+    _whitespace = re.compile(r'[ \t\r\n]*')
+
+    def __init__(self, f, block_size):
+        self.f = f
+        self.block_size = block_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read(self):
+        block = self.f.read(self.block_size)
+        self.buffer = self.buffer[self.pos:] + block
+        self.pos = 0
+        self.eof = not block
+
+    def peek(self):
+        """Next non-whitespace character, '' at the end of the file."""
+        while True:
+            self.pos = self._whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._read()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the read window, found {self.peek()!r}.")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next value, reading more of the file until it is complete and followed by a delimiter."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # a number cut by the end of the block decodes too: only accept it once a delimiter follows
+                if self.eof or self.buffer[end - 1] in '}]"' \
+                        or self._whitespace.match(self.buffer, end).end() < len(self.buffer):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._read()
+
+def iter_json_arrays(file_path, keys, block_size=1 << 20):
+    """
+    Yield the (key, item) pairs of the top-level arrays `keys` of a JSON object file, in file order.
+
+    The file is read `block_size` characters at a time and only one item is decoded at once, so a large
+    file (e.g. a node-link graph) can be consumed without holding the whole document in memory.
+    The other members are skipped, item by item when they are arrays.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f, block_size)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            if stream.peek() == '[':
+                stream.expect('[')
+                if stream.peek() == ']':
+                    stream.expect(']')
+                else:
+                    while True:
+                        item = stream.value()
+                        if key in keys:
+                            yield key, item
+                        if stream.peek() == ']':
+                            stream.expect(']')
+                            break
+                        stream.expect(',')
+            else:
+                stream.value()
+            if stream.peek() == '}':
+                return
+            stream.expect(',')
@@ -6,7 +6,9 @@ from dataclasses import asdict
 from typing import List
 from crawler.schemas import ChunkData, DocumentData
 from crawler.utils.helpers import clean_filename
+from tracing import traced
 
+@traced("save_data")
 def save_data(chunks: List[ChunkData], title: str, outdir="data"):
     """Saves extracted data to a JSON file."""
     os.makedirs(f"{outdir}/metadata", exist_ok=True)
@@ -16,6 +18,7 @@ def save_data(chunks: List[ChunkData], title: str, outdir="data"):
     with open(file_path, "w", encoding="utf-8") as f:
         json.dump([asdict(c) for c in chunks], f, indent=2, ensure_ascii=False)
 
+@traced("save_doc")
 def save_doc(doc: DocumentData, title: str, outdir="data"):
     """Saves extracted doc to a JSON file."""
     os.makedirs(f"{outdir}/pages", exist_ok=True)
@@ -25,6 +28,7 @@ def save_doc(doc: DocumentData, title: str, outdir="data"):
     with open(file_path, "w", encoding="utf-8") as f:
         json.dump(asdict(doc), f, indent=2, ensure_ascii=False)
 
+@traced("save_graph")
 def save_graph(graph: dict, title: str, outdir="data"):
     """Saves extracted graph to a JSON file."""
     os.makedirs(f"{outdir}/graph", exist_ok=True)
@@ -34,6 +38,7 @@ def save_graph(graph: dict, title: str, outdir="data"):
     with open(file_path, "w", encoding="utf-8") as f:
         json.dump(graph, f, indent=2, ensure_ascii=False)
 
+@traced("save_url")
 def save_url(url: str, outdir="data"):
     """Saves extracted data to a JSON file."""
     os.makedirs(f"{outdir}", exist_ok=True)
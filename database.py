@@ -1,19 +1,64 @@
 # database.py
 
-import psycopg2
-from psycopg2.extras import execute_values, execute_batch
-from pgvector.psycopg2 import register_vector
-from config import DB_CONFIG, EMBEDDING_DIM
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values, execute_batch
+    from pgvector.psycopg2 import register_vector
+except ImportError:
+    psycopg2 = None
+from config import DB_CONFIG, EMBEDDING_DIM, VECTOR_STORAGE, RERANK_FACTOR, DB_BACKEND
+from embedding.quantization import save_embedding_matrix
+from embedding.projection import PCAProjection
+from embedding.lexical import hybrid_search
+from tracing import traced, count
+from registry import load_backend
 
-import pandas as pd
+import numpy as np
+
+
+# Lexical document of a chunk: title and section words weigh more (tsvector weights A and B) than the text
+_TEXT_SEARCH = """
+    setweight(to_tsvector('english', coalesce(replace(title, '_', ' '), '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(replace(section, '_', ' '), '')), 'B') ||
+    to_tsvector('english', coalesce(text, ''))
+"""
+
+def open_database(backend=DB_BACKEND, **kwargs):
+    """Open the embedding store selected in config.py: 'postgres' (EmbeddingDatabase) or 'local' (LocalEmbeddingDatabase)."""
+    return load_backend('database', backend)(**kwargs)
 
 class EmbeddingDatabase:
 
     columns = ['id', 'chunk_id', 'url', 'title', 'section', 'text', 'embedding']
 
-    def __init__(self):
+    def __init__(self, storage=VECTOR_STORAGE):
+        """
+        Args:
+            storage: 'vector' stores float32 vectors; 'halfvec' stores float16 vectors (half the
+                table and index), searched in one pass with no rerank: there is no full precision copy;
+                'binary' keeps the float32 vectors (the table does not shrink) and indexes their sign
+                bits (32x smaller index), searches run on the bits and rerank against the float32 vectors.
+        """
+        if storage not in ('vector', 'halfvec', 'binary'):
+            raise ValueError("storage must be 'vector', 'halfvec' or 'binary'.")
+        if psycopg2 is None:
+            raise ImportError("EmbeddingDatabase requires psycopg2 and pgvector, or set DB_BACKEND = \"local\" in config.py.")
+        self.storage = storage
         self.conn = self.connect_db()
         register_vector(self.conn)
+        self._projection = None
+
+    @property
+    def vector_type(self):
+        return 'halfvec' if self.storage == 'halfvec' else 'vector'
+
+    def _space_column(self, space):
+        """Column holding the vectors of a similarity space: 'full' or 'reduced' (see `embedding.projection`)."""
+        if space == 'full':
+            return 'embedding'
+        if space == 'reduced':
+            return 'embedding_reduced'
+        raise ValueError("space must be 'full' or 'reduced'.")
 
     def connect_db(self):
         """Establish a connection to the PostgreSQL database."""
@@ -31,10 +76,39 @@ class EmbeddingDatabase:
                     category TEXT,
                     section TEXT,
                     text TEXT,
-                    embedding vector({EMBEDDING_DIM})
+                    embedding {self.vector_type}({EMBEDDING_DIM}),
+                    embedding_reduced vector,
+                    projection_version TEXT,
+                    text_search tsvector GENERATED ALWAYS AS ({_TEXT_SEARCH}) STORED
                 );
             """)
             self.conn.commit()
+        self.create_lexical_index()
+
+    def create_lexical_index(self):
+        """Add the generated `text_search` column to a table created without it, and its GIN index (kept up to date by every insert)."""
+        with self.conn.cursor() as cur:
+            cur.execute(f"ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS text_search tsvector GENERATED ALWAYS AS ({_TEXT_SEARCH}) STORED;")
+            cur.execute("CREATE INDEX IF NOT EXISTS embeddings_text_search ON embeddings USING gin (text_search);")
+            self.conn.commit()
+
+    def create_vector_index(self):
+        """Create the HNSW index matching the storage if it does not exist yet (build it after the bulk insert)."""
+        if self.storage == 'binary':
+            indexed, ops = f"(binary_quantize(embedding)::bit({EMBEDDING_DIM}))", "bit_hamming_ops"
+        else:
+            indexed, ops = "embedding", f"{self.vector_type}_ip_ops"
+        with self.conn.cursor() as cur:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS embeddings_hnsw ON embeddings USING hnsw ({indexed} {ops});")
+            self.conn.commit()
+
+    def table_sizes(self):
+        """On-disk size in bytes of the embeddings table and of its indexes."""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_table_size('embeddings'), pg_indexes_size('embeddings'), "
+                        "pg_relation_size(to_regclass('embeddings_hnsw'))")
+            table, indexes, hnsw = cur.fetchone()
+        return {'table': table, 'indexes': indexes, 'hnsw': hnsw or 0}
 
     def delete_embeddings_table(self):
         """Drop the embeddings table if it exists."""
@@ -45,34 +119,111 @@ class EmbeddingDatabase:
     def to_pandas(self):
         with self.conn.cursor() as cur:
             cur.execute(
-                    "SELECT chunk_id, url, title, category, section, text, embedding FROM embeddings",
+                    "SELECT chunk_id, url, title, category, section, text, embedding::vector FROM embeddings",
                 )
             tuples_list  = cur.fetchall()
+        import pandas as pd
         df = pd.DataFrame(tuples_list, columns=["chunk_id", "url", "title", "category", "section", "text", "embedding"])
         return df
 
 
+    @traced("insert_embeddings")
     def insert_embeddings(self, data, page_size):
-        """Insert embeddings data into the embeddings table."""
+        """Insert embeddings data into the embeddings table (with their reduced vectors if a projection is fitted)."""
+        projection = self.get_projection()
         with self.conn.cursor() as cur:
             rows = [
-                (doc['chunk_id'], doc['url'], doc['title'], doc['category'], doc['section'], doc['text'], doc['embedding'])
+                (doc['chunk_id'], doc['url'], doc['title'], doc['category'], doc['section'], doc['text'], doc['embedding'],
+                 projection.transform(doc['embedding']) if projection else None, projection.version if projection else None)
                 for doc in data if doc['embedding'].any()
             ]
+            count("vectors_inserted", len(rows))
             execute_batch(cur, """
-                INSERT INTO embeddings (chunk_id, url, title, category, section, text, embedding)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                INSERT INTO embeddings (chunk_id, url, title, category, section, text, embedding, embedding_reduced, projection_version)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 ON CONFLICT (chunk_id) DO NOTHING;
             """, rows, page_size=page_size)
             self.conn.commit()
 
-    def dense_search(self,subset, embedding, topk):
+    def save_projection(self, projection):
+        """Store a fitted projection matrix under its version, it becomes the current projection."""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS projections (
+                    version TEXT PRIMARY KEY,
+                    model_name TEXT,
+                    dim INTEGER,
+                    components BYTEA,
+                    explained_variance_ratio BYTEA,
+                    created_at TIMESTAMP DEFAULT now()
+                );
+            """)
+            cur.execute("""
+                INSERT INTO projections (version, model_name, dim, components, explained_variance_ratio)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (version) DO UPDATE SET created_at = now();
+            """, (projection.version, projection.model_name, projection.dim,
+                  psycopg2.Binary(projection.components.tobytes()),
+                  psycopg2.Binary(projection.explained_variance_ratio.tobytes())))
+            self.conn.commit()
+        self._projection = projection
+
+    def get_projection(self, version=None):
+        """The stored projection of the given version (the latest one by default), None if there is none."""
+        if version is None and self._projection is not None:
+            return self._projection
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('projections')")
+            if cur.fetchone()[0] is None:
+                return None
+            if version is None:
+                cur.execute("SELECT model_name, dim, components, explained_variance_ratio FROM projections "
+                            "ORDER BY created_at DESC LIMIT 1")
+            else:
+                cur.execute("SELECT model_name, dim, components, explained_variance_ratio FROM projections "
+                            "WHERE version = %s", (version,))
+            result = cur.fetchone()
+        if result is None:
+            return None
+        model_name, dim, components, ratio = result
+        projection = PCAProjection(np.frombuffer(bytes(components), dtype=np.float32).reshape(dim, -1),
+                                   np.frombuffer(bytes(ratio), dtype=np.float32), model_name=model_name)
+        if version is None:
+            self._projection = projection
+        return projection
+
+    def update_reduced_embeddings(self, projection, page_size=1000):
+        """(Re)compute the reduced vector of every row with `projection`."""
+        chunk_ids, matrix = self.get_embedding_matrix()
+        reduced = projection.transform(matrix)
+        with self.conn.cursor() as cur:
+            cur.execute("ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS embedding_reduced vector, "
+                        "ADD COLUMN IF NOT EXISTS projection_version TEXT;")
+            execute_batch(cur, """
+                UPDATE embeddings SET embedding_reduced = %s, projection_version = %s WHERE chunk_id = %s;
+            """, [(vector, projection.version, chunk_id) for chunk_id, vector in zip(chunk_ids, reduced)],
+                page_size=page_size)
+            self.conn.commit()
+
+    def sample_embedding_matrix(self, n):
+        """Float32 matrix of (up to) n embeddings sampled at random."""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT embedding::vector FROM embeddings ORDER BY random() LIMIT %s", (n,))
+            rows = cur.fetchall()
+        return np.array([embedding for embedding, in rows], dtype=np.float32).reshape(len(rows), EMBEDDING_DIM)
+
+    @traced("dense_search")
+    def dense_search(self,subset, embedding, topk, space='full'):
+        """Top-k chunks of `subset`, `embedding` being a vector of the given space ('full' or 'reduced')."""
+        count("queries")
+        column = self._space_column(space)
+        vector_type = self.vector_type if space == 'full' else 'vector'
         with self.conn.cursor() as cur:
             cur.execute(
-                        """
-                    SELECT chunk_id, embedding  <#> %s::vector AS similarity
+                        f"""
+                    SELECT chunk_id, {column}  <#> %s::{vector_type} AS similarity
                     FROM embeddings
-                    WHERE chunk_id = ANY(%s)
+                    WHERE chunk_id = ANY(%s) AND {column} IS NOT NULL
                     ORDER BY similarity
                     LIMIT %s
                     """,
@@ -81,12 +232,115 @@ class EmbeddingDatabase:
             top_chunks = cur.fetchall()
         return [(chunk_id, -similarity) for chunk_id, similarity in top_chunks] if top_chunks else list()
     
-    def get_embedding(self, chunk_id):
+    @traced("search")
+    def search(self, embedding, topk, rerank_factor=RERANK_FACTOR):
+        """
+        Top-k most similar chunks of the whole table.
+
+        With binary storage, the bit index returns topk * rerank_factor candidates by Hamming
+        distance, which are reordered by their float32 inner product. With halfvec storage the
+        float16 index gives the result directly (no rerank, `rerank_factor` is unused).
+        """
+        count("queries")
+        with self.conn.cursor() as cur:
+            if self.storage == 'binary':
+                cur.execute(
+                        f"""
+                    SELECT chunk_id, embedding <#> %s::vector AS similarity
+                    FROM (
+                        SELECT chunk_id, embedding
+                        FROM embeddings
+                        ORDER BY binary_quantize(embedding)::bit({EMBEDDING_DIM}) <~> binary_quantize(%s::vector)
+                        LIMIT %s
+                    ) candidates
+                    ORDER BY similarity
+                    LIMIT %s
+                    """,
+                    (embedding, embedding, topk * rerank_factor, topk)
+                    )
+            else:
+                cur.execute(
+                        f"""
+                    SELECT chunk_id, embedding  <#> %s::{self.vector_type} AS similarity
+                    FROM embeddings
+                    ORDER BY similarity
+                    LIMIT %s
+                    """,
+                    (embedding, topk)
+                    )
+            top_chunks = cur.fetchall()
+        return [(chunk_id, -similarity) for chunk_id, similarity in top_chunks] if top_chunks else list()
+
+    @traced("lexical_search")
+    def lexical_search(self, query, topk, subset=None):
+        """
+        Top-k chunks matching any word of `query` through the GIN index, among `subset` if given.
+
+        Postgres has no BM25: chunks are ranked by ts_rank (weighted term frequency, divided by
+        1 + log(length)), `LocalEmbeddingDatabase.lexical_search` computes exact BM25 scores.
+        """
+        count("queries")
+        subset_filter = "AND chunk_id = ANY(%s)" if subset is not None else ""
+        params = (query, list(subset), topk) if subset is not None else (query, topk)
         with self.conn.cursor() as cur:
-            cur.execute("SELECT embedding FROM embeddings WHERE chunk_id = %s", (chunk_id,))
+            cur.execute(
+                        f"""
+                    SELECT chunk_id, ts_rank(text_search, query, 1) AS score
+                    FROM embeddings, CAST(replace(plainto_tsquery('english', %s)::text, ' & ', ' | ') AS tsquery) AS query
+                    WHERE text_search @@ query {subset_filter}
+                    ORDER BY score DESC
+                    LIMIT %s
+                    """,
+                    params
+                    )
+            return [(chunk_id, float(score)) for chunk_id, score in cur.fetchall()]
+
+    def hybrid_search(self, query, embedding, topk, subset=None, candidates=None):
+        """Reciprocal rank fusion of the vector and lexical rankings (see `embedding.lexical.hybrid_search`)."""
+        return hybrid_search(self, query, embedding, topk, subset=subset, candidates=candidates)
+
+    def get_embedding(self, chunk_id, space='full'):
+        column = self._space_column(space)
+        with self.conn.cursor() as cur:
+            cur.execute(f"SELECT {column}::vector FROM embeddings WHERE chunk_id = %s", (chunk_id,))
             result = cur.fetchone()
         return result[0] if result else None
     
+    def get_embedding_matrix(self, space='full', batch_size=10000):
+        """
+        Fetch every stored embedding of a space as (chunk_ids, float32 matrix of shape (N, dim)).
+        Rows are streamed by a server side cursor into a preallocated matrix, `batch_size` at a time.
+        """
+        column = self._space_column(space)
+        projection = self.get_projection() if space == 'reduced' else None
+        dim = EMBEDDING_DIM if space == 'full' else (projection.dim if projection else 0)
+        with self.conn.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM embeddings WHERE {column} IS NOT NULL")
+            n_rows = cur.fetchone()[0]
+        chunk_ids = []
+        matrix = np.empty((n_rows, dim), dtype=np.float32)
+        with self.conn.cursor(name="embedding_matrix") as cur:
+            cur.itersize = batch_size
+            cur.execute(f"SELECT chunk_id, {column}::vector FROM embeddings WHERE {column} IS NOT NULL ORDER BY id")
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                start, end = len(chunk_ids), len(chunk_ids) + len(rows)
+                if end > len(matrix):  # rows committed between the count and the scan
+                    matrix = np.concatenate([matrix, np.empty((end - len(matrix), dim), dtype=np.float32)])
+                for i, (chunk_id, embedding) in enumerate(rows, start):
+                    chunk_ids.append(chunk_id)
+                    matrix[i] = embedding
+        self.conn.commit()
+        return chunk_ids, matrix[:len(chunk_ids)]
+
+    def export_embedding_matrix(self, path, dtype='int8'):
+        """Save every embedding to a local .npz file, int8 quantized by default (see `embedding.quantization`)."""
+        chunk_ids, matrix = self.get_embedding_matrix()
+        save_embedding_matrix(path, chunk_ids, matrix, dtype=dtype)
+        return path
+
     def get_text(self, chunk_id):
         with self.conn.cursor() as cur:
             cur.execute("SELECT text FROM embeddings WHERE chunk_id = %s", (chunk_id,))
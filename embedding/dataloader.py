@@ -1,17 +1,15 @@
 # embedding/dataloader.py
 
-import os
-import json
+from crawler.utils.json_reader import iter_json_files
+
+def iter_all_chunks(metadata_dir):
+    """Stream the chunks of all JSON files, reading the files concurrently."""
+    for chunks in iter_json_files(metadata_dir, 'data.json'):
+        yield from chunks
 
 def load_all_chunks(metadata_dir):
     """Load all JSON files and concatenate all chunks."""
-    all_chunks = []
-    for fname in os.listdir(metadata_dir):
-        if fname.endswith('data.json'):
-            with open(os.path.join(metadata_dir, fname), 'r', encoding='utf-8') as f:
-                chunks = json.load(f)
-                all_chunks.extend(chunks)
-    return all_chunks
+    return list(iter_all_chunks(metadata_dir))
 
 
 def batch_chunks(chunks, batch_size=32):
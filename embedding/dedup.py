@@ -0,0 +1,93 @@
+# embedding/dedup.py
+
+import re
+import zlib
+import numpy as np
+
+from config import DEDUP_THRESHOLD, MINHASH_PERMUTATIONS, LSH_BANDS
+
+_PRIME = (1 << 31) - 1
+_TOKEN = re.compile(r'\w+')
+
+
+def shingles(text, k=5):
+    """Hashes of the word k-grams of a text (the whole text if it is shorter than k words)."""
+    words = np.array([zlib.crc32(w.encode('utf-8')) for w in _TOKEN.findall(text.lower())], dtype=np.int64)
+    if words.size == 0:
+        return words
+    if words.size < k:
+        k = words.size
+    # Polynomial combination of k consecutive word hashes, vectorized over all positions
+    combined = np.zeros(words.size - k + 1, dtype=np.int64)
+    for i in range(k):
+        combined = (combined * 1000003 + words[i:words.size - k + 1 + i]) % _PRIME
+    return np.unique(combined)
+
+class MinHasher:
+    """MinHash signatures with `num_perm` random affine permutations modulo a Mersenne prime."""
+
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, seed=0):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _PRIME, num_perm, dtype=np.int64)[:, None]
+        self.b = rng.integers(0, _PRIME, num_perm, dtype=np.int64)[:, None]
+
+    def signature(self, shingle_hashes):
+        if shingle_hashes.size == 0:
+            return np.full(self.num_perm, _PRIME, dtype=np.int64)
+        return ((self.a * shingle_hashes[None, :] + self.b) % _PRIME).min(axis=1)
+
+def near_duplicate_clusters(texts, threshold=DEDUP_THRESHOLD, num_perm=MINHASH_PERMUTATIONS, bands=LSH_BANDS, k=5):
+    """
+    Group near-duplicate texts with MinHash + LSH banding.
+
+    Texts with equal signatures share one representative. The distinct signatures are cut into
+    `bands` bands and visited in order: a text becomes a duplicate of the most similar earlier
+    representative sharing one of its bands, if their estimated Jaccard similarity (fraction of
+    equal signature values) reaches `threshold`, and a representative itself otherwise. Every
+    duplicate is thus within `threshold` of the representative whose embedding it gets, chains
+    (A~B, B~C but A far from C) are not merged.
+
+    Returns:
+        An array giving, for every text, the index of its representative (itself for representatives).
+    """
+    n = len(texts)
+    rows = num_perm // bands
+    hasher = MinHasher(num_perm)
+    signatures = np.stack([hasher.signature(shingles(text, k)) for text in texts]) if n else np.empty((0, num_perm))
+
+    # Exact duplicates (the bulk of the boilerplate) only take part in the banding once
+    representative = np.arange(n)
+    distinct = {}
+    for i in range(n):
+        representative[i] = distinct.setdefault(signatures[i].tobytes(), i)
+
+    # buckets[band][key]: representatives whose band `band` hashes to `key`
+    buckets = [{} for _ in range(bands)]
+    for i in distinct.values():
+        keys = [signatures[i, band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+        candidates = sorted({r for band, key in enumerate(keys) for r in buckets[band].get(key, ())})
+        if candidates:
+            agreement = (signatures[candidates] == signatures[i]).mean(axis=1)
+            best = int(np.argmax(agreement))  # the earliest one on ties
+            if agreement[best] >= threshold:
+                representative[i] = candidates[best]
+                continue
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(i)
+
+    # exact copies follow the representative of their first occurrence
+    return representative[representative]
+
+def deduplicate_chunks(chunks, threshold=DEDUP_THRESHOLD, num_perm=MINHASH_PERMUTATIONS, bands=LSH_BANDS):
+    """
+    Split chunks into the ones to embed and the near-duplicates to map onto them.
+
+    Returns:
+        representatives: The chunks to embed (one per cluster).
+        duplicates: {duplicate chunk_id: representative chunk_id}.
+    """
+    roots = near_duplicate_clusters([chunk['text'] for chunk in chunks], threshold, num_perm, bands)
+    representatives = [chunk for i, chunk in enumerate(chunks) if roots[i] == i]
+    duplicates = {chunks[i]['chunk_id']: chunks[root]['chunk_id'] for i, root in enumerate(roots) if root != i}
+    return representatives, duplicates
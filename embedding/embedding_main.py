@@ -1,15 +1,26 @@
 # main.py
 
-from config import METADATA_DIR
-from database import EmbeddingDatabase
-from embedding.model import OllamaEmbedding, process_batch
+import os
+import json
+from config import METADATA_DIR, DATA_DIR, DEDUP_THRESHOLD, MODEL_NAME, PROJECTION_DIM, PROJECTION_SAMPLE
+from database import open_database
+from embedding.model import load_embedding_model, process_batch
 from embedding.dataloader import load_all_chunks, batch_chunks
+from embedding.dedup import deduplicate_chunks
+from embedding.projection import PCAProjection, topk_overlap
 from tqdm import tqdm
 
 
-def embedding_main(batch_size = 64, reset_table = True, verbose=1):
+def embedding_main(batch_size = 64, reset_table = True, dedup = True, dedup_threshold = DEDUP_THRESHOLD, verbose=1,
+                   model = None, db = None, metadata_dir = METADATA_DIR, data_dir = DATA_DIR):
+    """
+    Embed every crawled chunk and store it in the embedding database.
 
-    model = OllamaEmbedding()
+    model and db default to load_embedding_model() and open_database(), metadata_dir and data_dir to
+    the config ones (the benchmarks pass stand-ins and a temporary directory).
+    """
+
+    model = model or load_embedding_model()
     #model = vllmEmbedding(base_url="http://localhost:8000/v1")
     #model = HuggingFaceEmbedding(model_name=MODEL_NAME, fp16=True)
     #chunker = TextChunker(model=MODEL_NAME, max_tokens=MAX_TOKENS, overlap=64)
@@ -17,22 +28,49 @@ def embedding_main(batch_size = 64, reset_table = True, verbose=1):
     if verbose:
         print("Loading and Preprocessing texts...")
     # Load + preprocess 
-    all_chunks = load_all_chunks(METADATA_DIR)
+    all_chunks = load_all_chunks(metadata_dir)
     #all_chunks = chunker.preprocess_texts(all_chunks)
     #chunker.save_indices(all_chunks)
 
     if verbose:
         print("Total Number of Chunks : ", len(all_chunks))
 
+    # Near-duplicate chunks (shared infobox/navbox text, boilerplate sections) are embedded once
+    chunks_to_embed, duplicates = all_chunks, {}
+    if dedup:
+        chunks_to_embed, duplicates = deduplicate_chunks(all_chunks, threshold=dedup_threshold)
+    # Written even when empty: a stale mapping would make the graph build skip chunks that are no longer duplicates
+    with open(os.path.join(data_dir, "chunk_duplicates.json"), 'w', encoding='utf-8') as f:
+        json.dump(duplicates, f, ensure_ascii=False)
+    if dedup:
+        if verbose:
+            saved = len(duplicates) / max(len(all_chunks), 1)
+            print(f"Near-duplicates : {len(duplicates)}, embedding {len(chunks_to_embed)} chunks ({saved:.1%} of the embedding work saved)")
+
     post_processed_data = [] 
-    for batch in tqdm(batch_chunks(all_chunks, batch_size), total=len(all_chunks)//batch_size, desc="Embedding Chunks...",disable=(verbose<1)):
+    for batch in tqdm(batch_chunks(chunks_to_embed, batch_size), total=len(chunks_to_embed)//batch_size, desc="Embedding Chunks...",disable=(verbose<1)):
         batch_data = process_batch(batch, model)
         post_processed_data.extend(batch_data)
 
+    # Duplicates keep their own text and metadata, with the embedding of their representative
+    if duplicates:
+        embeddings = {record['chunk_id']: record['embedding'] for record in post_processed_data}
+        for chunk in all_chunks:
+            if chunk['chunk_id'] in duplicates:
+                post_processed_data.append({
+                    'chunk_id': chunk['chunk_id'],
+                    'url': chunk['url'],
+                    'title': chunk['title'],
+                    'section': chunk['section'],
+                    'category': chunk['category'],
+                    'text': chunk['text'],
+                    'embedding': embeddings[duplicates[chunk['chunk_id']]]
+                })
+
      # Setup
     if verbose:
-        print("Connecting to PostgresSQL Database...")
-    db = EmbeddingDatabase()
+        print("Connecting to the Embedding Database...")
+    db = db or open_database()
 
     if reset_table:
         db.delete_embeddings_table()
@@ -46,6 +84,8 @@ def embedding_main(batch_size = 64, reset_table = True, verbose=1):
 
 
     db.insert_embeddings(post_processed_data, page_size=1000)
+    # No-op when the index exists: a table created before (or by another stage) gets it too
+    db.create_vector_index()
     
     db.check_embeddings_table()
     db.close_connection()
@@ -55,3 +95,23 @@ def embedding_main(batch_size = 64, reset_table = True, verbose=1):
     if verbose >= 2:
         print("-----"*10)
 
+
+def projection_main(dim = PROJECTION_DIM, sample_size = PROJECTION_SAMPLE, overlap_k = 10, verbose=1):
+    """Fit the PCA projection on a sample of the table, store it and the reduced vectors of every row."""
+    db = open_database()
+
+    if verbose:
+        print(f"Fitting a {dim}-d projection on {sample_size} sampled embeddings...")
+    projection = PCAProjection.fit(db.sample_embedding_matrix(sample_size), dim, model_name=MODEL_NAME)
+    db.save_projection(projection)
+    db.update_reduced_embeddings(projection, page_size=1000)
+
+    if verbose:
+        _, full = db.get_embedding_matrix(space='full')
+        overlap = topk_overlap(full, projection.transform(full), k=overlap_k)
+        print(f"Projection {projection.version}: {projection.dim} dims, "
+              f"{projection.explained_variance_ratio.sum():.1%} of the energy kept, "
+              f"top-{overlap_k} overlap with the full dimension {overlap:.1%}")
+    if verbose >= 2:
+        print("-----"*10)
+    db.close_connection()
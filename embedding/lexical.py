@@ -0,0 +1,149 @@
+# embedding/lexical.py
+
+import re
+import math
+from collections import Counter
+
+import numpy as np
+
+from config import BM25_K1, BM25_B, BM25_FIELD_WEIGHTS, RRF_K, RERANK_FACTOR
+
+_TOKEN = re.compile(r"[^\W_]+")  # words, "_" splits the page titles (Gomu_Gomu_no_Mi)
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class BM25Index:
+    """
+    Append-only BM25 inverted index over the title, section and text fields of the chunks.
+
+    Term frequencies are summed over the fields with `field_weights` (a simplified BM25F), the
+    document length being the weighted token count. Each `add` builds a segment holding its posting
+    lists as NumPy arrays in CSR layout (terms, offsets, docs, tfs). A new segment at least as
+    large as the previous one is merged into it (binary counter), so every posting is rewritten
+    O(log N) times and a query searches O(log N) segments per term.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B, field_weights=BM25_FIELD_WEIGHTS):
+        self.k1 = k1
+        self.b = b
+        self.field_weights = field_weights
+        self.vocab = {}
+        self.df = np.zeros(0, dtype=np.int32)
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.doc_ids = []
+        self.segments = []
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @property
+    def nbytes(self):
+        """Memory held by the posting lists and document lengths."""
+        return self.doc_len.nbytes + self.df.nbytes + sum(a.nbytes for segment in self.segments for a in segment)
+
+    def _term_id(self, term):
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.vocab)
+        return term_id
+
+    def add(self, docs, id_field='chunk_id'):
+        """Index a batch of chunk dicts, their `id_field` is returned by the searches."""
+        terms, rows, tfs = [], [], []
+        lengths = np.zeros(len(docs), dtype=np.float32)
+        first = len(self.doc_ids)
+        for i, doc in enumerate(docs):
+            counts = Counter()
+            for field, weight in self.field_weights.items():
+                for token, tf in Counter(tokenize(doc.get(field))).items():
+                    counts[token] += tf * weight
+            for term, tf in counts.items():
+                terms.append(self._term_id(term))
+                rows.append(first + i)
+                tfs.append(tf)
+            lengths[i] = sum(counts.values())
+            self.doc_ids.append(doc[id_field])
+
+        self.doc_len = np.concatenate([self.doc_len, lengths])
+        if len(self.vocab) > len(self.df):
+            self.df = np.concatenate([self.df, np.zeros(len(self.vocab) - len(self.df), dtype=np.int32)])
+        if terms:
+            terms = np.array(terms, dtype=np.int32)
+            np.add.at(self.df, terms, 1)  # one (term, doc) pair per doc
+            self.segments.append(self._segment(terms, np.array(rows, dtype=np.int32), np.array(tfs, dtype=np.float32)))
+        while len(self.segments) > 1 and len(self.segments[-1][2]) >= len(self.segments[-2][2]):
+            self._merge(self.segments.pop(-2), self.segments.pop())
+
+    @staticmethod
+    def _segment(terms, rows, tfs):
+        order = np.lexsort((rows, terms))
+        terms, rows, tfs = terms[order], rows[order], tfs[order]
+        unique, starts = np.unique(terms, return_index=True)
+        offsets = np.append(starts, len(terms)).astype(np.int64)
+        return unique, offsets, rows, tfs
+
+    def _merge(self, *segments):
+        terms = np.concatenate([np.repeat(t, np.diff(o)) for t, o, _, _ in segments])
+        rows = np.concatenate([r for _, _, r, _ in segments])
+        tfs = np.concatenate([f for _, _, _, f in segments])
+        self.segments.append(self._segment(terms, rows, tfs))
+
+    def _postings(self, term_id):
+        for terms, offsets, rows, tfs in self.segments:
+            i = np.searchsorted(terms, term_id)
+            if i < len(terms) and terms[i] == term_id:
+                yield rows[offsets[i]:offsets[i + 1]], tfs[offsets[i]:offsets[i + 1]]
+
+    def scores(self, query):
+        """BM25 score of every indexed document for `query` (zeros for the documents matching no term)."""
+        n = len(self.doc_ids)
+        scores = np.zeros(n, dtype=np.float32)
+        if n == 0:
+            return scores
+        avgdl = max(float(self.doc_len.mean()), 1e-9)
+        for term, qtf in Counter(tokenize(query)).items():
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            df = self.df[term_id]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for rows, tfs in self._postings(term_id):
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[rows] / avgdl)
+                # a document appears once per posting list and in one segment only
+                scores[rows] += qtf * idf * tfs * (self.k1 + 1) / (tfs + norm)
+        return scores
+
+    def search(self, query, topk, subset=None):
+        """Top-k (doc id, score) pairs for `query`, among the ids of `subset` if given."""
+        scores = self.scores(query)
+        rows = np.flatnonzero(scores > 0)
+        if subset is not None:
+            subset = set(subset)
+            rows = rows[[self.doc_ids[i] in subset for i in rows]] if rows.size else rows
+        if rows.size > topk:
+            rows = rows[np.argpartition(-scores[rows], topk - 1)[:topk]]
+        rows = rows[np.argsort(-scores[rows], kind='stable')]
+        return [(self.doc_ids[i], float(scores[i])) for i in rows]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked lists of (id, score) pairs: id -> sum of 1 / (k + rank). Returns (id, fused score) pairs, best first."""
+    fused = {}
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+def hybrid_search(db, query, embedding, topk, subset=None, candidates=None, k=RRF_K):
+    """
+    Reciprocal rank fusion of the dense and lexical rankings of a database (EmbeddingDatabase or
+    LocalEmbeddingDatabase), each cut at `candidates` results (topk * RERANK_FACTOR by default).
+    The dense ranking is `dense_search` over `subset`, or `search` over the whole store.
+    """
+    candidates = candidates or topk * RERANK_FACTOR
+    dense = db.dense_search(subset, embedding, candidates) if subset is not None else db.search(embedding, candidates)
+    lexical = db.lexical_search(query, candidates, subset=subset)
+    return reciprocal_rank_fusion([dense, lexical], k=k)[:topk]
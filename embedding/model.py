@@ -1,19 +1,44 @@
 # embedding/model.py
 
+from abc import ABC, abstractmethod
 import numpy as np
-import ollama
+try:
+    import ollama
+except ImportError:
+    ollama = None
+from config import OLLAMA_HOST, EMBEDDING_BACKEND
+from tracing import traced, count
+from registry import load_backend
 
-class OllamaEmbedding:
-    def __init__(self, model="nomic-embed-text"):
+
+def load_embedding_model(backend=EMBEDDING_BACKEND, **kwargs):
+    """Create the embedding model selected in config.py: 'ollama' (OllamaEmbedding) or 'onnx' (OnnxEmbedding)."""
+    return load_backend('embedding', backend)(**kwargs)
+
+class EmbeddingModel(ABC):
+    """Interface of the embedding backends: encode(texts) returns a (len(texts), dim) float array, one row per text."""
+
+    @abstractmethod
+    def encode(self, texts):
+        ...
+
+class OllamaEmbedding(EmbeddingModel):
+    def __init__(self, model="nomic-embed-text", host=OLLAMA_HOST):
+        if ollama is None:
+            raise ImportError("OllamaEmbedding requires the ollama package, or set EMBEDDING_BACKEND = \"onnx\" in config.py.")
         self.model = model
+        # None uses the default client (OLLAMA_HOST environment variable or localhost:11434)
+        self.client = ollama.Client(host=host) if host else ollama
 
     def encode(self, texts):
-        result = ollama.embed(model=self.model, input=texts)
+        result = self.client.embed(model=self.model, input=texts)
         return np.array(result["embeddings"])
     
 
 
+@traced("process_batch")
 def process_batch(batch_data, embedding_model):
+    count("chunks_embedded", len(batch_data))
     texts = [chunk['text'] for chunk in batch_data]
     embeddings = embedding_model.encode(texts)
 
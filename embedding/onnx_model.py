@@ -0,0 +1,124 @@
+# embedding/onnx_model.py
+
+import os
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+except ImportError:
+    ort = Tokenizer = None
+from config import MODEL_NAME, ONNX_MODEL_DIR, ONNX_QUANTIZE, ONNX_THREADS, ONNX_MAX_LENGTH
+from embedding.model import EmbeddingModel
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def export_onnx(model=MODEL_NAME, output_dir=ONNX_MODEL_DIR, tokenizer=None, opset=17):
+    """
+    Export a HuggingFace encoder to `output_dir`/model.onnx with its fast tokenizer (tokenizer.json).
+
+    `model` is a model name or an already loaded model (then `tokenizer` is required), batch and
+    sequence axes are dynamic. Needs torch and transformers, only for the export.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    if isinstance(model, str):
+        tokenizer = tokenizer or AutoTokenizer.from_pretrained(model, trust_remote_code=True)
+        model = AutoModel.from_pretrained(model, trust_remote_code=True)
+    model.eval()
+    os.makedirs(output_dir, exist_ok=True)
+
+    sample = tokenizer(["an example sentence to trace the encoder", "short"], padding=True, return_tensors="pt")
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']}
+    path = os.path.join(output_dir, MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in input_names), path, input_names=input_names,
+                          output_names=['last_hidden_state'], dynamic_axes=dynamic_axes, opset_version=opset)
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, TOKENIZER_FILE))
+    return path
+
+def quantize_onnx(model_path, output_path):
+    """Dynamic int8 quantization: int8 weights, activations quantized on the fly at each MatMul."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+
+class OnnxEmbedding(EmbeddingModel):
+    """
+    CPU encoder running an exported model (see export_onnx) with ONNX Runtime.
+
+    Texts are tokenized a batch at a time by the Rust tokenizer, sorted by length so that each
+    batch pads to about the same length, mean pooled over the attention mask and L2 normalized.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=ONNX_QUANTIZE, threads=ONNX_THREADS, max_length=ONNX_MAX_LENGTH,
+                 batch_size=32, prefix="", normalize=True):
+        """
+        Args:
+            quantized: Run model.int8.onnx, created from model.onnx by quantize_onnx if missing.
+            threads: Intra-op threads of the session, None for all cores.
+            prefix: Prepended to every text (e.g. "search_document: " for nomic-embed-text).
+        """
+        if ort is None or Tokenizer is None:
+            raise ImportError("OnnxEmbedding requires onnxruntime and tokenizers.")
+        path = os.path.join(model_dir, MODEL_FILE)
+        if quantized:
+            quantized_path = os.path.join(model_dir, QUANTIZED_FILE)
+            if not os.path.exists(quantized_path):
+                quantize_onnx(path, quantized_path)
+            path = quantized_path
+        self.path = path
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.normalize = normalize
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or os.cpu_count()
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        output = self.session.get_outputs()[0]
+        self.output_name = output.name
+        self.dim = output.shape[-1] if isinstance(output.shape[-1], int) else None
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length)
+        padding = self.tokenizer.padding or {}
+        # pad each batch to its longest text only
+        self.tokenizer.enable_padding(pad_id=padding.get('pad_id', 0), pad_token=padding.get('pad_token', '[PAD]'))
+
+    def _run(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': np.array([e.ids for e in encodings], dtype=np.int64), 'attention_mask': mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run([self.output_name], feeds)[0]
+        if hidden.ndim == 3:
+            weights = mask[:, :, None].astype(hidden.dtype)
+            hidden = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1)
+        return hidden.astype(np.float32)
+
+    def encode(self, texts):
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        texts = [self.prefix + text for text in texts]
+        order = np.argsort([len(text) for text in texts], kind='stable')
+        embeddings = None
+        for start in range(0, len(texts), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            batch = self._run([texts[i] for i in rows])
+            if embeddings is None:
+                embeddings = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            embeddings[rows] = batch
+        if self.normalize:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
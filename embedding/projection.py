@@ -0,0 +1,62 @@
+# embedding/projection.py
+
+import hashlib
+import numpy as np
+
+
+class PCAProjection:
+    """
+    Linear projection of the embeddings onto their leading principal directions.
+
+    The directions come from the SVD of the (uncentered) sample: they best preserve the inner
+    products used by `dense_search`, so neighbour rankings in the reduced space stay close to the
+    full dimension ones.
+    """
+
+    def __init__(self, components, explained_variance_ratio, model_name=None):
+        self.components = np.ascontiguousarray(components, dtype=np.float32)  # (dim, EMBEDDING_DIM)
+        self.explained_variance_ratio = np.asarray(explained_variance_ratio, dtype=np.float32)
+        self.model_name = model_name
+        # The version identifies the projection matrix, reduced vectors are tagged with it
+        self.version = hashlib.sha1(self.components.tobytes()).hexdigest()[:12]
+
+    @property
+    def dim(self):
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, sample, dim, model_name=None):
+        """Fit the projection on a (n, EMBEDDING_DIM) sample of embeddings."""
+        X = np.asarray(sample, dtype=np.float32)
+        dim = min(dim, *X.shape)
+        _, s, vt = np.linalg.svd(X, full_matrices=False)
+        energy = s ** 2
+        return cls(vt[:dim], energy[:dim] / energy.sum(), model_name=model_name)
+
+    def transform(self, X):
+        """Project (n, EMBEDDING_DIM) embeddings, or a single one, to the reduced space."""
+        return np.asarray(X, dtype=np.float32) @ self.components.T
+
+def topk_overlap(full, reduced, k=10, n_queries=1000, seed=0):
+    """
+    Mean fraction of the top-k neighbours (inner product, self excluded) found in the full space
+    that are also the top-k neighbours in the reduced space, over `n_queries` sampled rows.
+    """
+    n = len(full)
+    k = min(k, n - 1)
+    if k <= 0:
+        return 1.0
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(n, min(n_queries, n), replace=False)
+
+    def neighbours(X, rows):
+        scores = X[rows] @ X.T
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return np.argpartition(-scores, k, axis=1)[:, :k]
+
+    overlaps = []
+    for start in range(0, len(queries), 256):
+        rows = queries[start:start + 256]
+        for a, b in zip(neighbours(full, rows), neighbours(reduced, rows)):
+            overlaps.append(len(np.intersect1d(a, b)) / k)
+    return float(np.mean(overlaps))
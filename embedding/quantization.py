@@ -0,0 +1,65 @@
+# embedding/quantization.py
+
+import numpy as np
+
+# Number of set bits of every byte value
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+
+def quantize_int8(matrix):
+    """
+    Symmetric int8 quantization with one scale per row.
+
+    Returns:
+        codes: (N, D) int8 array, round(x / scale) in [-127, 127].
+        scales: (N,) float32 array, max(|x|) / 127 of every row.
+    """
+    X = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(X).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(X / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def dequantize_int8(codes, scales):
+    return codes.astype(np.float32) * scales[:, None]
+
+def int8_inner_product(codes, scales, query):
+    """Approximate inner products between the quantized rows and a float query."""
+    return (codes @ np.asarray(query, dtype=np.float32)) * scales
+
+def binary_quantize(matrix):
+    """Sign bits of every dimension packed 8 per byte, as pgvector `binary_quantize` (x > 0)."""
+    return np.packbits(np.asarray(matrix) > 0, axis=-1)
+
+def hamming_distance(packed, query_packed):
+    """Hamming distances between packed bit rows and one packed query."""
+    return _POPCOUNT[np.bitwise_xor(packed, query_packed)].sum(axis=1)
+
+def rerank(candidates, matrix, query, topk):
+    """Reorder candidate rows by their full precision inner product with the query, keep the topk."""
+    scores = matrix[candidates] @ np.asarray(query, dtype=np.float32)
+    order = np.argsort(-scores)[:topk]
+    return candidates[order], scores[order]
+
+def save_embedding_matrix(path, chunk_ids, matrix, dtype='float32'):
+    """
+    Export an embedding matrix to a .npz file.
+
+    Args:
+        dtype: 'float32', 'float16' or 'int8' (codes plus one float32 scale per row, 4x smaller than float32).
+    """
+    if dtype == 'int8':
+        codes, scales = quantize_int8(matrix)
+        np.savez(path, chunk_ids=np.asarray(chunk_ids), codes=codes, scales=scales)
+    elif dtype in ('float32', 'float16'):
+        np.savez(path, chunk_ids=np.asarray(chunk_ids), matrix=np.asarray(matrix, dtype=dtype))
+    else:
+        raise ValueError("dtype must be 'float32', 'float16' or 'int8'.")
+
+def load_embedding_matrix(path):
+    """Load a matrix exported by `save_embedding_matrix` as (chunk_ids, float32 matrix)."""
+    with np.load(path) as data:
+        chunk_ids = data['chunk_ids'].tolist()
+        if 'codes' in data:
+            return chunk_ids, dequantize_int8(data['codes'], data['scales'])
+        return chunk_ids, data['matrix'].astype(np.float32)
@@ -1,11 +1,11 @@
 from knowledge_graph.knowledge_graph import KnowledgeGraph
-from database import EmbeddingDatabase
+from database import open_database
 from config import METADATA_DIR, GRAPH_DIR, DOC_DIR, DATA_DIR
 
 
-def build_main(top_k=3,save_to_local=True, from_local=False, verbose=1):
+def build_main(top_k=3, knn_k=None, knn_method='exact', space='full', save_to_local=True, from_local=False, verbose=1):
     # Setup
-    kg = KnowledgeGraph(data_dir=DATA_DIR, metadata_dir=METADATA_DIR, page_dir=DOC_DIR, graph_dir=GRAPH_DIR, EmbeddingDatabase=EmbeddingDatabase, verbose=verbose)
+    kg = KnowledgeGraph(data_dir=DATA_DIR, metadata_dir=METADATA_DIR, page_dir=DOC_DIR, graph_dir=GRAPH_DIR, EmbeddingDatabase=open_database, verbose=verbose)
 
     if from_local:
         if verbose:
@@ -39,7 +39,7 @@ def build_main(top_k=3,save_to_local=True, from_local=False, verbose=1):
         # Step 2: Connect relevant chunks
         if verbose:
             print("Building Chunk and Page Knowledge Graph...")
-        kg.build(top_k=top_k)    
+        kg.build(top_k=top_k, knn_k=knn_k, knn_method=knn_method, space=space)    
         if verbose >= 2:
             print("Chunk Knowledge Graph Nodes: ",len(kg.chunk_graph.nodes))
             print("Chunk Knowledge Graph Edges: ",len(kg.chunk_graph.edges))
@@ -2,16 +2,22 @@
 
 import os
 import json
+from collections import OrderedDict
 import networkx as nx
 import numpy as np
 from tqdm import tqdm
 from networkx.readwrite import json_graph
 
-from knowledge_graph.utils import load_data_json_files, load_graph_json_files, load_page_json_files
+from knowledge_graph.utils import NODE_ATTRIBUTES, EDGE_ATTRIBUTES, load_chunk_duplicates
+from knowledge_graph.similarity import knn_graph
+from knowledge_graph.tables import CorpusTables
+from config import KNN_LABEL, KNN_MEMORY_BUDGET_MB, PPR_CACHE_SIZE
+from tracing import traced, span
 
 
 class KnowledgeGraph:
-    def __init__(self, data_dir, metadata_dir, page_dir, graph_dir, EmbeddingDatabase,verbose=1):
+    def __init__(self, data_dir, metadata_dir, page_dir, graph_dir, EmbeddingDatabase,verbose=1,
+                 ppr_cache_size=PPR_CACHE_SIZE):
         self.data_dir = data_dir
         self.metadata_dir = metadata_dir
         self.page_dir = page_dir
@@ -22,55 +28,64 @@ class KnowledgeGraph:
         self.chunk_graph = None
         self.page_graph = None
         self.verbose = verbose
+        self._ppr_cache = {}
+        self.ppr_cache_size = ppr_cache_size
 
+    @traced("setup")
     def setup(self):
-        """Setup and build the initial knowledge graph from metadata and edge definitions."""
-
-        metadata_data = load_data_json_files(self.metadata_dir)
-        graph_data = load_graph_json_files(self.graph_dir)
-        page_data = load_page_json_files(self.page_dir)
+        """
+        Setup and build the initial knowledge graph from metadata and edge definitions.
 
-        valid_docs = set()
-        valid_chunks = set()
+        The crawl output is read into compact tables (see knowledge_graph.tables), so every title,
+        chunk id and label string is shared by all the nodes and edges referring to it.
+        """
+        tables = CorpusTables.load(self.metadata_dir, self.page_dir, self.graph_dir)
+        S = tables.strings
+        chunks, pages = tables.chunks, tables.pages
 
         # Add nodes
-        for chunk in metadata_data:
-            chunk_id = chunk['chunk_id']
-            title = chunk['title']
-            category = chunk['category']
-            section = chunk['section']
-
-            self.graph.add_node(chunk_id, title=title, category=category, section=section, type='chunk')
-            valid_chunks.add(chunk_id)
+        for chunk_id, title, category, section in zip(chunks.chunk_id, chunks.title, chunks.category, chunks.section):
+            self.graph.add_node(S[chunk_id], title=S[title], category=S[category], section=S[section], type='chunk')
 
-        for page in page_data:
-            title = page['title']
-            category = page['category']
-
-            self.graph.add_node(title, category=category, type='document')
-            valid_docs.add(title)
+        for title, category in zip(pages.title, pages.category):
+            self.graph.add_node(S[title], category=S[category], type='document')
 
         if self.verbose:
-            print("Valid Document Nodes:", len(valid_docs))
-            print("Valid Chunk Nodes:", len(valid_chunks))
+            print("Valid Document Nodes:", len(set(pages.title)))
+            print("Valid Chunk Nodes:", len(set(chunks.chunk_id)))
+
+        # Add edges (a source appearing in several files has several rows, the graph merges them)
+        sources, targets, labels = tables.links.edges()
+        keep = tables.mask(pages.title)[targets] | (labels == S.get("chunk"))
+        kept = np.flatnonzero(keep)
+        for start in range(0, len(kept), 65536):  # bounded blocks of Python ints
+            rows = kept[start:start + 65536]
+            for source, target, label in zip(sources[rows].tolist(), targets[rows].tolist(), labels[rows].tolist()):
+                self.graph.add_edge(S[source], S[target], label=S[label])
 
-        # Add edges
-        for source, targets in graph_data.items():
-            for target, label in targets:
-                if target in valid_docs or label == "chunk":
-                    self.graph.add_edge(source, target, label=label)
+    @traced("build")
+    def build(self, top_k=3, knn_k=None, knn_method='exact', memory_budget_mb=KNN_MEMORY_BUDGET_MB, space='full'):
+        """
+        Connect chunk nodes directly using top-k nearest neighbors based on vector similarity.
 
-    def build(self, top_k=3):
-        """Connect chunk nodes directly using top-k nearest neighbors based on vector similarity."""
+        Args:
+            top_k: Number of chunks connected per linked page.
+            knn_k: If set, also connect every chunk to its knn_k most similar chunks of the whole corpus.
+            knn_method: 'exact' (blocked matrix multiplication) or 'hnsw' (approximate, requires hnswlib).
+            memory_budget_mb: Memory budget of one similarity block for the exact kNN search.
+            space: 'full' or 'reduced' (projected embeddings, see `embedding.projection`) similarity space.
+        """
         G = self.graph.copy()
         nodes_to_remove = []
+        # Near-duplicates share their representative's embedding, linking to both would be redundant
+        duplicates = load_chunk_duplicates(self.data_dir)
 
         for chunk_node, data in tqdm(G.nodes(data=True), desc="Connecting Chunk Nodes", disable=(self.verbose<2)):
             if data.get('type') != 'chunk':
                 continue
 
             chunk_title = data.get('title')
-            chunk_embedding = self.db.get_embedding(chunk_node)
+            chunk_embedding = self.db.get_embedding(chunk_node, space=space)
             if not isinstance(chunk_embedding,np.ndarray):
                 nodes_to_remove.append(chunk_node)
                 continue
@@ -81,21 +96,192 @@ class KnowledgeGraph:
             for doc_node, label in connected_docs:
                 # Connect the pages
                 G.add_edge(chunk_title, doc_node, label=label)
-                related_chunks = set(G.successors(doc_node)) - {chunk_node}
+                candidates = set(G.successors(doc_node)) | {chunk_node}
+                related_chunks = {c for c in candidates if c != chunk_node and duplicates.get(c) not in candidates}
                 if not related_chunks:
                     continue
 
-                top_chunks = self.db.dense_search(related_chunks, chunk_embedding, top_k)
+                top_chunks = self.db.dense_search(related_chunks, chunk_embedding, top_k, space=space)
                 for (rel_chunk, similarity) in top_chunks:
                     G.add_edge(chunk_node, rel_chunk, weight=similarity, label=label)
 
-        chunk_nodes = [n for n, d in G.nodes(data=True) if d['type'] == 'chunk']
-        page_nodes = [n for n, d in G.nodes(data=True) if d['type'] == 'document']
+        if knn_k:
+            with span("build.knn", k=knn_k, method=knn_method):
+                self._add_similarity_edges(G, knn_k, method=knn_method, memory_budget_mb=memory_budget_mb, space=space)
+
+        self.split_graph(G)
+
+    def split_graph(self, G):
+        """Set the chunk and page knowledge graphs as the chunk and document node subgraphs of G."""
+        chunk_nodes = [n for n, d in G.nodes(data=True) if d.get('type') == 'chunk']
+        page_nodes = [n for n, d in G.nodes(data=True) if d.get('type') == 'document']
 
         self.chunk_graph = G.subgraph(chunk_nodes)
         self.page_graph = G.subgraph(page_nodes)
 
-    
+    def _add_similarity_edges(self, G, k, method='exact', memory_budget_mb=KNN_MEMORY_BUDGET_MB, space='full'):
+        """
+        Add a corpus-wide kNN similarity graph over the chunk embeddings.
+
+        Edges are labelled KNN_LABEL and weighted by similarity. Existing (link based) edges are kept as is.
+        """
+        chunk_ids, embeddings = self.db.get_embedding_matrix(space=space)
+        keep = [i for i, chunk_id in enumerate(chunk_ids) if chunk_id in G]
+        chunk_ids = [chunk_ids[i] for i in keep]
+        embeddings = embeddings[keep]
+        if len(chunk_ids) < 2:
+            return
+
+        if self.verbose:
+            print(f"Building the {k}-NN similarity graph over {len(chunk_ids)} chunks ({method})...")
+        indices, scores = knn_graph(embeddings, k, method=method, memory_budget_mb=memory_budget_mb)
+
+        added = 0
+        for i, chunk_node in enumerate(tqdm(chunk_ids, desc="Adding Similarity Edges", disable=(self.verbose<2))):
+            for j, similarity in zip(indices[i], scores[i]):
+                rel_chunk = chunk_ids[j]
+                if not G.has_edge(chunk_node, rel_chunk):
+                    G.add_edge(chunk_node, rel_chunk, weight=float(similarity), label=KNN_LABEL)
+                    added += 1
+
+        if self.verbose >= 2:
+            print("Similarity Edges:", added)
+
+    def personalized_pagerank(self, seeds, graph_type: str = 'chunk', alpha=0.85, tol=1e-6, max_iter=100,
+                              top_n=10, warm_start=True):
+        """
+        Personalized PageRank for a batch of seed sets, solved together as one sparse power iteration.
+
+        Args:
+            seeds: List of queries. A query is a node, a list of nodes or a {node: weight} dict.
+                On the chunk graph, a page title stands for all the chunks of that page.
+            graph_type: 'chunk' or 'page'.
+            alpha, tol, max_iter: Power iteration parameters (see knowledge_graph.pagerank).
+            top_n: Number of (node, score) pairs returned per query, None for the full score vectors.
+            warm_start: Start from the previous result of identical queries (the last `ppr_cache_size`
+                distinct queries of each graph are kept).
+
+        Returns:
+            A list with the top_n (node, score) pairs of each query, or (nodes, scores matrix) if top_n is None.
+        """
+        if graph_type == 'chunk':
+            G = self.chunk_graph
+        elif graph_type == 'page':
+            G = self.page_graph
+        else:
+            raise ValueError("graph_type must be 'chunk' or 'page'")
+
+        from knowledge_graph.pagerank import transition_matrix, personalized_pagerank  # SciPy
+        cache = self._ppr_cache.get(graph_type)
+        if cache is None or cache['graph'] is not G:
+            nodes, P, dangling = transition_matrix(G)
+            titles = {}
+            for node, title in G.nodes(data='title'):
+                if title is not None:
+                    titles.setdefault(title, []).append(node)
+            cache = {'graph': G, 'nodes': nodes, 'index': {n: i for i, n in enumerate(nodes)},
+                     'titles': titles, 'P': P, 'dangling': dangling, 'results': OrderedDict()}
+            self._ppr_cache[graph_type] = cache
+        index = cache['index']
+
+        keys = []
+        V = np.zeros((len(cache['nodes']), len(seeds)))
+        for j, query in enumerate(seeds):
+            if not isinstance(query, dict):
+                query = {node: 1.0 for node in ([query] if isinstance(query, str) else query)}
+            for node, weight in query.items():
+                if node in index:
+                    V[index[node], j] += weight
+                else:
+                    members = cache['titles'].get(node, [])
+                    for member in members:
+                        V[index[member], j] += weight / len(members)
+            if V[:, j].sum() <= 0:
+                raise ValueError(f"None of the seeds of query {j} are nodes of the {graph_type} graph.")
+            keys.append(tuple(sorted(query.items())))
+
+        x0 = None
+        if warm_start:
+            x0 = V.copy()
+            for j, key in enumerate(keys):
+                if key in cache['results']:
+                    cache['results'].move_to_end(key)
+                    x0[:, j] = cache['results'][key]
+
+        X, iterations = personalized_pagerank(cache['P'], V, dangling=cache['dangling'],
+                                              alpha=alpha, tol=tol, max_iter=max_iter, x0=x0)
+        if warm_start:
+            for j, key in enumerate(keys):
+                cache['results'][key] = X[:, j].copy()
+                cache['results'].move_to_end(key)
+            while len(cache['results']) > self.ppr_cache_size:
+                cache['results'].popitem(last=False)
+        if self.verbose >= 2:
+            print(f"Personalized PageRank: {len(seeds)} queries, {iterations} iterations")
+
+        if top_n is None:
+            return cache['nodes'], X
+        results = []
+        for j in range(X.shape[1]):
+            top = np.argsort(-X[:, j])[:top_n]
+            results.append([(cache['nodes'][i], float(X[i, j])) for i in top])
+        return results
+
+    def layout(self, graph_type: str = 'chunk', iterations=100, n_jobs=1, **kwargs):
+        """
+        Compute a ForceAtlas2 layout (see analytics.layout) and store it as 'x'/'y' node attributes,
+        so that it is saved with the graph. Nodes already laid out start from their previous position.
+        """
+        if graph_type == 'chunk':
+            G = self.chunk_graph
+        elif graph_type == 'page':
+            G = self.page_graph
+        else:
+            raise ValueError("graph_type must be 'chunk' or 'page'")
+
+        from analytics.layout import adjacency, forceatlas2  # SciPy
+        nodes = list(G.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = [(index[u], index[v], d.get('weight', 1.0)) for u, v, d in G.edges(data=True)]
+        src, dst, weights = (np.array(column) for column in zip(*edges)) if edges else (np.array([], dtype=int),) * 3
+        A = adjacency(src, dst, len(nodes), weights)
+
+        pos = None
+        if all('x' in d and 'y' in d for _, d in G.nodes(data=True)):
+            pos = np.array([(d['x'], d['y']) for _, d in G.nodes(data=True)])
+        pos = forceatlas2(A, iterations=iterations, pos=pos, n_jobs=n_jobs, verbose=self.verbose, **kwargs)
+
+        for node, (x, y) in zip(nodes, pos):
+            G.nodes[node]['x'] = float(x)
+            G.nodes[node]['y'] = float(y)
+
+    def to_edgelist(self, graph_type: str = 'chunk'):
+        """
+        Columnar edge and node lists of the chunk or page graph, in the format of
+        knowledge_graph.utils.load_edgelist (used to hand the graph to visualization.cuGraph in memory).
+        """
+        if graph_type == 'chunk':
+            G = self.chunk_graph
+        elif graph_type == 'page':
+            G = self.page_graph
+        else:
+            raise ValueError("graph_type must be 'chunk' or 'page'")
+
+        edge_records = list(G.edges(data=True))
+        edges = {'src': [u for u, _, _ in edge_records], 'dst': [v for _, v, _ in edge_records]}
+        for attr in EDGE_ATTRIBUTES:
+            column = [d.get(attr) for _, _, d in edge_records]
+            if any(value is not None for value in column):
+                edges[attr] = column
+
+        node_records = list(G.nodes(data=True))
+        nodes = {'node': [n for n, _ in node_records]}
+        for attr in NODE_ATTRIBUTES:
+            column = [d.get(attr) for _, d in node_records]
+            if any(value is not None for value in column):
+                nodes[attr] = column
+        return edges, nodes
+
     def save(self, outdir: str, graph_type: str = 'chunk'):
         """
         Save either the chunk knowledge graph or the page knowledge graph graph to disk.
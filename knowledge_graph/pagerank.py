@@ -0,0 +1,75 @@
+# knowledge_graph/pagerank.py
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def transition_matrix(G, nodes=None, weight='weight'):
+    """
+    Row-stochastic transition matrix of a NetworkX graph as a CSR matrix.
+
+    Edges without `weight` count as 1. Returns (nodes, P, dangling) where `dangling` flags
+    the rows without out-going weight.
+    """
+    nodes = list(G.nodes) if nodes is None else list(nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+
+    rows, cols, data = [], [], []
+    for u, v, d in G.edges(data=True):
+        if u in index and v in index:
+            rows.append(index[u])
+            cols.append(index[v])
+            data.append(max(float(d.get(weight, 1.0)), 0.0))
+
+    A = sp.csr_matrix((np.asarray(data, dtype=np.float64), (rows, cols)), shape=(n, n))
+    A.sum_duplicates()
+    out_weight = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inv = np.zeros(n)
+    inv[~dangling] = 1.0 / out_weight[~dangling]
+    P = sp.diags(inv) @ A
+    return nodes, P.tocsr(), dangling
+
+def personalized_pagerank(P, personalization, dangling=None, alpha=0.85, tol=1e-6, max_iter=100, x0=None):
+    """
+    Power iteration for many personalization vectors at once.
+
+    Args:
+        P: (N, N) row-stochastic CSR transition matrix.
+        personalization: (N, B) matrix, one (non negative) personalization vector per column.
+        dangling: (N,) boolean mask of dangling nodes, their mass is sent back to the personalization.
+        alpha: Damping factor.
+        tol: Convergence tolerance, a column stops once its L1 change is below N * tol.
+        max_iter: Maximum number of iterations.
+        x0: Optional (N, B) warm start.
+
+    Returns:
+        (N, B) matrix of scores, each column sums to 1, and the number of iterations run.
+    """
+    V = np.asarray(personalization, dtype=np.float64)
+    if V.ndim == 1:
+        V = V[:, None]
+    n, b = V.shape
+    V = V / V.sum(axis=0, keepdims=True)
+
+    X = V.copy() if x0 is None else np.asarray(x0, dtype=np.float64).reshape(n, b).copy()
+    X = X / X.sum(axis=0, keepdims=True)
+    if dangling is None:
+        dangling = np.asarray(P.sum(axis=1)).ravel() == 0
+
+    PT = P.T.tocsr()
+    active = np.arange(b)
+    iteration = 0
+    for iteration in range(1, max_iter + 1):
+        Xa, Va = X[:, active], V[:, active]
+        dangling_mass = Xa[dangling].sum(axis=0)
+        X_new = alpha * (PT @ Xa + Va * dangling_mass) + (1 - alpha) * Va
+
+        error = np.abs(X_new - Xa).sum(axis=0)
+        X[:, active] = X_new
+        active = active[error >= n * tol]
+        if active.size == 0:
+            break
+
+    return X, iteration
@@ -0,0 +1,126 @@
+# knowledge_graph/retrieval.py
+
+import time
+import heapq
+from functools import lru_cache
+
+import numpy as np
+
+from config import RETRIEVAL_CACHE_SIZE
+
+
+class HybridRetriever:
+    """
+    Query engine over the chunk knowledge graph.
+
+    A question is embedded, seed chunks are retrieved by vector search, and the seeds are
+    expanded over the `chunk_graph` edges. A chunk reached from a seed through a path scores
+    seed_similarity * product(edge weights) * hop_decay ** hops.
+    """
+
+    def __init__(self, db, model, chunk_graph, seed_k=5, max_hops=2, hop_decay=0.5,
+                 time_budget_ms=None, cache_size=RETRIEVAL_CACHE_SIZE):
+        """
+        :param db: EmbeddingDatabase used for the vector search and to fetch chunk texts.
+        :param model: Embedding model with an `encode(texts)` method.
+        :param chunk_graph: Chunk knowledge graph (see KnowledgeGraph.build / load).
+        :param seed_k: Number of seed chunks retrieved by vector search.
+        :param max_hops: Maximum expansion depth from a seed.
+        :param hop_decay: Score multiplier applied per hop.
+        :param time_budget_ms: Stop expanding further seeds once the query took longer than this.
+        :param cache_size: Size of the query embedding, neighbourhood and text LRU caches.
+        """
+        self.db = db
+        self.model = model
+        self.chunk_graph = chunk_graph
+        self.seed_k = seed_k
+        self.max_hops = max_hops
+        self.hop_decay = hop_decay
+        self.time_budget_ms = time_budget_ms
+
+        self.embed = lru_cache(maxsize=cache_size)(self._embed)
+        self.neighbourhood = lru_cache(maxsize=cache_size)(self._neighbourhood)
+        self.get_text = lru_cache(maxsize=cache_size)(self.db.get_text)
+
+    def _embed(self, query):
+        embedding = np.asarray(self.model.encode([query])[0], dtype=np.float32)
+        embedding.setflags(write=False)  # shared through the cache
+        return embedding
+
+    def _neighbourhood(self, chunk_id, max_hops):
+        """
+        Best path weight from `chunk_id` to every chunk within `max_hops` hops.
+
+        Returns a tuple of (chunk_id, path_weight, hops), found best-first over the edge weights.
+        A node keeps one label per hop count: a lighter path that reaches it in fewer hops can still
+        expand further, so it is only pruned by a heavier path that is not longer.
+        """
+        if chunk_id not in self.chunk_graph:
+            return tuple()
+
+        # best[node][h]: heaviest path reaching node in exactly h hops
+        best = {chunk_id: [1.0] + [0.0] * max_hops}
+        reported = set()
+        result = []
+        heap = [(-1.0, 0, chunk_id)]
+        while heap:
+            neg_weight, hops, node = heapq.heappop(heap)
+            weight = -neg_weight
+            if weight < max(best[node][:hops + 1]):
+                continue
+            if node not in reported:
+                reported.add(node)
+                result.append((node, weight, hops))
+            if hops == max_hops:
+                continue
+            for _, neighbour, d in self.chunk_graph.out_edges(node, data=True):
+                path_weight = weight * max(d.get('weight', 0.0), 0.0) * self.hop_decay
+                labels = best.setdefault(neighbour, [0.0] * (max_hops + 1))
+                if path_weight > max(labels[:hops + 2]):
+                    labels[hops + 1] = path_weight
+                    heapq.heappush(heap, (-path_weight, hops + 1, neighbour))
+        return tuple(result)
+
+    def retrieve(self, query, top_k=10, with_text=True):
+        """
+        Rank chunks for `query`.
+
+        Returns:
+            A list of dicts {chunk_id, score, hops, text} sorted by decreasing score.
+        """
+        start = time.perf_counter()
+        embedding = self.embed(query)
+        seeds = self.db.search(embedding, self.seed_k)
+
+        scores = {}
+        for seed, similarity in seeds:
+            for chunk_id, weight, hops in self.neighbourhood(seed, self.max_hops):
+                score = similarity * weight
+                if score > scores.get(chunk_id, (0.0, 0))[0]:
+                    scores[chunk_id] = (score, hops)
+            if self.time_budget_ms is not None and (time.perf_counter() - start) * 1000 > self.time_budget_ms:
+                break
+
+        # Seeds missing from the graph are still valid answers
+        for seed, similarity in seeds:
+            if seed not in scores:
+                scores[seed] = (similarity, 0)
+
+        ranked = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1][0])
+        return [
+            {
+                'chunk_id': chunk_id,
+                'score': float(score),
+                'hops': hops,
+                'text': self.get_text(chunk_id) if with_text else None
+            }
+            for chunk_id, (score, hops) in ranked
+        ]
+
+    def cache_info(self):
+        """Hit/miss statistics of the three caches."""
+        return {
+            'embed': self.embed.cache_info(),
+            'neighbourhood': self.neighbourhood.cache_info(),
+            'text': self.get_text.cache_info()
+        }
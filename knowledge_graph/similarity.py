@@ -0,0 +1,77 @@
+# knowledge_graph/similarity.py
+
+import numpy as np
+
+
+def exact_knn(embeddings, k, memory_budget_mb=512):
+    """
+    Exact k-nearest neighbours (inner product, same score as `EmbeddingDatabase.dense_search`).
+
+    The similarity matrix is never materialized: rows are processed in blocks sized so that
+    one (block x N) score block and its argpartition fit in `memory_budget_mb`.
+
+    Returns:
+        indices: (N, k) int array of neighbour rows, most similar first.
+        scores: (N, k) float32 array of the matching similarities.
+    """
+    X = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n = X.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int64), np.empty((n, 0), dtype=np.float32)
+
+    # Each block row holds N scores plus the N int64 positions returned by argpartition
+    block_size = max(1, int(memory_budget_mb * 2**20 // (n * (X.itemsize + 8))))
+    indices = np.empty((n, k), dtype=np.int64)
+    scores = np.empty((n, k), dtype=np.float32)
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = X[start:stop] @ X.T
+        rows = np.arange(stop - start)
+        block[rows, rows + start] = -np.inf  # no self loops
+
+        top = np.argpartition(block, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        indices[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+
+    return indices, scores
+
+def hnsw_knn(embeddings, k, ef=200, M=16, num_threads=-1):
+    """Approximate k-nearest neighbours with an HNSW index (requires `hnswlib`)."""
+    try:
+        import hnswlib
+    except ImportError as e:
+        raise ImportError("method='hnsw' requires hnswlib: pip install hnswlib") from e
+
+    X = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n, dim = X.shape
+    k = min(k, n - 1)
+
+    index = hnswlib.Index(space='ip', dim=dim)
+    index.init_index(max_elements=n, ef_construction=ef, M=M)
+    index.add_items(X, np.arange(n), num_threads=num_threads)
+    index.set_ef(max(ef, k + 1))
+
+    # Query one extra neighbour since every point finds itself
+    labels, distances = index.knn_query(X, k=k + 1, num_threads=num_threads)
+    similarities = 1.0 - distances  # hnswlib 'ip' distance is 1 - <x, y>
+
+    indices = np.empty((n, k), dtype=np.int64)
+    scores = np.empty((n, k), dtype=np.float32)
+    for i in range(n):
+        keep = labels[i] != i
+        indices[i] = labels[i][keep][:k]
+        scores[i] = similarities[i][keep][:k]
+    return indices, scores
+
+def knn_graph(embeddings, k, method='exact', memory_budget_mb=512, **kwargs):
+    """Dispatch to the exact (blocked matmul) or approximate (HNSW) kNN search."""
+    if method == 'exact':
+        return exact_knn(embeddings, k, memory_budget_mb=memory_budget_mb)
+    elif method == 'hnsw':
+        return hnsw_knn(embeddings, k, **kwargs)
+    else:
+        raise ValueError("method must be 'exact' or 'hnsw'")
@@ -0,0 +1,165 @@
+# knowledge_graph/tables.py
+
+from array import array
+import numpy as np
+
+from knowledge_graph.utils import iter_data_json_files, iter_page_json_files, iter_graph_json_files
+
+
+class StringTable:
+    """Interned strings: every distinct string is stored once, its id being its insertion rank."""
+
+    __slots__ = ('ids', 'strings')
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, i):
+        return self.strings[i]
+
+    def __contains__(self, s):
+        return s in self.ids
+
+    def id(self, s):
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def get(self, s, default=-1):
+        return self.ids.get(s, default)
+
+    def canonical(self, s):
+        """The shared copy of `s` (interned on first use), to reference instead of equal duplicates."""
+        return self.strings[self.id(s)]
+
+
+def _nbytes(*arrays):
+    return sum(a.itemsize * len(a) for a in arrays)
+
+
+class ChunkTable:
+    """Chunk metadata without the texts, one int32 string id column per field."""
+
+    def __init__(self, strings):
+        self.strings = strings
+        self.chunk_id = array('i')
+        self.title = array('i')
+        self.category = array('i')
+        self.section = array('i')
+        self.token_count = array('i')
+
+    def __len__(self):
+        return len(self.chunk_id)
+
+    @property
+    def nbytes(self):
+        return _nbytes(self.chunk_id, self.title, self.category, self.section, self.token_count)
+
+    def append(self, chunk):
+        """Add a chunk dict (as saved by the crawler)."""
+        intern = self.strings.id
+        self.chunk_id.append(intern(chunk['chunk_id']))
+        self.title.append(intern(chunk['title']))
+        self.category.append(intern(chunk['category']))
+        self.section.append(intern(chunk['section']))
+        self.token_count.append(chunk.get('token_count') or 0)
+
+
+class PageTable:
+    """Page metadata: title and category string ids."""
+
+    def __init__(self, strings):
+        self.strings = strings
+        self.title = array('i')
+        self.category = array('i')
+
+    def __len__(self):
+        return len(self.title)
+
+    @property
+    def nbytes(self):
+        return _nbytes(self.title, self.category)
+
+    def append(self, page):
+        self.title.append(self.strings.id(page['title']))
+        self.category.append(self.strings.id(page['category']))
+
+
+class LinkTable:
+    """
+    Adjacency lists of the crawl graph files in CSR layout: the targets and labels of source row i
+    are target[offsets[i]:offsets[i + 1]] and label[...], all as string ids.
+    """
+
+    def __init__(self, strings):
+        self.strings = strings
+        self.source = array('i')
+        self.offsets = array('q', [0])
+        self.target = array('i')
+        self.label = array('i')
+
+    def __len__(self):
+        return len(self.target)
+
+    @property
+    def nbytes(self):
+        return _nbytes(self.source, self.offsets, self.target, self.label)
+
+    def append(self, source, targets):
+        """Add the (target, label) pairs of a source (a source may appear in several rows)."""
+        intern = self.strings.id
+        self.source.append(intern(source))
+        for target, label in targets:
+            self.target.append(intern(target))
+            self.label.append(intern(label))
+        self.offsets.append(len(self.target))
+
+    def edges(self):
+        """(sources, targets, labels) int32 arrays, one entry per edge."""
+        # copies: an array.array exporting its buffer to NumPy could not grow anymore
+        sources = np.repeat(np.array(self.source, dtype=np.int32), np.diff(np.array(self.offsets, dtype=np.int64)))
+        return sources, np.array(self.target, dtype=np.int32), np.array(self.label, dtype=np.int32)
+
+
+class CorpusTables:
+    """
+    The crawl output (chunks, pages and link graph) as compact columnar tables sharing one StringTable.
+
+    A title, chunk id or label is stored once however many chunks and links refer to it, and a link
+    costs two int32 ids instead of a list holding two strings.
+    """
+
+    def __init__(self):
+        self.strings = StringTable()
+        self.chunks = ChunkTable(self.strings)
+        self.pages = PageTable(self.strings)
+        self.links = LinkTable(self.strings)
+
+    @classmethod
+    def load(cls, metadata_dir, page_dir, graph_dir):
+        """Stream the crawl JSON files into tables, no file content is kept as dicts."""
+        tables = cls()
+        for chunk in iter_data_json_files(metadata_dir):
+            tables.chunks.append(chunk)
+        for page in iter_page_json_files(page_dir):
+            tables.pages.append(page)
+        for source, targets in iter_graph_json_files(graph_dir):
+            tables.links.append(source, targets)
+        return tables
+
+    @property
+    def nbytes(self):
+        """Size of the id columns (the distinct strings and their index come on top)."""
+        return self.chunks.nbytes + self.pages.nbytes + self.links.nbytes
+
+    def mask(self, ids):
+        """Boolean array over the string ids, True for `ids`."""
+        mask = np.zeros(len(self.strings), dtype=bool)
+        mask[np.array(ids, dtype=np.int32)] = True
+        return mask
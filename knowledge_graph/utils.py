@@ -1,39 +1,96 @@
 import os
 import json
 
+from crawler.utils.json_reader import iter_json_files, iter_json_arrays
+
+NODE_ATTRIBUTES = ('title', 'category', 'section', 'type', 'x', 'y')
+EDGE_ATTRIBUTES = ('weight', 'label')
+
+
+def iter_data_json_files(directory):
+    """Stream the chunk records of all data JSON files from the specified directory."""
+    for chunks in iter_json_files(directory, 'data.json'):
+        yield from chunks
+
+def iter_page_json_files(directory):
+    """Stream the page records of all page JSON files from the specified directory."""
+    yield from iter_json_files(directory, 'page.json')
+
+def iter_graph_json_files(directory):
+    """Stream the (source, targets) adjacency entries of all graph JSON files from the specified directory."""
+    for graph in iter_json_files(directory, 'graph.json'):
+        yield from graph.items()
 
 def load_data_json_files(directory):
     """Load all JSON files from the specified directory."""
-    data_files = [f for f in os.listdir(directory) if f.endswith('data.json')]
-    batch_data = []
-    for file in data_files:
-        with open(os.path.join(directory, file), 'r', encoding='utf-8') as f:
-            batch_data.extend(json.load(f))
-    return batch_data
-
-def load_page_json_files(directory): 
+    return list(iter_data_json_files(directory))
+
+def load_page_json_files(directory):
     """Load all JSON files from the specified directory."""
-    data_files = [f for f in os.listdir(directory) if f.endswith('page.json')]
-    batch_data = []
-    for file in data_files:
-        with open(os.path.join(directory, file), 'r', encoding='utf-8') as f:
-            content = json.load(f)
-            batch_data.append(content)
-    return batch_data
-
-def load_graph_json_files(directory): 
-    """Load JSON files in batches from the specified directory."""
-    graph_files = [f for f in os.listdir(directory) if f.endswith('graph.json')]
+    return list(iter_page_json_files(directory))
+
+def load_graph_json_files(directory):
+    """Load and merge the adjacency lists of all graph JSON files from the specified directory."""
     batch_graph = {}
-    for file in graph_files:
-        with open(os.path.join(directory, file), 'r', encoding='utf-8') as f:
-            batch_graph.update(json.load(f))
-    return batch_graph
+    for source, targets in iter_graph_json_files(directory):
+        merged = batch_graph.setdefault(source, {})
+        for target, label in targets:
+            merged[(target, label)] = None
+    return {source: list(targets) for source, targets in batch_graph.items()}
 
-def load_chunk_indices(directory): 
+def knowledge_graph_path(outdir, graph_type='chunk'):
+    """Path of the chunk or page knowledge graph saved by KnowledgeGraph.save."""
+    if graph_type == 'chunk':
+        filename = "chunk_knowledge_graph.json"
+    elif graph_type == 'page':
+        filename = "page_knowledge_graph.json"
+    else:
+        raise ValueError("graph_type must be 'chunk' or 'page'")
+    return os.path.join(f"{outdir}/knowledge_graph", filename)
+
+def load_edgelist(outdir, graph_type='chunk'):
+    """
+    Read a saved knowledge graph straight into columns, without building a NetworkX graph.
+
+    Returns:
+        edges: {'src': [...], 'dst': [...], 'weight': [...], 'label': [...]}
+        nodes: {'node': [...], 'title': [...], 'category': [...], 'section': [...], 'type': [...]}
+        Attributes that no edge (node) carries are left out.
+
+    The links and nodes arrays are streamed (see iter_json_arrays): only the columns are held in memory,
+    never the decoded document.
+    """
+    edges = {'src': [], 'dst': [], **{attr: [] for attr in EDGE_ATTRIBUTES}}
+    nodes = {'node': [], **{attr: [] for attr in NODE_ATTRIBUTES}}
+    for key, record in iter_json_arrays(knowledge_graph_path(outdir, graph_type), ('links', 'nodes')):
+        if key == 'links':
+            edges['src'].append(record['source'])
+            edges['dst'].append(record['target'])
+            for attr in EDGE_ATTRIBUTES:
+                edges[attr].append(record.get(attr))
+        else:
+            nodes['node'].append(record['id'])
+            for attr in NODE_ATTRIBUTES:
+                nodes[attr].append(record.get(attr))
+
+    for columns, attributes in ((edges, EDGE_ATTRIBUTES), (nodes, NODE_ATTRIBUTES)):
+        for attr in attributes:
+            if all(value is None for value in columns[attr]):
+                del columns[attr]
+    return edges, nodes
+
+def load_chunk_indices(directory):
     """Load JSON files in batches from the specified directory."""
     filename = "chunk_subs.json"
     file_path = os.path.join(directory, filename)
     with open(file_path, 'r', encoding='utf-8') as f:
         chunk2subs = json.load(f)
     return chunk2subs
+
+def load_chunk_duplicates(directory):
+    """Load the {duplicate chunk_id: representative chunk_id} mapping written by the embedding stage, empty if there is none."""
+    file_path = os.path.join(directory, "chunk_duplicates.json")
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
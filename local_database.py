@@ -0,0 +1,347 @@
+# local_database.py
+
+import os
+import json
+from array import array
+
+import numpy as np
+
+from config import LOCAL_DB_DIR, EMBEDDING_DIM, VECTOR_STORAGE, RERANK_FACTOR
+from embedding.quantization import save_embedding_matrix, binary_quantize, hamming_distance
+from embedding.projection import PCAProjection
+from embedding.lexical import BM25Index, hybrid_search
+from tracing import traced, count
+
+
+class LocalEmbeddingDatabase:
+    """
+    Local drop-in replacement of `EmbeddingDatabase`, no server needed.
+
+    Embeddings are appended to a raw float32 (float16 with 'halfvec' storage) file read through a
+    memory map; chunk metadata is appended to rows.jsonl, whose line order is the row order of the
+    matrix. Only the chunk ids, the title index and the byte offset of every line are kept in
+    memory (rebuilt on open), the text and metadata of a row are read from the file when asked for.
+    Searches are vectorized NumPy inner products, the scores match `EmbeddingDatabase` ones. The
+    BM25 lexical index is kept in memory, built from rows.jsonl on the first lexical query and
+    extended by every insert.
+    """
+
+    columns = ['chunk_id', 'url', 'title', 'category', 'section', 'text', 'embedding']
+    fields = ('chunk_id', 'url', 'title', 'category', 'section', 'text')
+
+    def __init__(self, directory=LOCAL_DB_DIR, storage=VECTOR_STORAGE):
+        if storage not in ('vector', 'halfvec', 'binary'):
+            raise ValueError("storage must be 'vector', 'halfvec' or 'binary'.")
+        self.directory = directory
+        self.storage = storage
+        self.dtype = np.float16 if storage == 'halfvec' else np.float32
+        self._projection = None
+        self.connect_db()
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def connect_db(self):
+        """Open the store: index the rows of rows.jsonl and memory map the matrices."""
+        self.chunk_ids = []
+        self.offsets = array('q', [0])  # byte offset of every line of rows.jsonl, and of its end
+        self.index = {}
+        self.title_index = {}
+        self._lexical = None
+        path = self._path("rows.jsonl")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):  # last line cut by a crash
+                        break
+                    row = json.loads(line)
+                    self._index_row(row)
+                    self.offsets.append(self.offsets[-1] + len(line))
+            if os.path.getsize(path) > self.offsets[-1]:
+                with open(path, 'r+b') as f:
+                    f.truncate(self.offsets[-1])
+        self._truncate_matrices()
+        self._bits = None
+        self._remap()
+
+    def _index_row(self, row):
+        """Add a row to the chunk_id and title indexes."""
+        i = len(self.chunk_ids)
+        self.chunk_ids.append(row['chunk_id'])
+        self.index[row['chunk_id']] = i
+        self.title_index.setdefault(row['title'], []).append(i)
+
+    def _read_row(self, i):
+        """Metadata and text of row `i`, read from rows.jsonl."""
+        with open(self._path("rows.jsonl"), 'rb') as f:
+            f.seek(self.offsets[i])
+            return json.loads(f.read(self.offsets[i + 1] - self.offsets[i]))
+
+    def _iter_rows(self, start=0):
+        """Metadata and text of the rows from `start` on, streamed from rows.jsonl."""
+        if start >= len(self.chunk_ids):
+            return
+        with open(self._path("rows.jsonl"), 'rb') as f:
+            f.seek(self.offsets[start])
+            for _ in range(start, len(self.chunk_ids)):
+                yield json.loads(f.readline())
+
+    def _truncate_matrices(self):
+        """
+        Cut the matrix files to the rows of rows.jsonl: vectors appended by an insert that failed
+        before writing its rows would otherwise shift every row appended after them.
+        """
+        projection = self.get_projection()
+        for name, dim, dtype in (("embeddings.bin", EMBEDDING_DIM, self.dtype),
+                                 ("embeddings_reduced.bin", projection.dim if projection else None, np.float32)):
+            path = self._path(name)
+            if dim is None or not os.path.exists(path):
+                continue
+            size = len(self.chunk_ids) * dim * np.dtype(dtype).itemsize
+            if os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _remap(self):
+        self.matrix = self._memmap("embeddings.bin", EMBEDDING_DIM, self.dtype)
+        projection = self.get_projection()
+        self.reduced = self._memmap("embeddings_reduced.bin", projection.dim, np.float32) if projection else None
+
+    def _memmap(self, name, dim, dtype):
+        """Read-only (N, dim) view of a raw matrix file, N being the number of rows of the store."""
+        path = self._path(name)
+        n = len(self.chunk_ids)
+        if n == 0 or not os.path.exists(path) or os.path.getsize(path) < n * dim * np.dtype(dtype).itemsize:
+            return np.empty((0, dim), dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(n, dim))
+
+    def create_embeddings_table(self):
+        """Create the store directory if it does not exist."""
+        os.makedirs(self.directory, exist_ok=True)
+
+    def delete_embeddings_table(self):
+        """Remove every embedding (the fitted projections are kept, as the Postgres `projections` table)."""
+        self.matrix = self.reduced = None
+        for name in ("rows.jsonl", "embeddings.bin", "embeddings_reduced.bin"):
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+        self.connect_db()
+
+    def create_vector_index(self):
+        """Searches are brute force, there is no index to build."""
+
+    def table_sizes(self):
+        """On-disk size in bytes of the store (the matrices count as its table, there are no indexes)."""
+        sizes = [os.path.getsize(self._path(name)) for name in ("rows.jsonl", "embeddings.bin", "embeddings_reduced.bin")
+                 if os.path.exists(self._path(name))]
+        return {'table': sum(sizes), 'indexes': 0, 'hnsw': 0}
+
+    def to_pandas(self):
+        import pandas as pd
+        df = pd.DataFrame(list(self._iter_rows()), columns=list(self.fields))
+        df['embedding'] = list(np.asarray(self.matrix, dtype=np.float32))
+        return df
+
+    @traced("insert_embeddings")
+    def insert_embeddings(self, data, page_size=None):
+        """
+        Append embeddings, chunks already stored and zero embeddings are skipped (as ON CONFLICT DO NOTHING).
+
+        With a current projection the reduced vectors are appended too, or all recomputed when the
+        reduced matrix does not cover the stored rows (projection saved without update_reduced_embeddings).
+        """
+        new_rows, vectors = [], []
+        seen = set()
+        for doc in data:
+            if doc['chunk_id'] in self.index or doc['chunk_id'] in seen or not np.asarray(doc['embedding']).any():
+                continue
+            seen.add(doc['chunk_id'])
+            new_rows.append({field: doc.get(field) for field in self.fields})
+            vectors.append(np.asarray(doc['embedding'], dtype=np.float32))
+        if not new_rows:
+            return
+        count("vectors_inserted", len(new_rows))
+
+        self.create_embeddings_table()
+        vectors = np.stack(vectors)
+        # Matrices first: rows.jsonl defines the number of rows, the vectors of an insert that fails
+        # before its rows are written are cut off by _truncate_matrices
+        self._truncate_matrices()
+        with open(self._path("embeddings.bin"), 'ab') as f:
+            f.write(vectors.astype(self.dtype).tobytes())
+        projection = self.get_projection()
+        reduced_path = self._path("embeddings_reduced.bin")
+        aligned = projection is not None and (os.path.getsize(reduced_path) if os.path.exists(reduced_path) else 0) \
+            == len(self.chunk_ids) * projection.dim * np.dtype(np.float32).itemsize
+        if aligned:
+            with open(reduced_path, 'ab') as f:
+                f.write(projection.transform(vectors).astype(np.float32).tobytes())
+        with open(self._path("rows.jsonl"), 'ab') as f:
+            for row in new_rows:
+                line = (json.dumps(row, ensure_ascii=False) + "\n").encode('utf-8')
+                f.write(line)
+                self._index_row(row)
+                self.offsets.append(self.offsets[-1] + len(line))
+        if self._lexical is not None:
+            self._lexical.add(new_rows)
+        if self._bits is not None:
+            self._bits = np.concatenate([self._bits, binary_quantize(vectors.astype(self.dtype))])
+        self._remap()
+        if projection is not None and not aligned:
+            self.update_reduced_embeddings(projection)
+
+    def save_projection(self, projection):
+        """Store a fitted projection, it becomes the current projection."""
+        os.makedirs(self._path("projections"), exist_ok=True)
+        np.savez(self._path(f"projections/{projection.version}.npz"), components=projection.components,
+                 explained_variance_ratio=projection.explained_variance_ratio,
+                 model_name=np.array(projection.model_name or ""))
+        with open(self._path("projections/current"), 'w', encoding='utf-8') as f:
+            f.write(projection.version)
+        self._projection = projection
+
+    def get_projection(self, version=None):
+        """The stored projection of the given version (the current one by default), None if there is none."""
+        if version is None and self._projection is not None:
+            return self._projection
+        if version is None:
+            if not os.path.exists(self._path("projections/current")):
+                return None
+            with open(self._path("projections/current"), 'r', encoding='utf-8') as f:
+                version = f.read().strip()
+            current = True
+        else:
+            current = False
+        path = self._path(f"projections/{version}.npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            projection = PCAProjection(data['components'], data['explained_variance_ratio'],
+                                       model_name=str(data['model_name']) or None)
+        if current:
+            self._projection = projection
+        return projection
+
+    def update_reduced_embeddings(self, projection, page_size=None):
+        """(Re)compute the reduced vector of every row with `projection`."""
+        self.create_embeddings_table()
+        with open(self._path("embeddings_reduced.bin"), 'wb') as f:
+            for start in range(0, len(self.chunk_ids), 65536):
+                block = np.asarray(self.matrix[start:start + 65536], dtype=np.float32)
+                f.write(projection.transform(block).astype(np.float32).tobytes())
+        self._remap()
+
+    def sample_embedding_matrix(self, n):
+        """Float32 matrix of (up to) n embeddings sampled at random."""
+        rows = np.sort(np.random.default_rng().choice(len(self.chunk_ids), min(n, len(self.chunk_ids)), replace=False))
+        return np.asarray(self.matrix[rows], dtype=np.float32)
+
+    def _space_matrix(self, space):
+        if space == 'full':
+            return self.matrix
+        if space == 'reduced':
+            return self.reduced if self.reduced is not None else np.empty((0, 0), dtype=np.float32)
+        raise ValueError("space must be 'full' or 'reduced'.")
+
+    @staticmethod
+    def _top(rows, scores, topk):
+        order = np.argsort(-scores, kind='stable')[:topk]
+        return rows[order], scores[order]
+
+    @traced("dense_search")
+    def dense_search(self, subset, embedding, topk, space='full'):
+        """Top-k chunks of `subset`, `embedding` being a vector of the given space ('full' or 'reduced')."""
+        count("queries")
+        matrix = self._space_matrix(space)
+        rows = np.array(sorted(self.index[c] for c in subset if c in self.index), dtype=np.int64)
+        if rows.size == 0 or len(matrix) == 0:
+            return list()
+        scores = np.asarray(matrix[rows], dtype=np.float32) @ np.asarray(embedding, dtype=np.float32)
+        rows, scores = self._top(rows, scores, topk)
+        return [(self.chunk_ids[i], float(s)) for i, s in zip(rows, scores)]
+
+    @traced("search")
+    def search(self, embedding, topk, rerank_factor=RERANK_FACTOR):
+        """
+        Top-k most similar chunks of the whole store.
+
+        With binary storage, the topk * rerank_factor closest sign bit codes are reranked by their
+        float32 inner product, as `EmbeddingDatabase.search`. With halfvec storage the float16
+        matrix is scored directly, there is no full precision copy to rerank against.
+        """
+        count("queries")
+        if len(self.chunk_ids) == 0:
+            return list()
+        query = np.asarray(embedding, dtype=np.float32)
+        if self.storage == 'binary':
+            if self._bits is None:
+                self._bits = binary_quantize(self.matrix)
+            distances = hamming_distance(self._bits, binary_quantize(query))
+            n_candidates = min(topk * rerank_factor, len(distances))
+            rows = np.argpartition(distances, n_candidates - 1)[:n_candidates]
+        else:
+            rows = np.arange(len(self.chunk_ids))
+        scores = np.asarray(self.matrix[rows], dtype=np.float32) @ query
+        rows, scores = self._top(rows, scores, topk)
+        return [(self.chunk_ids[i], float(s)) for i, s in zip(rows, scores)]
+
+    @property
+    def lexical_index(self):
+        """BM25Index over the stored chunks, built on first use."""
+        if self._lexical is None:
+            self._lexical = BM25Index()
+            batch = []
+            for row in self._iter_rows():
+                batch.append(row)
+                if len(batch) == 4096:
+                    self._lexical.add(batch)
+                    batch = []
+            self._lexical.add(batch)
+        return self._lexical
+
+    @traced("lexical_search")
+    def lexical_search(self, query, topk, subset=None):
+        """Top-k chunks by BM25 score of `query` over their title, section and text, among `subset` if given."""
+        count("queries")
+        return self.lexical_index.search(query, topk, subset=subset)
+
+    def hybrid_search(self, query, embedding, topk, subset=None, candidates=None):
+        """Reciprocal rank fusion of the vector and BM25 rankings (see `embedding.lexical.hybrid_search`)."""
+        return hybrid_search(self, query, embedding, topk, subset=subset, candidates=candidates)
+
+    def get_embedding(self, chunk_id, space='full'):
+        matrix = self._space_matrix(space)
+        row = self.index.get(chunk_id)
+        if row is None or len(matrix) == 0:
+            return None
+        return np.array(matrix[row], dtype=np.float32)
+
+    def get_embedding_matrix(self, space='full'):
+        """Every stored embedding of a space as (chunk_ids, float32 matrix of shape (N, dim))."""
+        matrix = self._space_matrix(space)
+        chunk_ids = list(self.chunk_ids) if len(matrix) else []
+        return chunk_ids, np.asarray(matrix, dtype=np.float32)
+
+    def export_embedding_matrix(self, path, dtype='int8'):
+        """Save every embedding to a local .npz file, int8 quantized by default (see `embedding.quantization`)."""
+        chunk_ids, matrix = self.get_embedding_matrix()
+        save_embedding_matrix(path, chunk_ids, matrix, dtype=dtype)
+        return path
+
+    def get_text(self, chunk_id):
+        row = self.index.get(chunk_id)
+        return self._read_row(row)['text'] if row is not None else None
+
+    def filter_by_title(self, title):
+        return [(self.chunk_ids[i],) for i in self.title_index.get(title, [])]
+
+    def check_embeddings_table(self):
+        """Check the number of records in the store."""
+        print("Number of vector records in embeddings:", len(self.chunk_ids))
+
+    def close_connection(self):
+        """Release the memory maps."""
+        self.matrix = self.reduced = self._bits = None
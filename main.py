@@ -1,41 +1,86 @@
 # main.py
 
-from crawler.crawler import crawl
-from embedding.embedding_main import embedding_main
-from knowledge_graph.build import   build_main
+# The stages are imported when they run (see registry.py): `python main.py build` loads neither
+# requests/BeautifulSoup nor the database drivers of the crawl and embedding stages.
+from registry import STAGES, load_stage
+from config import TRACE_DIR
+import tracing
+import argparse
+import time
 
 update_only = True # to do: use levels (with or without sub pages)
+streaming = False # run crawl, embedding and graph build concurrently (pipeline.py) instead of one after the other
+replay_archive = False # reparse the archived HTML of the last crawls (crawler/replay.py) instead of crawling
 
 batch_size = 32
 reset_table = True # argument orchestration, reset_table = not(update_only); force_reset_table ( see cli jargon )
 
 top_k = 3
+knn_k = None # set to connect each chunk to its k most similar chunks of the whole corpus
+projection_dim = None # set to build the graph on PCA reduced embeddings of this dimension
 save_to_local=True
 from_local=False 
 
 verbose = 2
 
 
+def stage_kwargs(name):
+    """Arguments of a stage, from the settings above."""
+    kwargs = {
+        'crawl': dict(update_only=update_only),
+        'distributed_crawl': dict(update_only=update_only),
+        'replay': dict(),
+        'embed': dict(batch_size=batch_size, reset_table=reset_table),
+        'project': dict(dim=projection_dim) if projection_dim else dict(),
+        'build': dict(top_k=top_k, knn_k=knn_k, space='reduced' if projection_dim else 'full',
+                      save_to_local=save_to_local, from_local=from_local),
+        'pipeline': dict(update_only=update_only, batch_size=batch_size, top_k=top_k, reset_table=reset_table,
+                         save_to_local=save_to_local),
+    }[name]
+    return dict(kwargs, verbose=verbose)
+
+def default_stages():
+    """The stages run by `python main.py`, from the settings above."""
+    if streaming:
+        return ['pipeline']
+    stages = ['replay' if replay_archive else 'crawl', 'embed']
+    if projection_dim:
+        stages.append('project')
+    return stages + ['build']
+
+def run_stage(name):
+    with tracing.span(f"import_{name}"):
+        stage = load_stage(name)
+    with tracing.span(stage.__name__):
+        return stage(**stage_kwargs(name))
+
+
 if __name__ == "__main__":
 
-    
-    crawl(
-        verbose=verbose,
-        update_only=update_only
-        )
-    
-    
-    embedding_main(
-        batch_size = batch_size, 
-        reset_table = reset_table, 
-        verbose=verbose
-    )
-
-    
-    build_main(
-        top_k = top_k,
-        save_to_local=save_to_local, 
-        from_local=from_local, 
-        verbose=verbose
-    )
-    
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the whole pipeline, or the given stages in order.")
+    parser.add_argument("stages", nargs='*', metavar="stage", help=f"Stages to run: {', '.join(STAGES)}.")
+    parser.add_argument("--list", action="store_true", help="List the stages and exit.")
+    parser.add_argument("--verbose", type=int, default=verbose)
+    args = parser.parse_args()
+    verbose = args.verbose
+
+    if args.list:
+        for name, (target, description) in STAGES.items():
+            print(f"{name:<18} {description} ({target})")
+        raise SystemExit
+
+    stages = args.stages or default_stages()
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s) {', '.join(unknown)}, expected {', '.join(STAGES)}")
+    for name in stages:
+        run_stage(name)
+
+    # Enable with TRACING = True in config.py
+    if tracing.enabled():
+        run_id = time.strftime("%Y%m%d-%H%M%S")
+        tracing.export_chrome_trace(f"{TRACE_DIR}/trace_{run_id}.json")
+        tracing.export_prometheus(f"{TRACE_DIR}/metrics_{run_id}.prom")
+        if verbose:
+            tracing.summary()
+            print("Traces saved to", TRACE_DIR)
@@ -0,0 +1,390 @@
+# pipeline.py
+
+import os
+import json
+import time
+import queue
+import threading
+from dataclasses import asdict
+from collections import defaultdict
+
+from config import WIKI_URL, BASE_URL, DATA_DIR
+from crawler.crawler import crawl
+from crawler.utils.json_reader import read_json, list_json_files
+from crawler.utils.helpers import clean_filename
+from database import open_database
+from embedding.model import load_embedding_model, process_batch
+from knowledge_graph.knowledge_graph import KnowledgeGraph
+from knowledge_graph.tables import StringTable
+from tracing import span
+
+_DONE = object()  # end of stream marker
+
+
+class StageStats:
+    """Time a stage thread spends working, waiting for input and blocked on a full output queue."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.wait_in = 0.0
+        self.wait_out = 0.0
+        self.start = None
+        self.end = None
+
+    @property
+    def wall(self):
+        if self.start is None:
+            return 0.0
+        return (self.end or time.perf_counter()) - self.start
+
+    def report(self):
+        wall = max(self.wall, 1e-9)
+        return {'items': self.items, 'wall_s': round(self.wall, 3), 'busy_s': round(self.busy, 3),
+                'starved_s': round(self.wait_in, 3), 'blocked_s': round(self.wait_out, 3),
+                'utilization': round(self.busy / wall, 3)}
+
+
+class _IncrementalGraph:
+    """
+    Builds the knowledge graph page by page, as `KnowledgeGraph.setup` + `build` do for the whole crawl.
+
+    A page is added once its chunks are in the database. A chunk linking to a page that is not
+    ready yet is parked until that page arrives; links to pages that never arrive are dropped at
+    the end, as `setup` drops links to pages that were not crawled. Node and edge strings are
+    interned as in `setup`.
+    """
+
+    def __init__(self, kg, db_lock, top_k=3):
+        self.kg = kg
+        self.G = kg.graph
+        self.db_lock = db_lock
+        self.top_k = top_k
+        self.strings = StringTable()
+        self.ready = set()
+        self.pending = defaultdict(list)
+        self.missing_embeddings = set()
+
+    def add_page(self, doc, chunks, graph):
+        G = self.G
+        s = self.strings.canonical
+        title = s(doc['title'])
+        G.add_node(title, category=s(doc['category']), type='document')
+        for chunk in chunks:
+            G.add_node(s(chunk['chunk_id']), title=s(chunk['title']), category=s(chunk['category']),
+                       section=s(chunk['section']), type='chunk')
+        for target, label in graph.get(title, []):
+            if label == 'chunk':
+                G.add_edge(title, s(target), label=s(label))
+        self.ready.add(title)
+
+        for source, targets in graph.items():
+            if source == title:
+                continue
+            source = s(source)
+            for target, label in targets:
+                target, label = s(target), s(label)
+                if target in self.ready:
+                    self._connect(source, target, label)
+                else:
+                    self.pending[target].append((source, label))
+        for source, label in self.pending.pop(title, []):
+            self._connect(source, title, label)
+
+    def _connect(self, chunk_node, doc_node, label):
+        """Link a chunk to a page, and to the top_k most similar chunks of that page."""
+        G = self.G
+        G.add_edge(chunk_node, doc_node, label=label)
+        G.add_edge(G.nodes[chunk_node]['title'], doc_node, label=label)
+        if chunk_node in self.missing_embeddings:
+            return
+        with self.db_lock:
+            embedding = self.kg.db.get_embedding(chunk_node)
+            if embedding is None:
+                self.missing_embeddings.add(chunk_node)
+                return
+            related_chunks = {c for c in G.successors(doc_node) if c != chunk_node and G.nodes[c].get('type') == 'chunk'}
+            top_chunks = self.kg.db.dense_search(related_chunks, embedding, self.top_k) if related_chunks else []
+        for rel_chunk, similarity in top_chunks:
+            G.add_edge(chunk_node, rel_chunk, weight=similarity, label=label)
+
+    def finish(self):
+        """Drop the links to pages that never arrived and split the chunk and page graphs."""
+        self.pending.clear()
+        self.kg.split_graph(self.G)
+
+
+class StreamingPipeline:
+    """
+    Crawl, embed, store and build the graph concurrently.
+
+    Four threads connected by bounded queues (a full queue blocks the stage feeding it):
+    crawler -> embedder (batches of chunks, process_batch) -> writer (insert_embeddings)
+    -> graph (incremental KnowledgeGraph build). Pages written to the database are recorded in
+    a checkpoint file, a resumed run re-queues saved pages that were not embedded yet and skips
+    the pages already crawled.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, base_url=BASE_URL, wiki_url=WIKI_URL, model=None, db=None,
+                 batch_size=32, top_k=3, queue_size=64, flush_interval=1.0, checkpoint_every=50, verbose=1):
+        self.data_dir = data_dir
+        self.base_url = base_url
+        self.wiki_url = wiki_url
+        self.model = model or load_embedding_model()
+        self.db = db or open_database()
+        self.batch_size = batch_size
+        self.top_k = top_k
+        self.flush_interval = flush_interval
+        self.checkpoint_every = checkpoint_every
+        self.verbose = verbose
+
+        self.pages = queue.Queue(maxsize=queue_size)     # (doc, chunks, graph) parsed pages
+        self.batches = queue.Queue(maxsize=queue_size)   # (records, completed pages)
+        self.ready = queue.Queue(maxsize=queue_size)     # (doc, chunks, graph) pages stored in the database
+        self.stop = threading.Event()
+        self.errors = []
+        self.db_lock = threading.Lock()
+        self.stats = {name: StageStats(name) for name in ('crawler', 'embedder', 'writer', 'graph')}
+
+        self.checkpoint_path = os.path.join(data_dir, "pipeline_checkpoint.json")
+        self.embedded_pages = set()
+        self.kg = KnowledgeGraph(data_dir=data_dir, metadata_dir=f"{data_dir}/metadata/", page_dir=f"{data_dir}/pages/",
+                                 graph_dir=f"{data_dir}/graph/", EmbeddingDatabase=lambda: self.db, verbose=verbose)
+
+    # Queues
+
+    def _put(self, q, item, stats):
+        start = time.perf_counter()
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        stats.wait_out += time.perf_counter() - start
+        if self.stop.is_set():
+            raise RuntimeError("pipeline stopped")
+
+    def _get(self, q, stats, timeout=None):
+        start = time.perf_counter()
+        try:
+            return q.get(timeout=timeout)
+        finally:
+            stats.wait_in += time.perf_counter() - start
+
+    def _run(self, name, target, downstream):
+        stats = self.stats[name]
+        stats.start = time.perf_counter()
+        try:
+            target(stats)
+        except Exception as e:
+            if not self.stop.is_set():
+                self.errors.append((name, e))
+                self.stop.set()
+        finally:
+            if downstream is not None and not self.stop.is_set():
+                # Wait for room however long the next stage takes, the stream must end with the marker
+                try:
+                    self._put(downstream, _DONE, stats)
+                except RuntimeError:  # another stage failed meanwhile
+                    pass
+            if downstream is not None and self.stop.is_set():
+                # Failure: the next stage may be gone, the marker only wakes it up if it is waiting
+                try:
+                    downstream.put(_DONE, timeout=5)
+                except queue.Full:
+                    pass
+            stats.end = time.perf_counter()
+
+    # Checkpoint
+
+    def _load_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            self.embedded_pages = set(read_json(self.checkpoint_path)['embedded_pages'])
+
+    def _save_checkpoint(self):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'embedded_pages': sorted(self.embedded_pages)}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _saved_pages(self):
+        """Pages saved by an earlier run, as (doc, chunks, graph) read back from the crawl output."""
+        for path in list_json_files(f"{self.data_dir}/pages", "_page.json"):
+            doc = read_json(path)
+            name = clean_filename(doc['title'])
+            chunks = read_json(os.path.join(f"{self.data_dir}/metadata", f"{name}_data.json"))
+            graph = read_json(os.path.join(f"{self.data_dir}/graph", f"{name}_graph.json"))
+            yield doc, chunks, graph
+
+    # Stages
+
+    def _crawler(self, stats, update_only, resume, reembed_saved=False):
+        if reembed_saved:
+            # The table was reset but update_only skips the saved pages: embed them from disk
+            for item in self._saved_pages():
+                self._put(self.pages, item, stats)
+                stats.items += 1
+        elif resume:
+            # Saved but not embedded pages go back to the embedder, embedded ones straight to the graph
+            for doc, chunks, graph in self._saved_pages():
+                if doc['title'] in self.embedded_pages:
+                    self._put(self.ready, (doc, chunks, graph), stats)
+                else:
+                    self._put(self.pages, (doc, chunks, graph), stats)
+                stats.items += 1
+
+        def on_page(doc, chunks, graph):
+            self._put(self.pages, (asdict(doc), [asdict(c) for c in chunks], graph), stats)
+            stats.items += 1
+
+        start = time.perf_counter()
+        crawl(update_only=update_only or resume, verbose=self.verbose, base_url=self.base_url, wiki_url=self.wiki_url,
+              data_dir=self.data_dir, on_page=on_page)
+        stats.busy = time.perf_counter() - start - stats.wait_out
+
+    def _embedder(self, stats):
+        chunks, pages, remaining = [], [], {}
+
+        def flush():
+            records = []
+            if chunks:
+                start = time.perf_counter()
+                records = process_batch(chunks, self.model)
+                stats.busy += time.perf_counter() - start
+                stats.items += len(chunks)
+            completed = [page for page in pages if remaining[page[0]['title']] == 0]
+            for page in completed:
+                pages.remove(page)
+                del remaining[page[0]['title']]
+            if records or completed:
+                self._put(self.batches, (records, completed), stats)
+            chunks.clear()
+
+        while True:
+            try:
+                item = self._get(self.pages, stats, timeout=self.flush_interval)
+            except queue.Empty:
+                flush()  # slow crawl: do not hold a partial batch
+                continue
+            if item is _DONE:
+                break
+            doc, page_chunks, _ = item
+            pages.append(item)
+            remaining[doc['title']] = len(page_chunks)
+            for chunk in page_chunks:
+                chunks.append(chunk)
+                remaining[doc['title']] -= 1
+                if len(chunks) >= self.batch_size:
+                    flush()
+            if not page_chunks:
+                flush()
+        flush()
+
+    def _writer(self, stats):
+        since_checkpoint = 0
+        while True:
+            item = self._get(self.batches, stats)
+            if item is _DONE:
+                break
+            records, completed = item
+            start = time.perf_counter()
+            if records:
+                with self.db_lock:
+                    self.db.insert_embeddings(records, page_size=1000)
+                stats.items += len(records)
+            for doc, _, _ in completed:
+                self.embedded_pages.add(doc['title'])
+            since_checkpoint += len(completed)
+            if since_checkpoint >= self.checkpoint_every:
+                self._save_checkpoint()
+                since_checkpoint = 0
+            stats.busy += time.perf_counter() - start
+            for page in completed:
+                self._put(self.ready, page, stats)
+        self._save_checkpoint()
+
+    def _graph(self, stats, graph):
+        while True:
+            item = self._get(self.ready, stats)
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            graph.add_page(*item)
+            stats.busy += time.perf_counter() - start
+            stats.items += 1
+
+    # Run
+
+    def run(self, update_only=False, resume=False, reset_table=True, save_to_local=True):
+        """
+        Run every stage to completion.
+
+        Args:
+            update_only: Only crawl the pages not saved yet (as `crawl`). With reset_table, the saved pages
+                are read back from disk and embedded again, so that the table and graph keep the whole corpus.
+            resume: Continue an interrupted run from its checkpoint (implies update_only, keeps the table).
+            reset_table: Recreate the embeddings table first (ignored when resuming).
+
+        Returns:
+            The utilization report, one dict per stage.
+        """
+        if resume:
+            self._load_checkpoint()
+        elif reset_table:
+            self.db.delete_embeddings_table()
+            self.db.create_embeddings_table()
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        reembed = update_only and reset_table and not resume
+        graph = _IncrementalGraph(self.kg, self.db_lock, top_k=self.top_k)
+        threads = [
+            threading.Thread(target=self._run, args=('crawler', lambda s: self._crawler(s, update_only, resume, reembed), self.pages)),
+            threading.Thread(target=self._run, args=('embedder', self._embedder, self.batches)),
+            threading.Thread(target=self._run, args=('writer', self._writer, self.ready)),
+            threading.Thread(target=self._run, args=('graph', lambda s: self._graph(s, graph), None)),
+        ]
+        with span("pipeline"):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        if self.errors:
+            name, error = self.errors[0]
+            raise RuntimeError(f"pipeline stage '{name}' failed") from error
+
+        graph.finish()
+        self.db.create_vector_index()
+        if save_to_local:
+            self.kg.save(self.data_dir, graph_type='chunk')
+            self.kg.save(self.data_dir, graph_type='page')
+
+        report = self.report()
+        if self.verbose:
+            self.print_report(report)
+        return report
+
+    def report(self):
+        return {name: stats.report() for name, stats in self.stats.items()}
+
+    def print_report(self, report):
+        print("-----"*10)
+        print(f"{'stage':<10}{'items':>8}{'wall':>10}{'busy':>10}{'starved':>10}{'blocked':>10}{'util':>8}")
+        for name, r in report.items():
+            print(f"{name:<10}{r['items']:>8}{r['wall_s']:>9.1f}s{r['busy_s']:>9.1f}s{r['starved_s']:>9.1f}s"
+                  f"{r['blocked_s']:>9.1f}s{r['utilization']:>8.0%}")
+        print("Chunk Knowledge Graph:", len(self.kg.chunk_graph.nodes), "nodes,", len(self.kg.chunk_graph.edges), "edges")
+        print("Page Knowledge Graph:", len(self.kg.page_graph.nodes), "nodes,", len(self.kg.page_graph.edges), "edges")
+        print("-----"*10)
+
+
+def pipeline_main(update_only=False, resume=False, batch_size=32, top_k=3, queue_size=64, reset_table=True,
+                  save_to_local=True, verbose=1):
+    """Streaming alternative to running crawl, embedding_main and build_main one after the other."""
+    pipeline = StreamingPipeline(batch_size=batch_size, top_k=top_k, queue_size=queue_size, verbose=verbose)
+    report = pipeline.run(update_only=update_only, resume=resume, reset_table=reset_table, save_to_local=save_to_local)
+    pipeline.db.close_connection()
+    return report
@@ -0,0 +1,51 @@
+# registry.py
+
+import importlib
+
+# Stages of the pipeline, as "module:function": a stage's module (and its heavy dependencies) is only
+# imported when the stage runs
+STAGES = {
+    'crawl': ("crawler.crawler:crawl", "Crawl the wiki into DATA_DIR."),
+    'distributed_crawl': ("crawler.distributed:distributed_crawl", "Crawl with several worker processes."),
+    'replay': ("crawler.replay:replay", "Reparse the archived HTML of the last crawls, offline."),
+    'embed': ("embedding.embedding_main:embedding_main", "Embed the crawled chunks into the database."),
+    'project': ("embedding.embedding_main:projection_main", "Fit the PCA projection of the stored embeddings."),
+    'build': ("knowledge_graph.build:build_main", "Build the chunk and page knowledge graphs."),
+    'pipeline': ("pipeline:pipeline_main", "Crawl, embed and build concurrently (streaming)."),
+}
+
+# Interchangeable implementations, selected by name in config.py
+BACKENDS = {
+    'database': {  # DB_BACKEND
+        'postgres': "database:EmbeddingDatabase",
+        'local': "local_database:LocalEmbeddingDatabase",
+    },
+    'embedding': {  # EMBEDDING_BACKEND
+        'ollama': "embedding.model:OllamaEmbedding",
+        'onnx': "embedding.onnx_model:OnnxEmbedding",
+    },
+    'analytics': {  # ANALYTICS_BACKEND
+        'gpu': "analytics.gpu",
+        'cpu': "analytics.cpu",
+    },
+}
+
+
+def resolve(spec):
+    """Import "module" or "module:attribute" and return it."""
+    module, _, attribute = spec.partition(':')
+    module = importlib.import_module(module)
+    return getattr(module, attribute) if attribute else module
+
+def load_stage(name):
+    """Function of a stage of STAGES, importing its module."""
+    if name not in STAGES:
+        raise ValueError(f"Unknown stage {name!r}, expected one of {', '.join(STAGES)}.")
+    return resolve(STAGES[name][0])
+
+def load_backend(kind, name):
+    """Class (or module) of the `name` backend of `kind` ('database', 'embedding' or 'analytics')."""
+    backends = BACKENDS[kind]
+    if name not in backends:
+        raise ValueError(f"{kind} backend must be one of {', '.join(repr(b) for b in backends)}.")
+    return resolve(backends[name])
@@ -0,0 +1,42 @@
+# tests/test_dedup.py
+
+import numpy as np
+
+from embedding import dedup
+from embedding.dedup import near_duplicate_clusters, deduplicate_chunks
+
+
+def with_signatures(monkeypatch, signatures):
+    """Make MinHasher return `signatures` in order, one per text."""
+    rows = iter(signatures)
+    monkeypatch.setattr(dedup.MinHasher, 'signature', lambda self, shingle_hashes: next(rows))
+
+def test_chains_are_not_merged(monkeypatch):
+    # B agrees with A and C on 80% of the values, A and C only on 60%, all share the first band
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 10**6, 100)
+    b, c = a.copy(), a.copy()
+    b[80:] = rng.integers(0, 10**6, 20)
+    c[60:80] = rng.integers(0, 10**6, 20)
+    c[80:] = b[80:]
+    with_signatures(monkeypatch, [a, b, c])
+    roots = near_duplicate_clusters(["a", "b", "c"], threshold=0.8, num_perm=100, bands=10)
+    assert roots.tolist() == [0, 0, 2]
+
+def test_exact_copies_follow_their_representative(monkeypatch):
+    rng = np.random.default_rng(1)
+    a = rng.integers(0, 10**6, 100)
+    b = a.copy()
+    b[90:] = rng.integers(0, 10**6, 10)
+    with_signatures(monkeypatch, [a, b, b, rng.integers(0, 10**6, 100)])
+    roots = near_duplicate_clusters(["a", "b", "b", "d"], threshold=0.8, num_perm=100, bands=10)
+    assert roots.tolist() == [0, 0, 0, 3]
+
+def test_deduplicate_chunks_on_text():
+    boilerplate = "This article is a stub. You can help the wiki by expanding it with more details about the topic."
+    chunks = [{'chunk_id': f"c{i}", 'text': text} for i, text in enumerate([
+        boilerplate, "A completely different section about the history of the castle and its builders.",
+        boilerplate, boilerplate + " Thanks."])]
+    representatives, duplicates = deduplicate_chunks(chunks, threshold=0.8)
+    assert [chunk['chunk_id'] for chunk in representatives] == ["c0", "c1"]
+    assert duplicates == {"c2": "c0", "c3": "c0"}
@@ -0,0 +1,39 @@
+# tests/test_distributed_crawl.py
+
+import pytest
+
+from benchmarks.synthetic_wiki import generate_wiki
+from benchmarks.stub_servers import WikiServer
+from benchmarks.bench_distributed_crawl import check_same_output, run_with_crash
+from crawler.crawler import crawl
+from crawler.distributed import distributed_crawl
+
+
+@pytest.fixture(scope="module")
+def wiki():
+    with WikiServer(generate_wiki(30), latency=0.02) as server:
+        yield server
+
+@pytest.fixture(scope="module")
+def reference_dir(wiki, tmp_path_factory):
+    data_dir = str(tmp_path_factory.mktemp("sequential")) + "/"
+    crawl(update_only=False, verbose=0, base_url=wiki.base_url, wiki_url=wiki.wiki_url, data_dir=data_dir)
+    return data_dir
+
+@pytest.mark.parametrize("n_workers", [2, 3])
+def test_workers_match_sequential_crawl(wiki, reference_dir, tmp_path, n_workers):
+    data_dir = str(tmp_path) + "/"
+    status = distributed_crawl(n_workers, verbose=0, base_url=wiki.base_url, wiki_url=wiki.wiki_url,
+                               data_dir=data_dir, delay=0)
+    assert check_same_output(reference_dir, data_dir) > 0
+    assert set(status['urls']) == {'done'}
+    assert len(status['workers']) == n_workers
+
+def test_killed_worker_leases_are_reclaimed(wiki, reference_dir, tmp_path):
+    data_dir = str(tmp_path) + "/"
+    status = run_with_crash(2, data_dir, wiki, lease_seconds=1.0, kill_after=0.5, verbose=0)
+    states = sorted(state for state, _, _ in status['workers'].values())
+    # the killed worker never unregistered, the other one finished its URLs too
+    assert states == ['finished', 'running']
+    assert set(status['urls']) == {'done'}
+    assert check_same_output(reference_dir, data_dir) > 0
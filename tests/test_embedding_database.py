@@ -0,0 +1,169 @@
+# tests/test_embedding_database.py
+
+"""
+Behaviour shared by the embedding stores: LocalEmbeddingDatabase always, EmbeddingDatabase when
+WIKI_TEST_POSTGRES=1 and the server of DB_CONFIG is reachable (the test drops its embeddings table).
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from config import EMBEDDING_DIM
+
+
+@pytest.fixture(params=['local', 'postgres'])
+def open_store(request, tmp_path):
+    """Factory opening the store under test, always on the same data."""
+    if request.param == 'local':
+        from local_database import LocalEmbeddingDatabase
+        factory = lambda: LocalEmbeddingDatabase(directory=str(tmp_path / "store"))
+    else:
+        if os.environ.get("WIKI_TEST_POSTGRES") != "1":
+            pytest.skip("set WIKI_TEST_POSTGRES=1 to run against the Postgres server of DB_CONFIG")
+        from database import EmbeddingDatabase
+        factory = EmbeddingDatabase
+        try:
+            factory().close_connection()
+        except Exception as e:  # psycopg2 missing or server unreachable
+            pytest.skip(f"no Postgres server: {e!r}")
+    db = factory()
+    db.delete_embeddings_table()
+    db.create_embeddings_table()
+    db.close_connection()
+    return factory
+
+def chunks(n, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [{'chunk_id': f"Page_{(start + i) // 3}_{(start + i) % 3 + 1}", 'url': f"https://wiki/Page_{(start + i) // 3}",
+             'title': f"Page_{(start + i) // 3}", 'category': 'Character', 'section': f"Section_{i % 3}",
+             'text': f"text of chunk {start + i}", 'embedding': vector} for i, vector in enumerate(vectors)]
+
+
+def test_insert_and_get(open_store):
+    db = open_store()
+    data = chunks(30)
+    db.insert_embeddings(data, page_size=100)
+    for doc in data[::7]:
+        np.testing.assert_allclose(np.asarray(db.get_embedding(doc['chunk_id']), dtype=np.float32), doc['embedding'],
+                                   rtol=1e-6, atol=1e-6)
+        assert db.get_text(doc['chunk_id']) == doc['text']
+    assert db.get_embedding("missing") is None
+    assert db.get_text("missing") is None
+    db.close_connection()
+
+def test_duplicate_and_zero_inserts_are_skipped(open_store):
+    db = open_store()
+    data = chunks(12)
+    db.insert_embeddings(data, page_size=100)
+    again = chunks(12, seed=1)  # same chunk ids, other vectors
+    zero = dict(chunks(1, start=100)[0], embedding=np.zeros(EMBEDDING_DIM, dtype=np.float32))
+    db.insert_embeddings(again + [zero], page_size=100)
+    assert len(db.to_pandas()) == 12
+    np.testing.assert_allclose(np.asarray(db.get_embedding(data[0]['chunk_id']), dtype=np.float32), data[0]['embedding'],
+                               rtol=1e-6, atol=1e-6)
+    assert db.get_embedding(zero['chunk_id']) is None
+    db.close_connection()
+
+def test_dense_search(open_store):
+    db = open_store()
+    data = chunks(40)
+    db.insert_embeddings(data, page_size=100)
+    subset = [doc['chunk_id'] for doc in data[:20]]
+    query = data[5]['embedding']
+    found = db.dense_search(subset, query, 5)
+    expected = sorted(((doc['chunk_id'], float(doc['embedding'] @ query)) for doc in data[:20]), key=lambda x: -x[1])[:5]
+    assert [c for c, _ in found] == [c for c, _ in expected]
+    np.testing.assert_allclose([s for _, s in found], [s for _, s in expected], rtol=1e-5)
+    assert db.dense_search(["missing"], query, 5) == []
+    db.close_connection()
+
+def test_filter_by_title(open_store):
+    db = open_store()
+    db.insert_embeddings(chunks(9), page_size=100)
+    assert sorted(db.filter_by_title("Page_1")) == [("Page_1_1",), ("Page_1_2",), ("Page_1_3",)]
+    assert list(db.filter_by_title("missing")) == []
+    db.close_connection()
+
+def test_to_pandas(open_store):
+    db = open_store()
+    data = chunks(6)
+    db.insert_embeddings(data, page_size=100)
+    df = db.to_pandas().set_index('chunk_id')
+    assert set(df.index) == {doc['chunk_id'] for doc in data}
+    for doc in data:
+        row = df.loc[doc['chunk_id']]
+        assert (row['title'], row['category'], row['section'], row['text']) == \
+            (doc['title'], doc['category'], doc['section'], doc['text'])
+        np.testing.assert_allclose(np.asarray(row['embedding'], dtype=np.float32), doc['embedding'], rtol=1e-6, atol=1e-6)
+    db.close_connection()
+
+def test_reopen(open_store):
+    db = open_store()
+    first, second = chunks(10), chunks(10, start=10)
+    db.insert_embeddings(first, page_size=100)
+    db.close_connection()
+    db = open_store()
+    db.insert_embeddings(second, page_size=100)
+    db.close_connection()
+    db = open_store()
+    for doc in first + second:
+        np.testing.assert_allclose(np.asarray(db.get_embedding(doc['chunk_id']), dtype=np.float32), doc['embedding'],
+                                   rtol=1e-6, atol=1e-6)
+    assert sorted(db.filter_by_title("Page_4")) == [("Page_4_1",), ("Page_4_2",), ("Page_4_3",)]
+    db.close_connection()
+
+def test_local_store_recovers_from_partial_insert(tmp_path):
+    """Vectors (and a cut rows.jsonl line) left by a crashed insert do not shift the rows inserted afterwards."""
+    from local_database import LocalEmbeddingDatabase
+    directory = str(tmp_path / "store")
+    db = LocalEmbeddingDatabase(directory=directory)
+    first, orphan, second = chunks(5), chunks(3, start=5, seed=1), chunks(5, start=8, seed=2)
+    db.insert_embeddings(first)
+    db.close_connection()
+    with open(os.path.join(directory, "embeddings.bin"), 'ab') as f:
+        f.write(np.stack([doc['embedding'] for doc in orphan]).tobytes())
+    with open(os.path.join(directory, "rows.jsonl"), 'a', encoding='utf-8') as f:
+        f.write('{"chunk_id": "Page_')
+
+    db = LocalEmbeddingDatabase(directory=directory)
+    db.insert_embeddings(second)
+    db.close_connection()
+    db = LocalEmbeddingDatabase(directory=directory)
+    assert len(db) == 10
+    for doc in first + second:
+        np.testing.assert_array_equal(db.get_embedding(doc['chunk_id']), doc['embedding'])
+    assert db.get_embedding(orphan[0]['chunk_id']) is None
+
+def test_local_store_reads_rows_on_demand(tmp_path):
+    """Text and metadata are read back from rows.jsonl, also after a reopen and for the lexical index."""
+    from local_database import LocalEmbeddingDatabase
+    directory = str(tmp_path / "store")
+    data = chunks(8)
+    db = LocalEmbeddingDatabase(directory=directory)
+    db.insert_embeddings(data[:4])
+    db.close_connection()
+    db = LocalEmbeddingDatabase(directory=directory)
+    db.insert_embeddings(data[4:])
+    assert [db.get_text(doc['chunk_id']) for doc in data] == [doc['text'] for doc in data]
+    assert db.lexical_search("chunk 6", 1)[0][0] == data[6]['chunk_id']
+    db.close_connection()
+
+def test_local_store_fills_missing_reduced_vectors(tmp_path):
+    """Inserting after a projection saved without update_reduced_embeddings reduces every row, not only the new ones."""
+    from local_database import LocalEmbeddingDatabase
+    from embedding.projection import PCAProjection
+    db = LocalEmbeddingDatabase(directory=str(tmp_path / "store"))
+    first, second = chunks(20), chunks(5, start=20, seed=1)
+    db.insert_embeddings(first)
+    projection = PCAProjection.fit(np.stack([doc['embedding'] for doc in first]), 8)
+    db.save_projection(projection)
+    db.insert_embeddings(second)
+    chunk_ids, reduced = db.get_embedding_matrix(space='reduced')
+    assert reduced.shape == (25, 8)
+    expected = projection.transform(np.stack([doc['embedding'] for doc in first + second]))
+    np.testing.assert_allclose(reduced, expected, rtol=1e-5, atol=1e-5)
+    db.close_connection()
@@ -0,0 +1,59 @@
+# tests/test_lexical.py
+
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_lexical import synthetic_chunks, bm25_reference
+from embedding.lexical import BM25Index, reciprocal_rank_fusion
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    chunks, titles = synthetic_chunks(300, seed=0)
+    rng = random.Random(0)
+    queries = [rng.choice(titles).rsplit("_", 1)[0].replace("_", " ") for _ in range(15)]
+    return chunks, queries
+
+def index_of(chunks, batch_size):
+    index = BM25Index()
+    for start in range(0, len(chunks), batch_size):
+        index.add(chunks[start:start + batch_size])
+    return index
+
+@pytest.mark.parametrize("batch_size", [1, 7, 64])
+def test_incremental_matches_one_shot(corpus, batch_size):
+    chunks, queries = corpus
+    one_shot = index_of(chunks, len(chunks))
+    incremental = index_of(chunks, batch_size)
+    assert incremental.doc_ids == one_shot.doc_ids
+    assert len(incremental.segments) <= int(np.log2(len(chunks))) + 1
+    for query in queries:
+        assert np.allclose(incremental.scores(query), one_shot.scores(query), rtol=1e-5)
+
+def test_scores_match_reference(corpus):
+    chunks, queries = corpus
+    index = index_of(chunks, 37)
+    for query in queries:
+        reference = bm25_reference(chunks, query)
+        scores = dict(zip(index.doc_ids, index.scores(query).tolist()))
+        assert {c for c, s in scores.items() if s > 0} == set(reference)
+        assert np.allclose([scores[c] for c in reference], list(reference.values()), rtol=1e-4)
+
+def test_search_subset(corpus):
+    chunks, queries = corpus
+    index = index_of(chunks, 50)
+    subset = {chunk['chunk_id'] for chunk in chunks[::2]}
+    found = index.search(queries[0], 10, subset=subset)
+    assert found and all(c in subset for c, _ in found)
+    assert [s for _, s in found] == sorted((s for _, s in found), reverse=True)
+
+def test_reciprocal_rank_fusion_ordering():
+    dense = [("a", 0.9), ("b", 0.8), ("c", 0.7)]
+    lexical = [("c", 12.0), ("a", 9.0), ("d", 1.0)]
+    fused = reciprocal_rank_fusion([dense, lexical], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+    # only the ranks count, not the scores
+    assert reciprocal_rank_fusion([[("x", 100.0), ("y", 0.1)]]) == reciprocal_rank_fusion([[("x", 1.0), ("y", 0.9)]])
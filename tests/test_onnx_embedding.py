@@ -0,0 +1,42 @@
+# tests/test_onnx_embedding.py
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from benchmarks.bench_onnx_embedding import random_model, synthetic_texts
+from embedding.onnx_model import OnnxEmbedding
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    model_dir = str(tmp_path_factory.mktemp("random_bert"))
+    random_model(model_dir, hidden=64, layers=2, heads=4)
+    return model_dir
+
+@pytest.fixture(scope="module")
+def texts():
+    return synthetic_texts(40, min_words=5, max_words=80)
+
+def test_shape_and_normalization(model_dir, texts):
+    model = OnnxEmbedding(model_dir, quantized=False, threads=1, batch_size=8)
+    embeddings = model.encode(texts)
+    assert embeddings.shape == (len(texts), 64)
+    assert embeddings.dtype == np.float32
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1, atol=1e-5)
+    assert model.encode([]).shape == (0, 64)
+
+def test_batches_keep_the_input_order(model_dir, texts):
+    # texts are sorted by length into batches, the rows must come back in input order
+    model = OnnxEmbedding(model_dir, quantized=False, threads=1, batch_size=8)
+    one_by_one = np.vstack([model.encode([text]) for text in texts[:10]])
+    assert np.allclose(model.encode(texts[:10]), one_by_one, atol=1e-4)
+
+def test_int8_agrees_with_float32(model_dir, texts):
+    full = OnnxEmbedding(model_dir, quantized=False, threads=1).encode(texts)
+    quantized = OnnxEmbedding(model_dir, quantized=True, threads=1).encode(texts)
+    cosine = np.sum(full * quantized, axis=1)
+    assert cosine.min() > 0.95
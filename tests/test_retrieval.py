@@ -0,0 +1,53 @@
+# tests/test_retrieval.py
+
+import random
+import itertools
+
+import networkx as nx
+import pytest
+
+from knowledge_graph.retrieval import HybridRetriever
+
+
+class StubDatabase:
+    def get_text(self, chunk_id):
+        return f"text of {chunk_id}"
+
+def retriever(G, max_hops=2, hop_decay=1.0):
+    return HybridRetriever(StubDatabase(), model=None, chunk_graph=G, max_hops=max_hops, hop_decay=hop_decay)
+
+def brute_force(G, source, max_hops, hop_decay):
+    """{node: best path weight} over every walk of at most max_hops edges."""
+    best = {source: 1.0}
+    frontier = {source: 1.0}
+    for _ in range(max_hops):
+        reached = {}
+        for node, weight in frontier.items():
+            for _, neighbour, d in G.out_edges(node, data=True):
+                path_weight = weight * d['weight'] * hop_decay
+                reached[neighbour] = max(reached.get(neighbour, 0.0), path_weight)
+        for node, weight in reached.items():
+            best[node] = max(best.get(node, 0.0), weight)
+        frontier = reached
+    return best
+
+
+def test_shorter_lighter_path_still_expands():
+    G = nx.DiGraph()
+    G.add_weighted_edges_from([("A", "B", 0.9), ("B", "C", 0.9), ("A", "C", 0.1), ("C", "D", 0.9)])
+    found = {node: (weight, hops) for node, weight, hops in retriever(G).neighbourhood("A", 2)}
+    assert set(found) == {"A", "B", "C", "D"}
+    assert found["C"] == (pytest.approx(0.81), 2)
+    assert found["D"] == (pytest.approx(0.09), 2)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_neighbourhood_matches_brute_force(seed):
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+    for u, v in itertools.permutations(range(25), 2):
+        if rng.random() < 0.12:
+            G.add_edge(u, v, weight=rng.random())
+    for max_hops, hop_decay in ((1, 0.5), (2, 1.0), (3, 0.5)):
+        found = {node: weight for node, weight, _ in retriever(G, max_hops, hop_decay).neighbourhood(0, max_hops)}
+        expected = brute_force(G, 0, max_hops, hop_decay)
+        assert found == pytest.approx(expected)
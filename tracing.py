@@ -0,0 +1,194 @@
+# tracing.py
+
+import os
+import re
+import json
+import time
+import threading
+import numbers
+import functools
+import tracemalloc
+from collections import defaultdict
+
+from config import TRACING, TRACE_MEMORY, TRACE_EVENTS_PER_SPAN
+
+# Module state, read on every call: when tracing is disabled, spans and counters return at once
+_enabled = False
+_memory = False
+_max_events = TRACE_EVENTS_PER_SPAN
+_origin = time.perf_counter()
+_events = []
+_counters = defaultdict(int)  # stays an exact int while only ints are counted
+_span_calls = defaultdict(int)
+_span_seconds = defaultdict(float)
+_lock = threading.Lock()
+
+
+def enable(memory=TRACE_MEMORY, max_events_per_span=TRACE_EVENTS_PER_SPAN):
+    """
+    Start recording spans and counters, and the tracemalloc peak if `memory`.
+    Only the first `max_events_per_span` calls of each span are kept as raw trace events (None for all),
+    so that a span called millions of times (dense_search during build) does not grow the buffer.
+    """
+    global _enabled, _memory, _max_events
+    _enabled = True
+    _memory = memory
+    _max_events = max_events_per_span
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def disable():
+    global _enabled, _memory
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _enabled = False
+    _memory = False
+
+def enabled():
+    return _enabled
+
+def reset():
+    """Drop the recorded spans and counters."""
+    global _origin
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _span_calls.clear()
+        _span_seconds.clear()
+        _origin = time.perf_counter()
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start', 'memory')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        if _memory:
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        duration = end - self.start
+        args = self.args
+        if _memory:
+            current, peak = tracemalloc.get_traced_memory()
+            args = dict(args or {}, memory_delta_mb=round((current - self.memory) / 2**20, 3),
+                        traced_peak_mb=round(peak / 2**20, 3))
+        with _lock:
+            _span_calls[self.name] += 1
+            _span_seconds[self.name] += duration
+            if _max_events is not None and _span_calls[self.name] > _max_events:
+                return False
+            event = {'name': self.name, 'ph': 'X', 'ts': (self.start - _origin) * 1e6, 'dur': duration * 1e6,
+                     'pid': os.getpid(), 'tid': threading.get_ident()}
+            if args:
+                event['args'] = args
+            _events.append(event)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **args):
+    """Context manager timing a named span (a shared no-op when tracing is disabled)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+def traced(name=None):
+    """Decorator wrapping every call of the function in a span named `name` (its qualified name by default)."""
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, value=1):
+    """Add `value` to the counter `name` (pages, bytes, chunks, vectors, queries...)."""
+    if _enabled:
+        with _lock:
+            _counters[name] += value
+
+
+def counters():
+    return dict(_counters)
+
+def span_stats():
+    """{span name: (calls, total seconds)}."""
+    return {name: (_span_calls[name], _span_seconds[name]) for name in _span_calls}
+
+def export_chrome_trace(path):
+    """Write the kept span events as Chrome trace JSON (chrome://tracing, Perfetto), counters and dropped event counts as metadata."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _lock:
+        dropped = {name: calls - _max_events for name, calls in _span_calls.items()
+                   if _max_events is not None and calls > _max_events}
+        trace = {'traceEvents': list(_events), 'displayTimeUnit': 'ms',
+                 'otherData': {'counters': dict(_counters), 'dropped_events': dropped}}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(trace, f)
+    return path
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+def _metric_value(value):
+    """Exposition text of a sample: integers exactly (bytes counters pass 2**53), floats round-trip."""
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    return repr(float(value))
+
+def export_prometheus(path, prefix="wiki"):
+    """Write the span totals, counters and memory peak in the Prometheus text exposition format."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    lines = [f"# HELP {prefix}_span_calls_total Number of calls of each span.",
+             f"# TYPE {prefix}_span_calls_total counter"]
+    stats = span_stats()
+    lines += [f'{prefix}_span_calls_total{{span="{name}"}} {calls}' for name, (calls, _) in sorted(stats.items())]
+    lines += [f"# HELP {prefix}_span_seconds_total Wall time spent in each span.",
+              f"# TYPE {prefix}_span_seconds_total counter"]
+    lines += [f'{prefix}_span_seconds_total{{span="{name}"}} {seconds:.6f}' for name, (_, seconds) in sorted(stats.items())]
+    for name, value in sorted(counters().items()):
+        metric = f"{prefix}_{_metric_name(name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {_metric_value(value)}"]
+    if _memory and tracemalloc.is_tracing():
+        metric = f"{prefix}_tracemalloc_peak_bytes"
+        lines += [f"# TYPE {metric} gauge", f"{metric} {tracemalloc.get_traced_memory()[1]}"]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+def summary():
+    """Print the time spent per span and the counters."""
+    print("-----"*10)
+    for name, (calls, seconds) in sorted(span_stats().items(), key=lambda item: -item[1][1]):
+        print(f"{name:<32} {calls:>8} calls {seconds:10.2f}s")
+    for name, value in sorted(counters().items()):
+        print(f"{name:<32} {_metric_value(value):>14}")
+    print("-----"*10)
+
+
+if TRACING:
+    enable()
@@ -1,101 +1,181 @@
 
-import os
-import json
-import networkx as nx
-from networkx.readwrite import json_graph
 from config import DATA_DIR
+from knowledge_graph.utils import load_edgelist, knowledge_graph_path
 
-import cudf
-import cugraph
+# pandas, pyarrow, NumPy and SciPy are imported by the methods that use them, importing this module stays cheap
+import analytics
+from analytics import coarsen
 
-import matplotlib.pyplot as plt
-import seaborn as sns
+# Low cardinality string attributes, stored as categoricals
+CATEGORICAL_COLUMNS = ('category', 'type', 'label')
 
 class cuGraph:
 
-    def __init__(self, outdir: str = DATA_DIR, graph_type: str = 'chunk',verbose=1):
-
+    def __init__(self, outdir: str = DATA_DIR, graph_type: str = 'chunk',verbose=1, edgelist=None):
+        """
+        :param outdir: Data directory holding the saved knowledge graphs.
+        :param graph_type: 'chunk' or 'page'.
+        :param edgelist: Optional (edges, nodes) columns handed over in memory
+            (see KnowledgeGraph.to_edgelist), instead of reading the graph from outdir.
+        """
         self.outdir = outdir
         self.graph_type = graph_type
         self.verbose = verbose
-        self.nxGraph = self._load()
-        self.edges_df, self.G_cu = self._to_cugraph()
-        self.nodes_df = cudf.concat([
-                        self.edges_df['src'], self.edges_df['dst']
-                    ]).drop_duplicates().reset_index(drop=True).to_frame(name='node')
+        self.version = 0  # bumped every time the edge set changes
+        self._G_cu = None
+        self._G_cu_version = None
+        self._metrics = {}
+        self._pagerank_nstart = None
+        edges, nodes = self._load() if edgelist is None else edgelist
+        self.edges_df = self._to_cugraph(edges)
+        self.nodes_df = self._to_nodes_df(nodes)
+
+    @property
+    def edges_df(self):
+        return self._edges_df
+
+    @edges_df.setter
+    def edges_df(self, edges_df):
+        """Replacing the edge frame invalidates the backend graph and the cached metrics."""
+        self._edges_df = edges_df
+        self.version += 1
+
+    @property
+    def G_cu(self):
+        """Backend graph of the current edges, rebuilt lazily after the edges changed."""
+        if self._G_cu is None or self._G_cu_version != self.version:
+            weight = 'weight' if self.graph_type == 'chunk' else None
+            self._G_cu = analytics.backend.build_graph(self.edges_df, weight=weight)
+            self._G_cu_version = self.version
+        return self._G_cu
+
+    def _cached(self, key, compute):
+        """Result of `compute()` for the current graph version, computed at most once per version."""
+        version, result = self._metrics.get(key, (None, None))
+        if version != self.version:
+            result = compute()
+            self._metrics[key] = (self.version, result)
+        return result
+
+    def _set_node_column(self, metric_df, column):
+        """Attach (or replace) a per-vertex metric column of nodes_df."""
+        nodes_df = self.nodes_df.drop(columns=[column]) if column in self.nodes_df.columns else self.nodes_df
+        nodes_df = nodes_df.merge(metric_df[['vertex', column]], left_on='node', right_on='vertex', how='left')
+        self.nodes_df = nodes_df.drop(columns=['vertex'])
+
+    def _set_edge_column(self, metric_df, column):
+        """Attach (or replace) a per-edge metric column of edges_df, without changing the graph version."""
+        edges_df = self._edges_df.drop(columns=[column]) if column in self._edges_df.columns else self._edges_df
+        edges_df = edges_df.merge(metric_df[['src', 'dst', column]], on=['src', 'dst'], how='left')
+        edges_df[column] = edges_df[column].fillna(0)
+        self._edges_df = edges_df
+
+    @classmethod
+    def from_knowledge_graph(cls, kg, graph_type: str = 'chunk', verbose=1):
+        """Build the analytics graph from a built KnowledgeGraph, without going through disk."""
+        return cls(outdir=kg.data_dir, graph_type=graph_type, verbose=verbose, edgelist=kg.to_edgelist(graph_type))
+
+    @classmethod
+    def from_parquet(cls, outdir: str = DATA_DIR, graph_type: str = 'chunk', verbose=1):
+        """Load a graph exported with `to_parquet`, analysis columns included."""
+        from analytics import arrow_io
+        nodes, edges = arrow_io.read_parquet(outdir, graph_type)
+        nodes_df, edges_df = arrow_io.to_pandas(nodes), arrow_io.to_pandas(edges)
+        # Node ids are plain strings in the analytics frames
+        nodes_df['node'] = nodes_df['node'].astype(str)
+        edges_df['src'] = edges_df['src'].astype(str)
+        edges_df['dst'] = edges_df['dst'].astype(str)
+        if verbose:
+            print(f"Graph loaded from {arrow_io.parquet_paths(outdir, graph_type)[1]}")
+        return cls(outdir=outdir, graph_type=graph_type, verbose=verbose, edgelist=(edges_df, nodes_df))
+
+    def to_arrow(self):
+        """
+        nodes_df and edges_df as Arrow tables, with 'src'/'dst' dictionary-encoded against the node ids
+        and categorical columns as dictionaries. Use analytics.arrow_io.to_pandas (or
+        cudf.DataFrame.from_arrow) to hand them to other consumers.
+        """
+        from analytics import arrow_io
+        backend = analytics.backend
+        return arrow_io.to_arrow(backend.to_pandas(self.nodes_df), backend.to_pandas(self.edges_df))
+
+    def to_parquet(self, outdir: str = None):
+        """Export nodes_df and edges_df as Parquet files (see analytics.arrow_io.write_parquet)."""
+        from analytics import arrow_io
+        backend = analytics.backend
+        paths = arrow_io.write_parquet(backend.to_pandas(self.nodes_df), backend.to_pandas(self.edges_df),
+                                       outdir or self.outdir, self.graph_type)
+        if self.verbose:
+            print(f"Graph exported to {paths[0]} and {paths[1]}")
+        return paths
 
     def _load(self):
         """
-        Load a graph from disk and replace the internal knowledge graph.
-        Args:
-            path: Path to the graph JSON file.
+        Read the saved knowledge graph as columnar edge and node lists.
         """
-        if self.graph_type == 'chunk':
-            filename = "chunk_knowledge_graph.json"
-            file_path = os.path.join(f"{self.outdir}/knowledge_graph", filename)
-        elif self.graph_type == 'page':
-            filename = "page_knowledge_graph.json"
-            file_path = os.path.join(f"{self.outdir}/knowledge_graph", filename)
-        else:
-            raise ValueError("graph_type must be 'chunk' or 'page'")
+        edges, nodes = load_edgelist(self.outdir, self.graph_type)
+        if self.verbose:
+            print(f"Graph loaded from {knowledge_graph_path(self.outdir, self.graph_type)}")
+        return edges, nodes
 
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+    def _to_cugraph(self, edges):
+        """
+        Build the edge frame in the analytics backend format (cuDF on GPU, pandas on CPU)
+        """
+        import pandas as pd
+        edges_df = edges if isinstance(edges, pd.DataFrame) else pd.DataFrame({
+            col: pd.Series(values, dtype='category' if col in CATEGORICAL_COLUMNS else None)
+            for col, values in edges.items()
+        })
+        if 'weight' in edges_df:
+            edges_df['weight'] = edges_df['weight'].astype('float64')
+        return analytics.backend.from_pandas(edges_df)
+
+    def _to_nodes_df(self, nodes):
+        """
+        One row per node with at least one edge, with the node attributes as typed columns
+        """
+        import pandas as pd
+        attrs_df = nodes if isinstance(nodes, pd.DataFrame) else pd.DataFrame({
+            col: pd.Series(values, dtype='category' if col in CATEGORICAL_COLUMNS else None)
+            for col, values in nodes.items()
+        })
+        attrs_df = attrs_df.drop_duplicates(subset='node')
+        connected = analytics.backend.concat([
+                        self.edges_df['src'], self.edges_df['dst']
+                    ]).drop_duplicates().reset_index(drop=True).to_frame(name='node')
+        return connected.merge(analytics.backend.from_pandas(attrs_df), on='node', how='left')
 
-        if self.graph_type == 'chunk':
-            graph = json_graph.node_link_graph(data, edges="links")
-        elif self.graph_type == 'page':
-            graph = json_graph.node_link_graph(data, edges="links")
-        else:
-            raise ValueError("graph_type must be 'chunk' or 'page'")  
-        
-        if self.verbose:
-            print(f"Graph loaded from {file_path}")
+    def pagerank(self, keep_attr=True, ascending=False, warm_start=True):
+        def compute():
+            # Start from the last PageRank vector, which is close after filtering a few nodes/edges
+            nstart = self._pagerank_nstart if warm_start else None
+            return analytics.backend.pagerank(self.G_cu, nstart=nstart)
 
-        return graph
-    
-    def _to_cugraph(self,):
-        """
-        Convert NetworkX DiGraph to cuGraph format
-        """
-        edges = nx.to_pandas_edgelist(self.nxGraph)
-        gdf_edges = cudf.DataFrame.from_pandas(edges)
-        # Rename for cuGraph convention
-        gdf_edges = gdf_edges.rename(columns={'source': 'src', 'target': 'dst'})
-        # Convert to cuGraph
-        G_cu = cugraph.Graph()
-        if self.graph_type == 'chunk':
-            G_cu.from_cudf_edgelist(gdf_edges, source='src', destination='dst', edge_attr='weight', renumber=True)
-        else:
-            G_cu.from_cudf_edgelist(gdf_edges, source='src', destination='dst', renumber=True)
-        return gdf_edges, G_cu
-    
-    
-    def pagerank(self, keep_attr=True, ascending=False):
-        pagerank_df = cugraph.pagerank(self.G_cu)
+        pagerank_df = self._cached(('pagerank',), compute)
+        self._pagerank_nstart = pagerank_df
         if keep_attr:
-            self.nodes_df = self.nodes_df.merge(pagerank_df, left_on='node', right_on='vertex', how='left')
-            self.nodes_df = self.nodes_df.drop(columns=['vertex'])
+            self._set_node_column(pagerank_df, 'pagerank')
         return pagerank_df.sort_values("pagerank", ascending=ascending)
     
     def betweenness_centrality(self, k=1024, normalized=True, keep_attr=True, ascending=False):
-        betweenness_df = cugraph.betweenness_centrality(self.G_cu, k=k, normalized=normalized)
+        betweenness_df = self._cached(('betweenness_centrality', k, normalized),
+                                      lambda: analytics.backend.betweenness_centrality(self.G_cu, k=k,
+                                                                                       normalized=normalized))
         if keep_attr:
-            self.nodes_df = self.nodes_df.merge(betweenness_df, left_on='node', right_on='vertex', how='left')
-            self.nodes_df = self.nodes_df.drop(columns=['vertex'])
+            self._set_node_column(betweenness_df, 'betweenness_centrality')
         return betweenness_df.sort_values("betweenness_centrality", ascending=ascending)
     
     def edge_betweenness_centrality(self, k=256, keep_attr=True, ascending=False):
-        edge_betweenness_df = cugraph.edge_betweenness_centrality(self.G_cu, k=k)
+        edge_betweenness_df = self._cached(('edge_betweenness_centrality', k),
+                                           lambda: analytics.backend.edge_betweenness_centrality(self.G_cu, k=k))
         if keep_attr:
-            self.edges_df = self.edges_df.merge(edge_betweenness_df, on=['src', 'dst'], how='left')
-            self.edges_df.fillna(0, inplace=True)
+            self._set_edge_column(edge_betweenness_df, 'betweenness_centrality')
         return edge_betweenness_df.sort_values("betweenness_centrality", ascending=ascending)
     
     def detect_communities(self):
-        parts, _ = cugraph.louvain(self.G_cu)
-        self.nodes_df = self.nodes_df.merge(parts, left_on='node', right_on='vertex', how='left')
-        self.nodes_df = self.nodes_df.drop(columns=['vertex'])
+        parts, _ = self._cached(('louvain',), lambda: analytics.backend.louvain(self.G_cu))
+        self._set_node_column(parts, 'partition')
 
     def filter_nodes(self, by: str = "pagerank", threshold: float = None, top_pct: float = None,
                  hybrid_attrs: list = None, hybrid_func=None, inplace=True):
@@ -143,7 +223,7 @@ class cuGraph:
         if inplace:
             self.edges_df = filtered_df.reset_index(drop=True)
             self.nodes_df = self.nodes_df[self.nodes_df['node'].isin(
-                    cudf.concat([self.edges_df['src'], self.edges_df['dst']])
+                    analytics.backend.concat([self.edges_df['src'], self.edges_df['dst']])
                 )].reset_index(drop=True)
         return filtered_df.reset_index(drop=True).sort_values(by, ascending=False)
 
@@ -151,48 +231,87 @@ class cuGraph:
         """
         Removes edges connected to orphan or dead-end nodes.
         If inplace=True, updates self.edges_df and self.nodes_df.
-        """
-        edges = self.edges_df.copy(deep=True)
-        total_removed = 0
-
-        while True:
-            src_nodes = edges['src'].dropna().drop_duplicates()
-            dst_nodes = edges['dst'].dropna().drop_duplicates()
-
-            orphan_nodes = src_nodes[~src_nodes.isin(dst_nodes)]
-            dead_end_nodes = dst_nodes[~dst_nodes.isin(src_nodes)]
-            nodes_to_remove = cudf.concat([orphan_nodes, dead_end_nodes], ignore_index=True)
-
-            if nodes_to_remove.empty:
-                break
 
-            before = len(edges)
-            mask = ~edges['src'].isin(nodes_to_remove) & ~edges['dst'].isin(nodes_to_remove)
-            edges = edges[mask]
-            removed = before - len(edges)
-            total_removed += removed
-
-            if self.verbose:
-                print(f"Removed {removed} edges...")
-
-            if not recurse:
-                break
+        Nodes are peeled with degree counters (see analytics.peeling), in O(V + E) overall even with
+        recurse=True. Per-round statistics are kept in self.peeling_stats (and returned if inplace=True).
+        """
+        import pandas as pd
+        from analytics.peeling import peel_dead_ends_and_orphans
+        src, dst, n_nodes = analytics.backend.edge_codes(self.edges_df)
+        keep, rounds = peel_dead_ends_and_orphans(src, dst, n_nodes, recurse=recurse)
+        edges = analytics.backend.filter_rows(self.edges_df, keep)
+        self.peeling_stats = pd.DataFrame(rounds, columns=['round', 'nodes_removed', 'edges_removed'])
 
         if self.verbose:
-            print(f"Total edges removed: {total_removed}")
+            for stats in rounds:
+                print(f"Removed {stats['edges_removed']} edges...")
+            print(f"Total edges removed: {int(self.peeling_stats['edges_removed'].sum())}")
 
         if inplace:
             self.edges_df = edges.reset_index(drop=True)
             # Also filter nodes_df to keep only connected nodes
-            connected_nodes = cudf.concat([edges['src'], edges['dst']]).drop_duplicates()
+            connected_nodes = analytics.backend.concat([edges['src'], edges['dst']]).drop_duplicates()
             self.nodes_df = self.nodes_df[self.nodes_df['node'].isin(connected_nodes)].reset_index(drop=True)
+            return self.peeling_stats
         else:
             # Also filter nodes_df to keep only connected nodes
-            connected_nodes = cudf.concat([edges['src'], edges['dst']]).drop_duplicates()
+            connected_nodes = analytics.backend.concat([edges['src'], edges['dst']]).drop_duplicates()
             nodes = self.nodes_df[self.nodes_df['node'].isin(connected_nodes)].reset_index(drop=True)
             return edges.reset_index(drop=True), nodes
 
 
+    def coarsen(self, by: str = 'partition', score: str = 'pagerank'):
+        """
+        Level-of-detail view: one super-node per Louvain community ('partition') or per page ('title'),
+        with member counts and summed edge weights (see analytics.coarsen).
+        Returns render-ready (nodes, edges) frames.
+        """
+        if by == 'partition' and 'partition' not in self.nodes_df.columns:
+            self.detect_communities()
+        if by not in self.nodes_df.columns:
+            raise ValueError(f"Attribute '{by}' not found in nodes_df.")
+        super_nodes, super_edges = coarsen.coarsen(self.nodes_df, self.edges_df, by=by, score=score)
+        if self.verbose:
+            print(f"Coarsened {len(self.nodes_df)} nodes / {len(self.edges_df)} edges "
+                  f"into {len(super_nodes)} nodes / {len(super_edges)} edges")
+        return super_nodes, super_edges
+
+    def drill_down(self, value, by: str = 'partition', score: str = 'pagerank'):
+        """
+        Expand the super-node `value` of the `by` view into its members, the other super-nodes kept aggregated.
+        Returns render-ready (nodes, edges) frames.
+        """
+        if by == 'partition' and 'partition' not in self.nodes_df.columns:
+            self.detect_communities()
+        if by not in self.nodes_df.columns:
+            raise ValueError(f"Attribute '{by}' not found in nodes_df.")
+        return coarsen.drill_down(self.nodes_df, self.edges_df, value, by=by, score=score)
+
+    def layout(self, iterations=100, n_jobs=1, **kwargs):
+        """
+        CPU ForceAtlas2 layout of the current graph (see analytics.layout), stored as the 'x' and 'y'
+        columns of nodes_df. Existing coordinates are used as the starting point.
+        """
+        import pandas as pd
+        from analytics.layout import adjacency, forceatlas2
+        nodes = analytics.backend.to_pandas(self.nodes_df['node'])
+        edges = analytics.backend.to_pandas(self.edges_df)
+        index = pd.Index(nodes)
+        src, dst = index.get_indexer(edges['src']), index.get_indexer(edges['dst'])
+        known = (src >= 0) & (dst >= 0)
+        weights = edges['weight'].to_numpy()[known] if 'weight' in edges.columns else None
+        A = adjacency(src[known], dst[known], len(index), weights)
+
+        pos = None
+        if 'x' in self.nodes_df.columns and 'y' in self.nodes_df.columns:
+            pos = analytics.backend.to_pandas(self.nodes_df[['x', 'y']]).to_numpy(dtype='float64')
+            if not pd.notna(pos).all():
+                pos = None
+        pos = forceatlas2(A, iterations=iterations, pos=pos, n_jobs=n_jobs, verbose=self.verbose, **kwargs)
+        self.nodes_df['x'] = pos[:, 0]
+        self.nodes_df['y'] = pos[:, 1]
+        return self.nodes_df[['node', 'x', 'y']]
+
     def plot_node_attribute_distribution(self, attr: str = 'pagerank', hybrid_attrs: list = None, hybrid_func=None, bins: int = 30):
         """
         Plot histogram or bar chart depending on the type of node attribute.
@@ -208,8 +327,10 @@ class cuGraph:
             if attr not in self.nodes_df.columns:
                 raise ValueError(f"Attribute '{attr}' not found in nodes_df.")
 
-        series = self.nodes_df[attr].to_pandas()
+        series = analytics.backend.to_pandas(self.nodes_df[attr])
 
+        import matplotlib.pyplot as plt
+        import seaborn as sns
         plt.figure(figsize=(10, 6))
         if series.dtype == 'object' or series.nunique() < 20:
             # Categorical or few unique values -> bar plot